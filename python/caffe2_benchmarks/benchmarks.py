@@ -36,6 +36,7 @@ To run from a command line, this module accepts the following parameters:
 
 * **--model** A model to benchmark ("alexnet", "googlenet" ...)
 * **--forward_only** Benchmark inference (if true) else benchmark training
+* **--data_loader_only** Benchmark only data ingestion pipeline (requires **--data_dir**)
 * **--batch_size** Per device batch size
 * **--num_warmup_batches** Number of warmup iterations
 * **--num_batches** Number of benchmark iterations
@@ -196,8 +197,8 @@ def benchmark(opts):
     """
     assert 'model' in opts, "Missing 'model' in options."
     assert 'phase' in opts, "Missing 'phase' in options."
-    assert opts['phase'] in ['inference', 'training'],\
-           "Invalid value for 'phase' (%s). Must be 'inference' or 'training'." %\
+    assert opts['phase'] in ['inference', 'training', 'data_ingestion'],\
+           "Invalid value for 'phase' (%s). Must be 'inference', 'training' or 'data_ingestion'." %\
            (opts['phase'])
 
     opts['batch_size'] = opts.get('batch_size', 16)
@@ -223,10 +224,53 @@ def benchmark(opts):
         print("[WARNING] Creating ModelHelper for CPU. TODO: Apply similar "\
               "optimziations as for GPUs.")
         model = model_helper.ModelHelper(name=opts['model'])
+    if opts['phase'] == 'data_ingestion':
+        return benchmark_data_ingestion(model, opts)
     if opts['phase'] == 'inference':
         return benchmark_inference(model, opts)
     return benchmark_training(model, opts)
 
+
+def benchmark_data_ingestion(model, opts):
+    """ Runs data ingestion pipeline only and returns array of batch times in seconds.
+
+    One input pipeline per device is created (as in training), so that throughput is
+    computed in the same way as for training benchmarks. No neural network is built.
+
+    :param model: Caffe2's model helper class instances.
+    :type model: :py:class:`caffe2.python.model_helper.ModelHelper`
+    :param dict opts: Options for the benchmark. Must contain `device`, `num_gpus`,
+                      `data_dir`, `data_backend`, `num_decode_threads`,
+                      `num_warmup_batches` and `num_batches`.
+    :return: Tuple of model title and numpy array containing batch times.
+    :rtype: (string, numpy array)
+    """
+    if 'data_dir' not in opts or not opts['data_dir']:
+        raise ValueError("Data ingestion benchmarks: dataset not provided (--data_dir)")
+    # Models expect 'inference' or 'training' phase. The model itself will not be built,
+    # we just need its input shape and batch size.
+    model_builder = ModelFactory.get_model(dict(opts, phase='training'))
+    reader = model.CreateDB(
+        "reader",
+        db=opts['data_dir'],            # (str, path to training data)
+        db_type=opts['data_backend'],   # (str, 'lmdb' or 'leveldb')
+        num_shards=1,                   # (int, number of machines)
+        shard_id=0,                     # (int, machine id)
+    )
+    devices = range(opts['num_gpus']) if opts['device'] == 'gpu' else [None]
+    for device in devices:
+        name_scope = 'gpu_%d' % device if device is not None else 'cpu'
+        with core.DeviceScope(Model.get_device_option(device)), core.NameScope(name_scope):
+            model_builder.add_data_inputs(
+                model, reader, use_gpu_transform=(opts['device'] == 'gpu'),
+                num_decode_threads=opts['num_decode_threads']
+            )
+    print("[INFO] Added %d real data input(s) (%s) for Caffe2 data ingestion benchmarks" %\
+          (len(devices), opts['data_dir']))
+    workspace.RunNetOnce(model.param_init_net)
+    workspace.CreateNet(model.net)
+    return (model_builder.name, run_n_times(model, opts['num_warmup_batches'], opts['num_batches']))
+
 def benchmark_inference(model, opts):
     """ Runs N inferences and returns array of batch times in seconds.
 
@@ -366,6 +410,8 @@ def parse_args():
                         help="A model to benchmark ('alexnet', 'googlenet' ...)")
     parser.add_argument('--forward_only', nargs='?', const=True, default=False, type=str2bool,
                         help="Benchmark inference (if true) else benchmark training.")
+    parser.add_argument('--data_loader_only', nargs='?', const=True, default=False, type=str2bool,
+                        help="Benchmark only data ingestion pipeline (requires --data_dir).")
     parser.add_argument('--batch_size', type=int, required=True, default=None,
                         help="Per device (replica) batch size")
     parser.add_argument('--num_batches', type=int, required=False, default=100,
@@ -436,7 +482,10 @@ def main():
 
     try:
         opts = vars(args)
-        opts['phase'] = 'inference' if args.forward_only else 'training'
+        if args.data_loader_only:
+            opts['phase'] = 'data_ingestion'
+        else:
+            opts['phase'] = 'inference' if args.forward_only else 'training'
         model_title, times = benchmark(opts)
     except Exception as err:
         #TODO: this is not happenning, program terminates earlier.
@@ -0,0 +1,431 @@
+# (c) Copyright [2017] Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Collective communication microbenchmarks.
+
+Measures latency and bandwidth of collective operations for message sizes from
+``--min_bytes`` to ``--max_bytes`` (doubling sizes) with a number of worker processes
+on a local host. Supported backends:
+
+* ``gloo``                torch.distributed with gloo backend. Collectives: allreduce,
+                          allgather, broadcast and reduce_scatter.
+* ``kvstore_local``       MXNet ``local`` kvstore, one process with ``--num_workers``
+                          CPU contexts. Collective: allreduce (push + pull).
+* ``kvstore_dist_sync``   MXNet ``dist_sync`` kvstore, a scheduler, ``--num_workers``
+                          servers and ``--num_workers`` workers. Collective: allreduce
+                          (push + pull).
+
+Message size is a size of a buffer every worker sends or receives (for allgather,
+size of an output buffer, for reduce_scatter, size of an input buffer). Time of an
+operation is a maximal time across workers. As in NCCL tests, algorithm bandwidth is
+``size / time`` and bus bandwidth is algorithm bandwidth multiplied by a factor that
+makes it comparable with hardware peak bandwidth: ``2(n-1)/n`` for allreduce,
+``(n-1)/n`` for allgather and reduce_scatter and ``1`` for broadcast.
+
+Results of one collective are written in DLBS log format (``__results.*__`` keys), so
+log files can be parsed with ``logparser.py``:
+
+* ``exp.framework``, ``exp.comm_backend``, ``exp.collective``, ``exp.num_workers``
+* ``results.message_sizes``  Message sizes, bytes.
+* ``results.latency``        Average time of an operation, microseconds.
+* ``results.algbw``          Algorithm bandwidth, GB/s.
+* ``results.busbw``          Bus bandwidth, GB/s.
+* ``results.busbw_peak``     Maximal bus bandwidth, GB/s.
+
+Usage:
+
+>>> python -m dlbs.bench.collectives --backend gloo --num_workers 4 --max_bytes 64MB
+>>> python -m dlbs.bench.collectives --backend gloo --num_workers 2 --log_dir ./logs \\
+>>>                                  --collectives allreduce broadcast
+"""
+from __future__ import print_function
+from __future__ import division
+import os
+import sys
+import json
+import timeit
+import argparse
+import subprocess
+import multiprocessing
+try:
+    import Queue
+except ImportError:
+    import queue as Queue
+
+COLLECTIVES = ['allreduce', 'allgather', 'broadcast', 'reduce_scatter']
+BACKENDS = ['gloo', 'kvstore_local', 'kvstore_dist_sync']
+# Messages larger than this are benchmarked with proportionally smaller number of iterations.
+LARGE_MESSAGE = 64 * 1024 * 1024
+
+
+def parse_size(size):
+    """Converts size specification into number of bytes.
+
+    :param str size: Size, an integer with an optional suffix (B, KB, MB, GB), for
+                     instance, 512, 1KB or 1GB. Suffixes are powers of 1024.
+    :return: Number of bytes (int).
+    """
+    size = str(size).strip().upper()
+    for suffix, multiplier in (('GB', 1024**3), ('MB', 1024**2), ('KB', 1024), ('B', 1)):
+        if size.endswith(suffix):
+            return int(float(size[:-len(suffix)]) * multiplier)
+    return int(size)
+
+
+def get_message_sizes(min_bytes, max_bytes):
+    """Returns doubling message sizes from min_bytes to max_bytes (inclusive)."""
+    sizes = []
+    size = max(4, min_bytes)
+    while size <= max_bytes:
+        sizes.append(size)
+        size *= 2
+    return sizes
+
+
+def get_num_iterations(message_size, num_iterations):
+    """Returns number of iterations for a message size.
+
+    Messages larger than LARGE_MESSAGE are benchmarked with proportionally smaller number
+    of iterations (at least 2).
+    """
+    if message_size <= LARGE_MESSAGE:
+        return num_iterations
+    return max(2, num_iterations * LARGE_MESSAGE // message_size)
+
+
+def bus_bandwidth(collective, num_workers, algbw):
+    """Converts algorithm bandwidth into bus bandwidth.
+
+    :param str collective: Collective operation (one of COLLECTIVES).
+    :param int num_workers: Number of workers.
+    :param float algbw: Algorithm bandwidth.
+    :return: Bus bandwidth in the same units as algorithm bandwidth.
+    """
+    factors = {
+        'allreduce': 2.0 * (num_workers - 1) / num_workers,
+        'allgather': float(num_workers - 1) / num_workers,
+        'reduce_scatter': float(num_workers - 1) / num_workers,
+        'broadcast': 1.0
+    }
+    return algbw * factors[collective]
+
+
+def get_results(collective, num_workers, sizes, times):
+    """Computes latency and bandwidth curves.
+
+    :param str collective: Collective operation.
+    :param int num_workers: Number of workers.
+    :param list sizes: Message sizes, bytes.
+    :param list times: Average time of an operation for every message size, seconds.
+    :return: Dictionary with `message_sizes`, `latency`, `algbw`, `busbw` and
+             `busbw_peak` fields.
+    """
+    algbw = [size / time / 1e9 if time > 0 else 0.0 for size, time in zip(sizes, times)]
+    busbw = [bus_bandwidth(collective, num_workers, bandwidth) for bandwidth in algbw]
+    return {
+        'message_sizes': list(sizes),
+        'latency': [1e6 * time for time in times],
+        'algbw': algbw,
+        'busbw': busbw,
+        'busbw_peak': max(busbw) if busbw else 0.0
+    }
+
+
+def write_log(file_obj, backend, collective, num_workers, results=None, error=None):
+    """Writes results of one collective in DLBS log format.
+
+    :param obj file_obj: File object to write to.
+    :param str backend: Backend name.
+    :param str collective: Collective operation.
+    :param int num_workers: Number of workers.
+    :param dict results: Results (see `get_results`) or None if benchmark failed.
+    :param str error: Error message if benchmark failed.
+    """
+    params = [
+        ('exp.framework', 'mxnet' if backend.startswith('kvstore') else 'pytorch'),
+        ('exp.comm_backend', backend),
+        ('exp.collective', collective),
+        ('exp.num_workers', num_workers)
+    ]
+    if results is None:
+        params.extend([('exp.status', 'failure'), ('exp.status_msg', error or '')])
+    else:
+        params.extend([('exp.status', 'ok')])
+        params.extend(('results.%s' % key, results[key]) for key in sorted(results))
+    for key, value in params:
+        file_obj.write("__%s__=%s\n" % (key, json.dumps(value)))
+
+
+def torch_worker(rank, opts, results):
+    """Benchmarks torch.distributed (gloo) collectives in one worker process.
+
+    Rank 0 puts (collective, times, error) tuples into `results` queue where times is a
+    list of average operation times (seconds, maximum across workers) for every message
+    size.
+    """
+    import torch
+    import torch.distributed as dist
+    os.environ['MASTER_ADDR'] = '127.0.0.1'
+    os.environ['MASTER_PORT'] = str(opts['port'])
+    dist.init_process_group(backend='gloo', rank=rank, world_size=opts['num_workers'])
+    num_workers = opts['num_workers']
+
+    def _make_op(collective, size):
+        """Returns a function that runs collective on preallocated float32 buffers."""
+        num_elements = max(num_workers, size // 4)
+        if collective == 'allreduce':
+            tensor = torch.ones(num_elements)
+            return lambda: dist.all_reduce(tensor)
+        if collective == 'broadcast':
+            tensor = torch.ones(num_elements)
+            return lambda: dist.broadcast(tensor, 0)
+        chunk = num_elements // num_workers
+        chunks = [torch.ones(chunk) for _ in range(num_workers)]
+        tensor = torch.ones(chunk)
+        if collective == 'allgather':
+            return lambda: dist.all_gather(chunks, tensor)
+        return lambda: dist.reduce_scatter(tensor, chunks)
+
+    for collective in opts['collectives']:
+        times, error = [], None
+        for size in opts['sizes']:
+            try:
+                operation = _make_op(collective, size)
+                for _ in range(opts['warmup_iterations']):
+                    operation()
+                num_iterations = get_num_iterations(size, opts['iterations'])
+                dist.barrier()
+                start_time = timeit.default_timer()
+                for _ in range(num_iterations):
+                    operation()
+                elapsed = torch.tensor([(timeit.default_timer() - start_time) / num_iterations],
+                                       dtype=torch.float64)
+            except RuntimeError as err:
+                # E.g. reduce_scatter is not supported by gloo in older versions of PyTorch.
+                error = "%s is not supported (%s)" % (collective, str(err).splitlines()[0])
+                break
+            dist.all_reduce(elapsed, op=dist.ReduceOp.MAX)
+            times.append(elapsed.item())
+        if rank == 0:
+            results.put((collective, times, error))
+    dist.destroy_process_group()
+
+
+def run_local_workers(target, opts, poll_interval=1.0):
+    """Runs `target(rank, opts, results)` in `num_workers` local processes.
+
+    Rank 0 is expected to put one (collective, times, error) tuple per collective into
+    `results` queue. If a worker dies before all results have been reported (e.g. it
+    cannot initialize a process group), remaining workers are terminated and remaining
+    collectives are reported as failed instead of waiting forever.
+
+    :param callable target: Worker function.
+    :param dict opts: Benchmark options.
+    :param float poll_interval: How often (seconds) to check that workers are alive.
+    :return: List of (collective, times, error) tuples.
+    """
+    results = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(target=target, args=(rank, opts, results))
+        for rank in range(opts['num_workers'])
+    ]
+    for worker in workers:
+        worker.start()
+    collective_results = []
+    while len(collective_results) < len(opts['collectives']):
+        # Exit codes are checked before reading a queue: data that a worker has put into
+        # a queue is flushed before the worker exits.
+        exit_codes = [worker.exitcode for worker in workers]
+        try:
+            collective_results.append(results.get(timeout=poll_interval))
+            continue
+        except Queue.Empty:
+            pass
+        if any(code is not None and code != 0 for code in exit_codes) or \
+           all(code is not None for code in exit_codes):
+            break
+    if len(collective_results) < len(opts['collectives']):
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+        error = "Worker processes have failed (exit codes: %s)." % str([worker.exitcode for worker in workers])
+        reported = set(result[0] for result in collective_results)
+        collective_results.extend(
+            (collective, [], error) for collective in opts['collectives'] if collective not in reported
+        )
+    for worker in workers:
+        worker.join()
+    return collective_results
+
+
+def run_gloo(opts):
+    """Runs gloo benchmarks in `num_workers` local processes.
+
+    :return: List of (collective, times, error) tuples.
+    :raises ImportError: If PyTorch or its gloo backend is not available.
+    """
+    # Fail in this process if a backend is not available - workers cannot report it.
+    import torch.distributed as dist
+    if not dist.is_available() or not getattr(dist, 'is_gloo_available', lambda: True)():
+        raise ImportError("torch.distributed with gloo backend is not available")
+    return run_local_workers(torch_worker, opts)
+
+
+def kvstore_allreduce(kvstore, arrays, opts):
+    """Benchmarks push/pull on a kvstore.
+
+    :param obj kvstore: MXNet kvstore.
+    :param callable arrays: A function that returns a list of NDArrays (one per device)
+                            for a message size.
+    :param dict opts: Benchmark options.
+    :return: List of average times of push/pull, seconds.
+    """
+    import mxnet as mx
+    times = []
+    for key, size in enumerate(opts['sizes']):
+        values = arrays(size)
+        kvstore.init(key, values[0])
+        for _ in range(opts['warmup_iterations']):
+            kvstore.push(key, values)
+            kvstore.pull(key, out=values)
+        mx.nd.waitall()
+        num_iterations = get_num_iterations(size, opts['iterations'])
+        start_time = timeit.default_timer()
+        for _ in range(num_iterations):
+            kvstore.push(key, values)
+            kvstore.pull(key, out=values)
+        mx.nd.waitall()
+        times.append((timeit.default_timer() - start_time) / num_iterations)
+    return times
+
+
+def run_kvstore_local(opts):
+    """Runs MXNet 'local' kvstore benchmark (one process, one CPU context per worker).
+
+    :return: List of (collective, times, error) tuples.
+    """
+    import mxnet as mx
+    kvstore = mx.kv.create('local')
+
+    def _arrays(size):
+        return [mx.nd.ones((max(1, size // 4),), ctx=mx.cpu(idx)) for idx in range(opts['num_workers'])]
+    return [('allreduce', kvstore_allreduce(kvstore, _arrays, opts), None)]
+
+
+def kvstore_dist_worker(opts):
+    """Entry point of a worker process in a `dist_sync` kvstore benchmark.
+
+    Worker 0 prints times as a JSON object to standard output.
+    """
+    import mxnet as mx
+    kvstore = mx.kv.create('dist_sync')
+
+    def _arrays(size):
+        return [mx.nd.ones((max(1, size // 4),), ctx=mx.cpu())]
+    times = kvstore_allreduce(kvstore, _arrays, opts)
+    if kvstore.rank == 0:
+        print("__collective_times__=%s" % json.dumps(times))
+        sys.stdout.flush()
+
+
+def run_kvstore_dist_sync(opts):
+    """Runs MXNet 'dist_sync' kvstore benchmark on a local host.
+
+    A scheduler, `num_workers` servers and `num_workers` workers are started as separate
+    processes that communicate over localhost.
+
+    :return: List of (collective, times, error) tuples.
+    """
+    env = dict(os.environ, DMLC_PS_ROOT_URI='127.0.0.1', DMLC_PS_ROOT_PORT=str(opts['port']),
+               DMLC_NUM_SERVER=str(opts['num_workers']), DMLC_NUM_WORKER=str(opts['num_workers']))
+    # Importing mxnet in a scheduler or server process starts a kvstore server.
+    agents = [subprocess.Popen([sys.executable, '-c', 'import mxnet'], env=dict(env, DMLC_ROLE='scheduler'))]
+    agents.extend(
+        subprocess.Popen([sys.executable, '-c', 'import mxnet'], env=dict(env, DMLC_ROLE='server'))
+        for _ in range(opts['num_workers'])
+    )
+    worker_args = [sys.executable, '-m', 'dlbs.bench.collectives', '--kvstore_worker',
+                   '--min_bytes', str(opts['min_bytes']), '--max_bytes', str(opts['max_bytes']),
+                   '--iterations', str(opts['iterations']),
+                   '--warmup_iterations', str(opts['warmup_iterations'])]
+    workers = [
+        subprocess.Popen(worker_args, env=dict(env, DMLC_ROLE='worker'), stdout=subprocess.PIPE)
+        for _ in range(opts['num_workers'])
+    ]
+    times, error = [], "No results have been reported by kvstore workers."
+    for worker in workers:
+        output = worker.communicate()[0].decode('utf-8')
+        for line in output.splitlines():
+            if line.startswith('__collective_times__='):
+                times, error = json.loads(line[len('__collective_times__='):]), None
+    for agent in agents:
+        agent.wait()
+    return [('allreduce', times, error)]
+
+
+def main():
+    """Entry point when invoking this script from a command line."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--backend', type=str, required=False, default='gloo', choices=BACKENDS,
+                        help="Communication backend.")
+    parser.add_argument('--num_workers', '--num-workers', type=int, required=False, default=2,
+                        help="Number of workers (local processes or, for kvstore_local, CPU contexts).")
+    parser.add_argument('--collectives', nargs='*', required=False, default=COLLECTIVES, choices=COLLECTIVES,
+                        help="Collectives to benchmark (kvstore backends only support allreduce).")
+    parser.add_argument('--min_bytes', '--min-bytes', type=str, required=False, default='1KB',
+                        help="Minimal message size (B, KB, MB or GB suffixes are supported).")
+    parser.add_argument('--max_bytes', '--max-bytes', type=str, required=False, default='1GB',
+                        help="Maximal message size (B, KB, MB or GB suffixes are supported).")
+    parser.add_argument('--iterations', type=int, required=False, default=20,
+                        help="Number of benchmark iterations per message size. Messages larger than "
+                             "64MB use proportionally smaller number of iterations.")
+    parser.add_argument('--warmup_iterations', '--warmup-iterations', type=int, required=False, default=5,
+                        help="Number of warmup iterations per message size.")
+    parser.add_argument('--port', type=int, required=False, default=29600,
+                        help="Rendezvous port on localhost.")
+    parser.add_argument('--log_dir', '--log-dir', type=str, required=False, default=None,
+                        help="If present, write results of every collective into "
+                             "${log_dir}/${backend}_${collective}_${num_workers}.log, else print them.")
+    parser.add_argument('--kvstore_worker', '--kvstore-worker', required=False, default=False,
+                        action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    opts = vars(args)
+    opts['sizes'] = get_message_sizes(parse_size(args.min_bytes), parse_size(args.max_bytes))
+    if args.kvstore_worker:
+        kvstore_dist_worker(opts)
+        return
+    if args.backend.startswith('kvstore'):
+        opts['collectives'] = ['allreduce']
+    runners = {'gloo': run_gloo, 'kvstore_local': run_kvstore_local, 'kvstore_dist_sync': run_kvstore_dist_sync}
+    try:
+        collective_results = runners[args.backend](opts)
+    except ImportError as err:
+        collective_results = [(collective, [], "Backend is not available (%s)." % str(err))
+                              for collective in opts['collectives']]
+    if args.log_dir and not os.path.isdir(args.log_dir):
+        os.makedirs(args.log_dir)
+    for collective, times, error in collective_results:
+        results = None
+        if error is None:
+            results = get_results(collective, args.num_workers, opts['sizes'], times)
+        if args.log_dir:
+            log_file = os.path.join(args.log_dir, '%s_%s_%d.log' % (args.backend, collective, args.num_workers))
+            with open(log_file, 'w') as file_obj:
+                write_log(file_obj, args.backend, collective, args.num_workers, results, error)
+        else:
+            write_log(sys.stdout, args.backend, collective, args.num_workers, results, error)
+
+
+if __name__ == "__main__":
+    main()
@@ -14,13 +14,42 @@
 """Various tools for ImageNet dataset that are used to assist generate
    framework-specific datasets. This file MUST NOT import framework-specific
    modules since it can be used in host OS.
+
+   Scanning ImageNet directory may take a lot of time, in particular, on network file
+   systems. A manifest - a CSV file with relative path, size, synset and label of every
+   image - can be built once with `build_manifest` command. A manifest can be stored
+   anywhere (e.g. if ImageNet directory is read only) and is passed to tools explicitly,
+   by default it is `dlbs_manifest.csv` in ImageNet directory. The first line of a
+   manifest contains modification times of class directories. If class directories have
+   been added, removed or modified (files added or removed), a manifest is stale and
+   tools scan ImageNet directory instead. The `update_manifest` command rebuilds a
+   manifest only if it does not exist or is stale:
+   $ python imagenet_tools.py build_manifest /path/to/imagenet [/path/to/dlbs_manifest.csv]
+   $ python imagenet_tools.py update_manifest /path/to/imagenet [/path/to/dlbs_manifest.csv]
+   $ python imagenet_tools.py build_caffe_labels /path/to/imagenet /path/to/caffe_labels.txt [/path/to/dlbs_manifest.csv]
 """
 import os
 import sys
 import gzip
 import json
 import random
+import fnmatch
+from multiprocessing.pool import ThreadPool
 from dlbs.utils import IOUtils
+try:
+    from os import scandir
+except ImportError:
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
+# Default name of a manifest file in ImageNet directory.
+MANIFEST_FILE = 'dlbs_manifest.csv'
+# Prefix of the first line of a manifest that contains state of class directories.
+MANIFEST_HEADER = '#dlbs_manifest '
+# Number of threads scanning class directories.
+NUM_SCAN_THREADS = 16
 
 class ImageNetTools(object):
     """Various framework-independent tools to process ImageNet and prepare files
@@ -42,12 +71,174 @@ class ImageNetTools(object):
         return labels
 
     @staticmethod
-    def get_image_files(folder, shuffle=True, num_files=-1):
+    def scan_dir(folder, pattern='*.JPEG'):
+        """Recursively finds files matching pattern in a folder.
+           :rtype: list
+           :return: List of tuples (file path, file size).
+        """
+        files = []
+        if scandir is not None:
+            for entry in scandir(folder):
+                if entry.is_dir():
+                    files.extend(ImageNetTools.scan_dir(entry.path, pattern))
+                elif fnmatch.fnmatch(entry.name, pattern):
+                    files.append((entry.path, entry.stat().st_size))
+        else:
+            for name in os.listdir(folder):
+                path = os.path.join(folder, name)
+                if os.path.isdir(path):
+                    files.extend(ImageNetTools.scan_dir(path, pattern))
+                elif fnmatch.fnmatch(name, pattern):
+                    files.append((path, os.path.getsize(path)))
+        return files
+
+    @staticmethod
+    def get_class_dirs(imagenet_dir):
+        """Returns state of class directories in ImageNet directory.
+           :param str imagenet_dir: ImageNet directory with synset subdirectories.
+           :rtype: dict
+           :return: Dictionary that maps class directory name to its modification time.
+                    Modification time changes when files are added to or removed from
+                    a directory.
+        """
+        class_dirs = {}
+        for name in os.listdir(imagenet_dir):
+            path = os.path.join(imagenet_dir, name)
+            if os.path.isdir(path):
+                class_dirs[name] = os.path.getmtime(path)
+        return class_dirs
+
+    @staticmethod
+    def build_manifest(imagenet_dir, manifest_file=None, num_threads=NUM_SCAN_THREADS):
+        """Scans ImageNet directory and builds list of images. Class directories are
+           scanned in parallel threads.
+           :param str imagenet_dir: ImageNet directory with synset subdirectories.
+           :param str manifest_file: If not None, write manifest into this file. The
+                                     first line is a header with state of class
+                                     directories (see `get_class_dirs`), every other
+                                     line is 'relative_path,size,synset,label'. Label
+                                     is -1 for unknown synsets.
+           :param int num_threads: Number of threads.
+           :rtype: list
+           :return: List of tuples (file path, file size, synset, label) sorted by path.
+        """
+        labels = ImageNetTools.get_labels()
+        # State is captured before scanning, so that changes made during scanning make
+        # this manifest stale.
+        class_dirs_state = ImageNetTools.get_class_dirs(imagenet_dir)
+        class_dirs = sorted(os.path.join(imagenet_dir, name) for name in class_dirs_state)
+        pool = ThreadPool(max(1, min(num_threads, len(class_dirs))))
+        scanned = pool.map(ImageNetTools.scan_dir, class_dirs)
+        pool.close()
+        images = []
+        for files in scanned:
+            for path, size in files:
+                synset = os.path.basename(os.path.dirname(path))
+                label = labels[synset]['label'] if synset in labels else -1
+                images.append((path, size, synset, label))
+        images.sort()
+        if manifest_file is not None:
+            IOUtils.mkdirf(manifest_file)
+            with open(manifest_file, 'w') as fobj:
+                fobj.write("%s%s\n" % (MANIFEST_HEADER, json.dumps({'class_dirs': class_dirs_state}, sort_keys=True)))
+                for path, size, synset, label in images:
+                    fobj.write("%s,%d,%s,%d\n" % (os.path.relpath(path, imagenet_dir), size, synset, label))
+        return images
+
+    @staticmethod
+    def load_manifest(imagenet_dir, manifest_file):
+        """Loads manifest built with `build_manifest`.
+           :param str imagenet_dir: ImageNet directory, paths in a manifest are relative
+                                    to this directory.
+           :param str manifest_file: Manifest file.
+           :rtype: list
+           :return: List of tuples (file path, file size, synset, label).
+        """
+        images = []
+        with open(manifest_file, 'r') as fobj:
+            for line in fobj:
+                if line.startswith('#'):
+                    continue
+                path, size, synset, label = line.rstrip('\n').rsplit(',', 3)
+                images.append((os.path.join(imagenet_dir, path), int(size), synset, int(label)))
+        return images
+
+    @staticmethod
+    def is_manifest_valid(imagenet_dir, manifest_file):
+        """Checks that a manifest exists and is up to date.
+
+           A manifest is valid if class directories and their modification times are
+           the same as when this manifest was built. Manifests without a header are
+           considered stale.
+           :param str imagenet_dir: ImageNet directory with synset subdirectories.
+           :param str manifest_file: Manifest file.
+           :rtype: bool
+        """
+        if not os.path.isfile(manifest_file):
+            return False
+        with open(manifest_file, 'r') as fobj:
+            header = fobj.readline()
+        if not header.startswith(MANIFEST_HEADER):
+            return False
+        try:
+            class_dirs = json.loads(header[len(MANIFEST_HEADER):])['class_dirs']
+        except (ValueError, KeyError):
+            return False
+        return class_dirs == ImageNetTools.get_class_dirs(imagenet_dir)
+
+    @staticmethod
+    def get_manifest(imagenet_dir, manifest_file=None):
+        """Returns list of images in ImageNet directory. Manifest is loaded if it exists
+           and is valid (see `is_manifest_valid`), else ImageNet directory is scanned.
+           :param str imagenet_dir: ImageNet directory with synset subdirectories.
+           :param str manifest_file: Manifest file. If None, `dlbs_manifest.csv` in
+                                     ImageNet directory is used.
+           :rtype: list
+           :return: List of tuples (file path, file size, synset, label).
+        """
+        if manifest_file is None:
+            manifest_file = os.path.join(imagenet_dir, MANIFEST_FILE)
+        if ImageNetTools.is_manifest_valid(imagenet_dir, manifest_file):
+            return ImageNetTools.load_manifest(imagenet_dir, manifest_file)
+        if os.path.isfile(manifest_file):
+            print("[WARNING] Manifest file (%s) is stale, scanning ImageNet directory (%s)." %
+                  (manifest_file, imagenet_dir))
+        return ImageNetTools.build_manifest(imagenet_dir)
+
+    @staticmethod
+    def update_manifest(imagenet_dir, manifest_file=None):
+        """Builds a manifest if it does not exist or is stale.
+           :param str imagenet_dir: ImageNet directory with synset subdirectories.
+           :param str manifest_file: Manifest file. If None, `dlbs_manifest.csv` in
+                                     ImageNet directory is used.
+        """
+        if manifest_file is None:
+            manifest_file = os.path.join(imagenet_dir, MANIFEST_FILE)
+        if not ImageNetTools.is_manifest_valid(imagenet_dir, manifest_file):
+            ImageNetTools.build_manifest(imagenet_dir, manifest_file)
+
+    @staticmethod
+    def get_images(folder, shuffle=True, num_files=-1, manifest_file=None):
+        """ Get images in folder. Shuffle images and return at most num_files
+            images. Manifest file is passed to `get_manifest`.
+            :rtype: list
+            :return: List of tuples (file path, file size, synset, label).
+        """
+        images = ImageNetTools.get_manifest(folder, manifest_file)
+        # Shuffle images and return first 'num_files' images.
+        if shuffle:
+            random.shuffle(images)
+        if num_files > 0 and num_files < len(images):
+            images = images[0:num_files]
+        return images
+
+    @staticmethod
+    def get_image_files(folder, shuffle=True, num_files=-1, manifest_file=None):
         """ Get *.JPEG files in folder. Shuffle files and return at most num_files
             files.
         """
-        # Scan the folder recursively and find files.
-        files = IOUtils.find_files(folder, '*.JPEG', recursively=True)
+        # Load manifest or scan the folder recursively and find files.
+        files = [image[0] for image in ImageNetTools.get_manifest(folder, manifest_file)]
         # Shuffle files and return first 'num_files' files.
         if shuffle:
             random.shuffle(files)
@@ -65,7 +256,13 @@ class ImageNetTools(object):
         return synset, fname, labels[synset]
 
     @staticmethod
-    def build_caffe_labels(imagenet_dir, labels_file):
+    def check_label(synset, label):
+        """Raises ValueError if image has unknown synset (label is -1)."""
+        if label < 0:
+            raise ValueError("Invalid synset '%s: not found in labels dict." % synset)
+
+    @staticmethod
+    def build_caffe_labels(imagenet_dir, labels_file, manifest_file=None):
         """Generates a textual file with the following content:
            img_0000.jpeg 1
            img_0001.jpeg 0
@@ -73,15 +270,14 @@ class ImageNetTools(object):
            mapping image file name to its class label
         """
         IOUtils.mkdirf(labels_file)
-        img_files = ImageNetTools.get_image_files(imagenet_dir)
-        labels = ImageNetTools.get_labels()
+        images = ImageNetTools.get_images(imagenet_dir, manifest_file=manifest_file)
         with open(labels_file, 'w') as fobj:
-            for img_file in img_files:
-                synset, fname, finfo = ImageNetTools.get_file_info(img_file, labels)
-                fobj.write("%s/%s %d\n" % (synset, fname, finfo['label']))
+            for img_file, _, synset, label in images:
+                ImageNetTools.check_label(synset, label)
+                fobj.write("%s/%s %d\n" % (synset, os.path.basename(img_file), label))
 
     @staticmethod
-    def build_mxnet_labels(imagenet_dir, labels_file):
+    def build_mxnet_labels(imagenet_dir, labels_file, manifest_file=None):
         """Generates a textual file with the following content:
            0   45  n02093256/n02093256_3032.JPEG
            1   45  n02093256/n02093256_3353.JPEG
@@ -89,12 +285,11 @@ class ImageNetTools(object):
            image_index   image_class_label   image_path
         """
         IOUtils.mkdirf(labels_file)
-        img_files = ImageNetTools.get_image_files(imagenet_dir)
-        labels = ImageNetTools.get_labels()
+        images = ImageNetTools.get_images(imagenet_dir, manifest_file=manifest_file)
         with open(labels_file, 'w') as fobj:
-            for img_index, img_file in enumerate(img_files):
-                synset, fname, finfo = ImageNetTools.get_file_info(img_file, labels)
-                fobj.write("%d\t%d\t%s/%s\n" % (img_index, finfo['label'], synset, fname))
+            for img_index, (img_file, _, synset, label) in enumerate(images):
+                ImageNetTools.check_label(synset, label)
+                fobj.write("%d\t%d\t%s/%s\n" % (img_index, label, synset, os.path.basename(img_file)))
 
     @staticmethod
     def build_tensorflow_synsets(imagenet_dir, synset_file):
@@ -118,10 +313,17 @@ class ImageNetTools(object):
 if __name__ == '__main__':
     num_args = len(sys.argv)
     if num_args > 1:
-        if sys.argv[1] == 'build_caffe_labels' and num_args == 4:
-            ImageNetTools.build_caffe_labels(sys.argv[2], sys.argv[3])
-        if sys.argv[1] == 'build_mxnet_labels' and num_args == 4:
-            ImageNetTools.build_mxnet_labels(sys.argv[2], sys.argv[3])
+        if sys.argv[1] == 'build_manifest' and num_args in (3, 4):
+            ImageNetTools.build_manifest(
+                sys.argv[2],
+                sys.argv[3] if num_args == 4 else os.path.join(sys.argv[2], MANIFEST_FILE)
+            )
+        if sys.argv[1] == 'update_manifest' and num_args in (3, 4):
+            ImageNetTools.update_manifest(sys.argv[2], sys.argv[3] if num_args == 4 else None)
+        if sys.argv[1] == 'build_caffe_labels' and num_args in (4, 5):
+            ImageNetTools.build_caffe_labels(sys.argv[2], sys.argv[3], sys.argv[4] if num_args == 5 else None)
+        if sys.argv[1] == 'build_mxnet_labels' and num_args in (4, 5):
+            ImageNetTools.build_mxnet_labels(sys.argv[2], sys.argv[3], sys.argv[4] if num_args == 5 else None)
         if sys.argv[1] == 'build_tensorflow_synsets' and num_args == 4:
             ImageNetTools.build_tensorflow_synsets(sys.argv[2], sys.argv[3])
         if sys.argv[1] == 'build_tensorflow_human_labels' and num_args == 4:
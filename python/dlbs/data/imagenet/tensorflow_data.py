@@ -1,14 +1,27 @@
 """
 This file generates a simple benchmark dataset similar to the one used by Caffe.
 It's based on Google's build_imagenet_data.py file.
+
+Shards are converted by a pool of worker processes. Images are decoded, center cropped
+and resized with PIL/NumPy, TensorFlow is only used (on CPU) to serialize examples.
+Shards are balanced by total size of input files. Each shard is written into a
+temporary file that is renamed once the shard is complete, so, if this tool is
+restarted with the same parameters, shards that already exist are skipped.
 """
+from __future__ import print_function
+from __future__ import division
 import os
 import json
 import random
 import gzip
+import heapq
+import timeit
 import multiprocessing
 import argparse
-from dlbs.utils import IOUtils
+from dlbs.data.imagenet.imagenet_tools import ImageNetTools
+
+# Seed used to shuffle files. List of files must be the same across restarts.
+SHUFFLE_SEED = 1
 
 class Filesystem(object):
     @staticmethod
@@ -25,19 +38,22 @@ class Filesystem(object):
         with gzip.open(labels_file, 'rb') as file_obj:
             labels = json.load(file_obj)
         return labels
-    
+
     @staticmethod
-    def get_image_files(folder, num_files=-1):
-        """ Get *.JPEG files in folder. Shuffle files and return at most num_files
-            files.
+    def get_images(folder, num_files=-1, manifest_file=None):
+        """ Get images in folder. Shuffle images and return at most num_files
+            images. Images are shuffled with a fixed seed, so that the same images are
+            returned every time. Images are loaded from a manifest file if it exists
+            and is valid (see imagenet_tools.py).
+            :rtype: list
+            :return: List of tuples (file path, file size, synset, label).
         """
-        # Scan the folder recursively and find files.
-        files = IOUtils.find_files(folder, '*.JPEG', recursively=True)
-        # Shuffle files and return first 'num_files' files.
-        random.shuffle(files)
-        if num_files > 0 and num_files < len(files):
-            files = files[0:num_files]
-        return files
+        images = sorted(ImageNetTools.get_manifest(folder, manifest_file))
+        # Shuffle images and return first 'num_files' images.
+        random.Random(SHUFFLE_SEED).shuffle(images)
+        if num_files > 0 and num_files < len(images):
+            images = images[0:num_files]
+        return images
 
 
 def get_meta_file_metainfo(img_file, labels):
@@ -51,101 +67,123 @@ def get_meta_file_metainfo(img_file, labels):
     return (synset, labels[synset]['label'], str(labels[synset]['human_labels']))
 
 
-def shard_files(files, num_shards, num_workers):
-    """Split list of files ('files') into 'num_shards' shards of approximately equal
-       size and assign those shards to 'num_workers' workers.
-       :rtype: List of shard indices grouped by workers.
-       :return: [[(),(),()],[(),(),()],[(),(),()]]
-                   worker1   worker2     worker3
-                () is a tuple of shard indices [first_index, last_index) for 'files'
-                list.
+def shard_files(images, num_shards):
+    """Split list of images ('images') into 'num_shards' shards of approximately equal
+       total size in bytes. Every image is a tuple (file path, file size, ...).
+       Files are assigned, in order, to a shard with the smallest total size, so the
+       difference between shards does not exceed size of the largest file and the
+       order of files within shards is preserved.
+       :rtype: list
+       :return: List of shards where each shard is a list of file names.
     """
-    num_files = len(files)
-    # Compute shard index ranges. The ranges is [(), (), (), ..., ()]
-    num_files_per_shard = num_files / num_shards
-    shards = [None] * num_shards
-    for shard_id in xrange(num_shards):
-        shards[shard_id] = (num_files_per_shard*shard_id, num_files_per_shard*(shard_id+1))
-    shards[-1] = (shards[-1][0], num_files)
-    assert len(shards) == num_shards,\
-           "Condition 'len(shards) == num_shards' failed (%d == %d) (shards: %s)" % (len(shards), num_shards, str(shards))
-
-    # Here, we know that num_shards % num_workers is 0
-    num_shards_per_worker = num_shards / num_workers
-    shards = [shards[i:i+num_shards_per_worker] for i in xrange(0, len(shards), num_shards_per_worker)]
-    assert len(shards) == num_workers,\
-           "Condition 'len(shards) == num_workers' failed (%d == %d)" % (len(shards), num_workers)
-    
+    shards = [[] for _ in range(num_shards)]
+    heap = [(0, shard_id) for shard_id in range(num_shards)]
+    for image in images:
+        num_bytes, shard_id = heapq.heappop(heap)
+        shards[shard_id].append(image[0])
+        heapq.heappush(heap, (num_bytes + image[1], shard_id))
     return shards
 
 
-def create_tfrecord(files, shards, labels, worker_id, tfrecords_folder,
-                    num_shards, num_workers, target_size=255):
-    """A worker function. Worker needs to process shards 'shards' that define
-       images in 'files' list.
-
-       :param list files: List of all file names.
-       :param list shards: List of shard indices to process by this worker
-       :param dict labels: A dictionary that maps synset to labels
-       :param in worker_id: Integer index of the worker. This also corresponds to
-                            GPU index this worker will use.
-       :param str tfrecords_folder: Folder to serialize tfrecord files.
-       :param int num_shards: Total number of shards for all workers.
-       :param int num_workers: Number of workers.
-       :param int target_size: Target image size.
+def decode_image(img_file, target_size=255):
+    """Decode image, crop it relative to center along smallest dimension and resize
+       to (target_size, target_size).
+       PNG and CMYK JPEG files found in ImageNet are converted to RGB by PIL.
+       :rtype: numpy.ndarray
+       :return: Array of shape (target_size, target_size, 3) of type uint8.
+    """
+    import numpy as np
+    from PIL import Image
+    image = Image.open(img_file).convert('RGB')
+    width, height = image.size
+    crop_size = min(width, height)
+    left, top = (width - crop_size) // 2, (height - crop_size) // 2
+    image = image.crop((left, top, left + crop_size, top + crop_size))
+    image = image.resize((target_size, target_size), Image.BILINEAR)
+    return np.asarray(image, dtype=np.uint8)
+
+
+def get_tfrecord_file(tfrecords_folder, shard_index, num_shards):
+    """Return name of a tfrecord file for a shard."""
+    return os.path.join(tfrecords_folder, 'train-%.5d-of-%.5d' % (shard_index, num_shards))
+
+
+def create_tfrecord(task):
+    """A worker function that converts one shard.
+
+       :param dict task: A shard to convert with the following fields: `files` (list of
+                         image files), `labels` (a dictionary that maps synset to labels),
+                         `shard_index`, `num_shards`, `tfrecords_folder` and `target_size`.
+       :rtype: tuple
+       :return: Tuple of (shard index, number of images, number of bytes read, number of
+                bytes written). Number of images is 0 if shard already exists.
     """
-    from dlbs.data.imagenet.tensorflow_worker import ImageCoder
+    tfrecord_file = get_tfrecord_file(task['tfrecords_folder'], task['shard_index'], task['num_shards'])
+    if os.path.exists(tfrecord_file):
+        return (task['shard_index'], 0, 0, 0)
+    # Only CPU is used to serialize examples.
+    os.environ['CUDA_VISIBLE_DEVICES'] = ''
     from dlbs.data.imagenet.tensorflow_worker import TFRecord
     import tensorflow as tf
-    
-    coder = ImageCoder(worker_id, target_size)
-    for idx, shard in enumerate(shards):
-        shard_index = (num_shards / num_workers)*worker_id + idx
-        tfrecord_file = os.path.join(
-            tfrecords_folder,
-            'train-%.5d-of-%.5d' % (shard_index, num_shards)
+
+    bytes_read = 0
+    temp_file = tfrecord_file + '.tmp'
+    writer = tf.python_io.TFRecordWriter(temp_file)
+    for img_file in task['files']:
+        synset, label, human_label = get_meta_file_metainfo(img_file, task['labels'])
+        image = decode_image(img_file, task['target_size'])
+        bytes_read += os.path.getsize(img_file)
+        example = TFRecord.convert_to_example(
+            img_file,
+            image,
+            label,
+            synset,
+            human_label,
+            height=image.shape[0],
+            width=image.shape[1]
         )
-        writer = tf.python_io.TFRecordWriter(tfrecord_file)
-        for img_file in files[shard[0]:shard[1]]:
-            synset, label, human_label = get_meta_file_metainfo(img_file, labels)
-            image = coder.decode_file(img_file)
-            example = TFRecord.convert_to_example(
-                img_file,
-                image,
-                label,
-                synset,
-                human_label,
-                height=image.shape[0],
-                width=image.shape[1]
-            )
-            writer.write(example.SerializeToString())
+        writer.write(example.SerializeToString())
+    writer.close()
+    os.rename(temp_file, tfrecord_file)
+    return (task['shard_index'], len(task['files']), bytes_read, os.path.getsize(tfrecord_file))
 
 
 def main(images_folder, num_images, num_shards, tfrecords_folder,
-         num_workers=1, target_size=255):
-    #
-    assert num_shards % num_workers == 0, "num_shards % num_workers must be 0"
+         num_workers=1, target_size=255, manifest_file=None):
     # Make sure 'tfrecords_folder' exists
     if not os.path.exists(tfrecords_folder):
         os.makedirs(tfrecords_folder)
     # Load labels
     labels = Filesystem.get_labels()
     # Get image files
-    files = Filesystem.get_image_files(images_folder, num_images)
-    shards = shard_files(files, num_shards, num_workers)
-    print ("Shards: %s" % str(shards))
-    # Start job processes
-    workers = [None]*num_workers
-    for worker_id in xrange(num_workers):
-        workers[worker_id] = multiprocessing.Process(
-            target=create_tfrecord,
-            args=(files, shards[worker_id], labels, worker_id, tfrecords_folder,
-                  num_shards, num_workers, target_size)
-        )
-        workers[worker_id].start()
-    # Wait for completion
-    for worker in workers:
-        worker.join()
+    images = Filesystem.get_images(images_folder, num_images, manifest_file)
+    shards = shard_files(images, num_shards)
+    tasks = [{
+        'files': shard, 'labels': labels, 'shard_index': shard_index, 'num_shards': num_shards,
+        'tfrecords_folder': tfrecords_folder, 'target_size': target_size
+    } for shard_index, shard in enumerate(shards)]
+    # Run worker processes
+    num_images, bytes_read, bytes_written = 0, 0, 0
+    start = timeit.default_timer()
+    pool = multiprocessing.Pool(max(1, num_workers))
+    for shard_index, shard_images, shard_read, shard_written in pool.imap_unordered(create_tfrecord, tasks):
+        if shard_images == 0:
+            print("Shard %d of %d exists, skipping." % (shard_index, num_shards))
+            continue
+        num_images += shard_images
+        bytes_read += shard_read
+        bytes_written += shard_written
+        elapsed = timeit.default_timer() - start
+        print("Shard %d of %d done (%d images). Total: %d images, %.2f images/sec, %.2f MB/sec read, "
+              "%.2f MB/sec written." % (shard_index, num_shards, shard_images, num_images,
+                                        num_images / elapsed, bytes_read / 1e6 / elapsed,
+                                        bytes_written / 1e6 / elapsed))
+    pool.close()
+    pool.join()
+    elapsed = timeit.default_timer() - start
+    print("Converted %d images (%.2f MB -> %.2f MB) in %.2f seconds." % (
+        num_images, bytes_read / 1e6, bytes_written / 1e6, elapsed
+    ))
 
 
 if __name__ == '__main__':
@@ -169,8 +207,8 @@ if __name__ == '__main__':
     )
     parser.add_argument(
         '--num_workers', type=int, required=False, default=1,
-        help="Number of workers to process images. Must be less or equal to the number of GPUs. "
-             "Also, num_shards % num_workers must be 0."
+        help="Number of worker processes. Each worker converts one shard at a time. "
+             "Workers do not use GPUs."
     )
     parser.add_argument(
         '--img_size', type=int, required=False, default=256,
@@ -179,9 +217,14 @@ if __name__ == '__main__':
              "value and (4) casted back to uint8 data type. So, examples will contain 3D tensors "
              "of shape (img_size, img_size, 3) of type uint8 encoded as byte arrays."
     )
+    parser.add_argument(
+        '--manifest_file', type=str, required=False, default=None,
+        help="Manifest file (see imagenet_tools.py). Default is dlbs_manifest.csv in input directory."
+    )
     args = parser.parse_args()
-    
+
     main(images_folder=args.input_dir, num_images=args.num_images,
          num_shards=args.num_shards, tfrecords_folder=args.output_dir,
-         num_workers=args.num_workers, target_size=args.img_size
+         num_workers=args.num_workers, target_size=args.img_size,
+         manifest_file=args.manifest_file
     )
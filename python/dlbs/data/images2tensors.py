@@ -0,0 +1,167 @@
+# (c) Copyright [2017] Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Converts images (JPEGs) into tensors datasets.
+
+This is a Python version of the TensorRT ``images2tensors`` tool (see
+``src/tensorrt/docs/images2tensors.md``) that does not require TensorRT/OpenCV. Images
+are resized to [3, size, size] and are stored as raw ``uchar`` or ``float`` arrays with
+no meta information. PyTorch and MXNet backends read these datasets with
+``data_backend=tensors``, so that storage throughput can be benchmarked separately
+from JPEG decoding and preprocessing.
+
+If ``--images_per_file`` is 1, directory structure of input files is replicated. Else,
+output files are named ``images-${shard}-${fileid}.tensors`` where shard is a worker
+index.
+
+Usage:
+
+>>> python images2tensors.py --input_dir=/mnt/data/imagenet100k/jpegs \\
+>>>                          --output_dir=/mnt/data/imagenet100k/tensors \\
+>>>                          --size=227 --dtype=uchar --nthreads=5 --images_per_file=20000
+"""
+from __future__ import print_function
+from __future__ import division
+import os
+import random
+import timeit
+import argparse
+from multiprocessing import Pool
+import dlbs.python_version   # pylint: disable=unused-import
+from dlbs.utils import Modules
+
+if Modules.HAVE_NUMPY:
+    import numpy as np
+try:
+    from PIL import Image
+    HAVE_PIL = True
+except ImportError:
+    HAVE_PIL = False
+
+
+def get_image_files(input_dir, shuffle=False, num_images=-1):
+    """Returns image files (jpg, jpeg) in a directory and its subdirectories.
+
+    :param str input_dir: Input directory.
+    :param bool shuffle: If true, shuffle list of files.
+    :param int num_images: If positive, return at most this number of files.
+    :return: List of file names relative to input directory.
+    """
+    files = []
+    for root, _, file_names in os.walk(input_dir):
+        for file_name in file_names:
+            if file_name.lower().endswith(('.jpg', '.jpeg')):
+                files.append(os.path.relpath(os.path.join(root, file_name), input_dir))
+    files.sort()
+    if shuffle:
+        random.shuffle(files)
+    if 0 < num_images < len(files):
+        files = files[0:num_images]
+    return files
+
+
+def image_to_tensor(file_name, size, dtype):
+    """Loads image and converts it into array of shape [3, size, size].
+
+    :param str file_name: Image file name.
+    :param int size: Output image size.
+    :param str dtype: Output data type ('uchar' or 'float').
+    :return: Numpy array.
+    """
+    img = Image.open(file_name).convert('RGB').resize((size, size), Image.BILINEAR)
+    tensor = np.rollaxis(np.asarray(img, dtype=np.uint8), 2)
+    return tensor.astype(np.uint8 if dtype == 'uchar' else np.float32)
+
+
+def convert(task):
+    """Converts a list of images (one shard) into tensor files.
+
+    :param dict task: Task with `shard`, `files`, `input_dir`, `output_dir`, `size`,
+                      `dtype` and `images_per_file` fields.
+    :return: Tuple of (number of images, number of bytes written).
+    """
+    num_bytes = 0
+    files = task['files']
+    for file_idx, first in enumerate(range(0, len(files), task['images_per_file'])):
+        chunk = files[first:first + task['images_per_file']]
+        if task['images_per_file'] == 1:
+            output_file = os.path.join(task['output_dir'], chunk[0])
+        else:
+            output_file = os.path.join(task['output_dir'],
+                                       'images-%d-%d.tensors' % (task['shard'], file_idx))
+        output_dir = os.path.dirname(output_file)
+        if not os.path.isdir(output_dir):
+            try:
+                os.makedirs(output_dir)
+            except OSError:
+                # Another worker may have created it.
+                pass
+        with open(output_file, 'wb') as file_obj:
+            for file_name in chunk:
+                tensor = image_to_tensor(os.path.join(task['input_dir'], file_name),
+                                         task['size'], task['dtype'])
+                file_obj.write(tensor.tobytes())
+                num_bytes += tensor.nbytes
+    return (len(files), num_bytes)
+
+
+def main():
+    """Entry point when invoking this script from a command line."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--input_dir', '--input-dir', type=str, required=True,
+                        help="Input directory with images (jpg, jpeg), possibly, in subdirectories.")
+    parser.add_argument('--output_dir', '--output-dir', type=str, required=True,
+                        help="Output directory.")
+    parser.add_argument('--size', type=int, required=False, default=227,
+                        help="Resize images to this size. Output shape is [3, size, size].")
+    parser.add_argument('--dtype', type=str, required=False, default='uchar', choices=['uchar', 'float'],
+                        help="Data type of output tensors.")
+    parser.add_argument('--shuffle', required=False, default=False, action='store_true',
+                        help="Shuffle list of images.")
+    parser.add_argument('--nimages', type=int, required=False, default=0,
+                        help="If positive, convert only this number of images.")
+    parser.add_argument('--nthreads', type=int, required=False, default=1,
+                        help="Number of worker processes.")
+    parser.add_argument('--images_per_file', '--images-per-file', type=int, required=False, default=1,
+                        help="Number of images per output file.")
+    args = parser.parse_args()
+
+    if not Modules.HAVE_NUMPY or not HAVE_PIL:
+        print("This script needs Numpy (available=%s) and Pillow (available=%s)" % (Modules.HAVE_NUMPY, HAVE_PIL))
+        exit(1)
+
+    files = get_image_files(args.input_dir, args.shuffle, args.nimages)
+    num_shards = max(1, min(args.nthreads, len(files)))
+    tasks = [{
+        'shard': shard, 'files': files[shard::num_shards], 'input_dir': args.input_dir,
+        'output_dir': args.output_dir, 'size': args.size, 'dtype': args.dtype,
+        'images_per_file': max(1, args.images_per_file)
+    } for shard in range(num_shards)]
+    start = timeit.default_timer()
+    if num_shards == 1:
+        results = [convert(tasks[0])]
+    else:
+        pool = Pool(num_shards)
+        results = pool.map(convert, tasks)
+        pool.close()
+    elapsed = timeit.default_timer() - start
+    num_images = sum(result[0] for result in results)
+    num_bytes = sum(result[1] for result in results)
+    print("Converted %d images (%.2f MB) in %.2f seconds: %.2f images/sec, %.2f MB/sec." % (
+        num_images, num_bytes / 1e6, elapsed,
+        num_images / elapsed if elapsed > 0 else 0, num_bytes / 1e6 / elapsed if elapsed > 0 else 0
+    ))
+
+
+if __name__ == "__main__":
+    main()
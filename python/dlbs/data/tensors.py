@@ -0,0 +1,79 @@
+# (c) Copyright [2017] Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Reads and partitions tensors datasets created with ``images2tensors``.
+
+This module is shared by PyTorch and MXNet backends (``data_backend=tensors``). It
+depends on NumPy only, so that it can be mounted into benchmark containers as is.
+"""
+import os
+import numpy as np
+
+
+def open_tensors(data_dir, image_shape, dtype, mode='r'):
+    """Memory maps all files in a tensors dataset.
+
+    :param str data_dir: Dataset directory. Is scanned recursively.
+    :param tuple image_shape: Shape of one image (3, Size, Size).
+    :param dtype: Data type of images (np.uint8 or np.float32).
+    :param str mode: Memory map mode. Copy-on-write mode ('c') maps files read only
+                     and results in writable arrays.
+    :return: A list of memory mapped arrays of shape (N,) + image_shape.
+    :raises ValueError: If size of a file is not a multiple of image size. This usually
+                        means that image shape or data type does not match the dataset.
+    """
+    image_bytes = int(np.prod(image_shape)) * np.dtype(dtype).itemsize
+    files = []
+    for root, _, file_names in os.walk(data_dir):
+        for file_name in sorted(file_names):
+            file_path = os.path.join(root, file_name)
+            count, remainder = divmod(os.path.getsize(file_path), image_bytes)
+            if remainder != 0:
+                raise ValueError(
+                    "Size of '%s' is not a multiple of image size (%d bytes). Check that image shape "
+                    "%s and data type '%s' match the dataset." % (file_path, image_bytes,
+                                                                  str(tuple(image_shape)), np.dtype(dtype).name)
+                )
+            if count > 0:
+                files.append(np.memmap(file_path, dtype=dtype, mode=mode, shape=(count,) + tuple(image_shape)))
+    return files
+
+
+def partition_tensors(files, rank, world_size):
+    """Returns a contiguous shard of images in a tensors dataset.
+
+    Images are partitioned by their global index across all files, so that every rank
+    gets its own images even if a dataset is one file.
+
+    :param list files: Memory mapped arrays returned by :py:func:`open_tensors`.
+    :param int rank: Rank of this process.
+    :param int world_size: Number of processes.
+    :return: A list of arrays (views of memory mapped arrays) with images of this rank.
+    """
+    first, last = partition_range(sum(len(tensors) for tensors in files), rank, world_size)
+    shard = []
+    offset = 0
+    for tensors in files:
+        lower, upper = max(first, offset), min(last, offset + len(tensors))
+        if lower < upper:
+            shard.append(tensors[lower - offset:upper - offset])
+        offset += len(tensors)
+    return shard
+
+
+def partition_range(length, rank, world_size):
+    """Returns range [first, last) of a contiguous shard of a dataset for a rank.
+
+    Shards of all ranks have the same size plus/minus one example.
+    """
+    return (length * rank // world_size, length * (rank + 1) // world_size)
@@ -73,6 +73,7 @@ import math
 import dlbs.python_version   # pylint: disable=unused-import
 from dlbs.utils import DictUtils
 from dlbs.utils import IOUtils
+from dlbs.utils import Modules
 from dlbs.processor import Processor
 
 class LogParser(object):
@@ -109,6 +110,10 @@ class LogParser(object):
                 params.update(opts['_extended_params'])
                 Processor().compute_variables([params])
                 #params = params[0]
+            # Compute energy efficiency metrics if resource monitor was enabled
+            if Modules.HAVE_NUMPY and 'results.use.time' in params:
+                from dlbs.reports.energy import EnergyMetrics
+                params.update(EnergyMetrics.compute(params))
             # Identify is this benchmark succeeded of failed.
             succeeded = 'results.throughput' in params and \
                         isinstance(params['results.throughput'], (int, long, float)) and \
@@ -0,0 +1,229 @@
+# (c) Copyright [2017] Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Builds a static HTML dashboard with precomputed aggregates for large benchmark archives.
+
+Benchmarks are read once, in one pass, and are grouped by (model, framework, effective
+batch, number of GPUs). For every group and every metric, count, sum, minimum and
+maximum are accumulated, so memory does not depend on the number of benchmarks. Then
+aggregates are written into shards - one shard per model - and an index:
+
+* ``data/index.js`` Models (with shard file names), frameworks, batches, number of
+  GPUs and metrics.
+* ``data/<model>.js`` Rows ``[framework, batch, gpus, metric1, metric2, ...]`` where
+  every metric is ``[count, mean, min, max]`` or null.
+
+Shards are compact JSON objects wrapped into a ``DLBS.load(...)`` function call so that
+a browser can load them lazily from a local file system (``file://``) without a web
+server. The ``web/dashboard.html`` page is copied into the output directory.
+
+Usage:
+
+>>> python dashboard.py ./logs ./archive.json.gz --recursive --output-dir ./dashboard
+
+Then open ``./dashboard/index.html`` in a web browser.
+"""
+from __future__ import print_function
+from __future__ import division
+import os
+import re
+import json
+import shutil
+import logging
+import argparse
+from collections import defaultdict
+import dlbs.python_version   # pylint: disable=unused-import
+from dlbs.utils import IOUtils
+from dlbs.logparser import LogParser
+
+# Metrics that are aggregated by default.
+DEFAULT_METRICS = ['results.throughput', 'results.time', 'results.energy.images_per_joule']
+# Parse log files in chunks of this size.
+LOG_CHUNK_SIZE = 1000
+# Dashboard template, relative to DLBS root folder.
+DASHBOARD_TEMPLATE = os.path.join('web', 'dashboard.html')
+
+
+class Dashboard(object):
+    """Accumulates pivot aggregates and writes dashboard data shards."""
+
+    def __init__(self, metrics=None):
+        """Creates empty dashboard.
+
+        :param list metrics: Names of metrics (benchmark parameters) to aggregate.
+        """
+        self.metrics = metrics or DEFAULT_METRICS
+        # (model, framework, batch, gpus) -> list of [count, sum, min, max] or None
+        self.groups = {}
+        self.titles = {}
+        self.num_benchmarks = 0
+
+    @staticmethod
+    def get_key(benchmark):
+        """Returns pivot key for a benchmark or None if benchmark cannot be grouped.
+
+        :param dict benchmark: Benchmark parameters.
+        :return: Tuple of (model, framework, effective batch, number of GPUs) or None.
+        """
+        if 'exp.model' not in benchmark or 'exp.framework' not in benchmark:
+            return None
+        return (
+            str(benchmark['exp.model']),
+            str(benchmark['exp.framework']),
+            int(benchmark.get('exp.effective_batch', 0)),
+            int(benchmark.get('exp.num_gpus', 0))
+        )
+
+    def update(self, benchmark):
+        """Adds one benchmark to aggregates.
+
+        :param dict benchmark: Benchmark parameters.
+        """
+        key = Dashboard.get_key(benchmark)
+        if key is None:
+            return
+        self.num_benchmarks += 1
+        self.titles[key[0]] = benchmark.get('exp.model_title', key[0])
+        if key not in self.groups:
+            self.groups[key] = [None] * len(self.metrics)
+        stats = self.groups[key]
+        for idx, metric in enumerate(self.metrics):
+            value = benchmark.get(metric, None)
+            if not isinstance(value, (int, long, float)) or value <= 0:
+                continue
+            if stats[idx] is None:
+                stats[idx] = [1, value, value, value]
+            else:
+                stats[idx][0] += 1
+                stats[idx][1] += value
+                stats[idx][2] = min(stats[idx][2], value)
+                stats[idx][3] = max(stats[idx][3], value)
+
+    def get_shards(self):
+        """Returns aggregates grouped by model.
+
+        :return: Dictionary that maps model to a list of rows. Every row is
+                 [framework, batch, gpus, stat1, stat2, ...] where stat is
+                 [count, mean, min, max] or None.
+        """
+        shards = defaultdict(list)
+        for key in sorted(self.groups.keys()):
+            row = list(key[1:])
+            for stats in self.groups[key]:
+                if stats is None:
+                    row.append(None)
+                else:
+                    row.append([stats[0], round(stats[1] / stats[0], 4),
+                                round(stats[2], 4), round(stats[3], 4)])
+            shards[key[0]].append(row)
+        return shards
+
+    def get_index(self):
+        """Returns dashboard index - models, frameworks, batches, GPUs and metrics.
+
+        :rtype: dict
+        """
+        models = sorted(set(key[0] for key in self.groups))
+        return {
+            'num_benchmarks': self.num_benchmarks,
+            'metrics': self.metrics,
+            'models': [{'id': model, 'title': self.titles[model], 'shard': Dashboard.shard_name(model)}
+                       for model in models],
+            'frameworks': sorted(set(key[1] for key in self.groups)),
+            'batches': sorted(set(key[2] for key in self.groups)),
+            'gpus': sorted(set(key[3] for key in self.groups))
+        }
+
+    @staticmethod
+    def shard_name(model):
+        """Returns shard file name for a model."""
+        return re.sub(r'[^A-Za-z0-9_\-]', '_', model) + '.js'
+
+    @staticmethod
+    def write_shard(file_name, data):
+        """Writes JSON data wrapped into a `DLBS.load` call."""
+        with open(file_name, 'w') as file_obj:
+            file_obj.write('DLBS.load(%s);\n' % json.dumps(data, separators=(',', ':')))
+
+    def write(self, output_dir, template=None):
+        """Writes index, shards and dashboard HTML page into output directory.
+
+        :param str output_dir: Output directory.
+        :param str template: Dashboard HTML page. If None, default one is used.
+        """
+        data_dir = os.path.join(output_dir, 'data')
+        if not os.path.isdir(data_dir):
+            os.makedirs(data_dir)
+        index = self.get_index()
+        Dashboard.write_shard(os.path.join(data_dir, 'index.js'), {'name': 'index', 'data': index})
+        shards = self.get_shards()
+        for model in index['models']:
+            Dashboard.write_shard(os.path.join(data_dir, model['shard']),
+                                  {'name': model['id'], 'data': shards[model['id']]})
+        if template is None:
+            template = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                    '..', '..', '..', DASHBOARD_TEMPLATE)
+        shutil.copyfile(template, os.path.join(output_dir, 'index.html'))
+
+
+def iter_benchmarks(inputs, recursive=False):
+    """Iterates over benchmarks in log files, log directories and JSON files.
+
+    Log files are parsed in chunks so that an entire archive is never loaded into memory.
+
+    :param list inputs: List of log files, directories and JSON files.
+    :param bool recursive: Scan directories recursively.
+    """
+    logfiles = []
+    for input_path in inputs:
+        if os.path.isdir(input_path):
+            logfiles.extend(IOUtils.find_files(input_path, "*.log", recursive))
+        elif os.path.isfile(input_path) and input_path.endswith(('.json', '.json.gz')):
+            file_benchmarks = IOUtils.read_json(input_path)
+            if 'data' in file_benchmarks and isinstance(file_benchmarks['data'], list):
+                for benchmark in file_benchmarks['data']:
+                    yield benchmark
+            else:
+                logging.warn("Cannot parse file (%s). Invalid content.", input_path)
+        elif os.path.isfile(input_path):
+            logfiles.append(input_path)
+    for idx in range(0, len(logfiles), LOG_CHUNK_SIZE):
+        for benchmark in LogParser.parse_log_files(logfiles[idx:idx + LOG_CHUNK_SIZE])[0]:
+            yield benchmark
+
+
+def main():
+    """Entry point when invoking this script from a command line."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('inputs', nargs='*', help='Log directories, log files or JSON files.')
+    parser.add_argument('--recursive', required=False, default=False, action='store_true',
+                        help='If input is folder, scan it recursively for log files.')
+    parser.add_argument('--output_dir', '--output-dir', type=str, required=True,
+                        help='Write dashboard (index.html and data shards) into this directory.')
+    parser.add_argument('--metrics', nargs='*', required=False, default=None,
+                        help='Metrics to aggregate. Default: %s.' % ' '.join(DEFAULT_METRICS))
+    parser.add_argument('--template', type=str, required=False, default=None,
+                        help='Dashboard HTML page. Default is web/dashboard.html.')
+    args = parser.parse_args()
+
+    dashboard = Dashboard(args.metrics)
+    for benchmark in iter_benchmarks(args.inputs, args.recursive):
+        dashboard.update(benchmark)
+    dashboard.write(args.output_dir, args.template)
+    print("Aggregated %d benchmarks into %d groups (%d models)." % (
+        dashboard.num_benchmarks, len(dashboard.groups), len(dashboard.get_index()['models'])
+    ))
+
+
+if __name__ == "__main__":
+    main()
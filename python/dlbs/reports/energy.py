@@ -0,0 +1,108 @@
+# (c) Copyright [2017] Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Computes energy efficiency metrics from resource monitor power time series.
+
+Resource monitor samples host power (``results.use.power``, ipmitool) and power of
+individual GPUs (``results.use.gpus``, nvidia-smi). Power is integrated (trapezoidal
+rule) over the measured window - a time interval covered by timed batches (see
+:py:meth:`dlbs.reports.resource_analysis.ResourceAnalysis.get_batch_timeline`).
+
+The following parameters are computed:
+
+* ``results.energy.window`` Duration of a measured window in seconds.
+* ``results.energy.host_joules`` Energy consumed by a host in the measured window.
+* ``results.energy.devices_joules`` Energy consumed by all GPUs in the measured window.
+* ``results.energy.avg_host_watts`` Average host power.
+* ``results.energy.avg_watts_per_device`` Average power of one GPU.
+* ``results.energy.joules_per_batch`` Energy per batch. Host energy is used if
+  available, else devices energy.
+* ``results.energy.images_per_joule`` Number of processed instances per joule.
+
+These parameters are computed by a log parser, so they can be used as target
+variables in a summary builder or as Y parameters in a series builder.
+"""
+from __future__ import division
+import dlbs.python_version   # pylint: disable=unused-import
+from dlbs.reports.resource_analysis import ResourceAnalysis
+from dlbs.utils import Modules
+
+if Modules.HAVE_NUMPY:
+    import numpy as np
+
+
+class EnergyMetrics(object):
+    """Integrates power time series over measured window."""
+
+    @staticmethod
+    def integrate(times, power, window):
+        """Integrates power over time window.
+
+        :param np.array times: Sample times in seconds (sorted).
+        :param np.array power: Power in watts, NaNs are ignored.
+        :param tuple window: Tuple of (start, end) seconds.
+        :return: Energy in joules or None if there are no valid samples.
+        """
+        valid = ~np.isnan(power)
+        if not np.any(valid):
+            return None
+        times, power = times[valid], power[valid]
+        inside = (times > window[0]) & (times < window[1])
+        grid = np.concatenate(([window[0]], times[inside], [window[1]]))
+        values = np.interp(grid, times, power)
+        return float(np.sum(0.5 * (values[1:] + values[:-1]) * np.diff(grid)))
+
+    @staticmethod
+    def compute(exp):
+        """Computes energy metrics for one experiment.
+
+        :param dict exp: Experiment parameters. Must contain batch times, resource
+                         monitor time series and start or end time.
+        :return: Dictionary with `results.energy.*` parameters. Empty if there is not
+                 enough data.
+        """
+        timeline = ResourceAnalysis.get_batch_timeline(exp)
+        if timeline is None:
+            return {}
+        window = (timeline[0][0], timeline[1][-1])
+        duration = window[1] - window[0]
+        if duration <= 0:
+            return {}
+        metrics = {}
+        host = ResourceAnalysis.get_timeseries(exp, 'power')
+        if host is not None:
+            joules = EnergyMetrics.integrate(host[0], host[1][:, 0], window)
+            if joules is not None:
+                metrics['results.energy.host_joules'] = joules
+                metrics['results.energy.avg_host_watts'] = joules / duration
+        devices = ResourceAnalysis.get_timeseries(exp, 'gpus')
+        if devices is not None:
+            num_devices = int(np.sum(np.any(~np.isnan(devices[1]), axis=0)))
+            power = np.nansum(devices[1], axis=1)
+            power[np.all(np.isnan(devices[1]), axis=1)] = np.nan
+            joules = EnergyMetrics.integrate(devices[0], power, window)
+            if joules is not None and num_devices > 0:
+                metrics['results.energy.devices_joules'] = joules
+                metrics['results.energy.avg_watts_per_device'] = joules / duration / num_devices
+        joules = metrics.get('results.energy.host_joules', metrics.get('results.energy.devices_joules'))
+        if joules is None or joules <= 0:
+            return metrics
+        num_batches = len(exp['results.time_data'])
+        if 'exp.effective_batch' in exp:
+            num_images = num_batches * int(exp['exp.effective_batch'])
+        else:
+            num_images = float(exp.get('results.throughput', 0)) * duration
+        metrics['results.energy.window'] = duration
+        metrics['results.energy.joules_per_batch'] = joules / num_batches
+        metrics['results.energy.images_per_joule'] = num_images / joules
+        return metrics
@@ -0,0 +1,284 @@
+# (c) Copyright [2017] Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Correlates resource monitor samples (``results.use.*``) with batch times
+(``results.time_data``) to identify what limits performance of an experiment.
+
+Batch times are placed on a wall clock timeline. Benchmark backends exit right after
+the last timed batch, so timeline is anchored at ``results.end_time`` (if present) and
+goes backwards. Otherwise, it's anchored at ``results.start_time`` and goes forward,
+what is less accurate since it ignores model initialization and warmup. Resource
+monitor samples (``results.use.time``) are then interpolated at batch mid points.
+
+Every experiment gets one of the following labels:
+
+* ``input-bound`` Slow batches coincide with CPU saturation or with idle (low power)
+  devices in single device experiments. Such experiments need more data loader /
+  preprocess threads.
+* ``interconnect-bound`` Slow batches coincide with idle devices while CPU is not
+  saturated in multi-device/multi-node experiments.
+* ``compute-bound`` No or few slow batches, or they do not correlate with monitored
+  resources.
+* ``unknown`` Not enough data (no batch times or no resource monitor data).
+
+Usage:
+
+>>> python resource_analysis.py [PARAMETERS] INPUT [INPUT ...]
+
+Parameters:
+
+* ``INPUT`` Log directories, log files or JSON files produced by a log parser.
+* ``--recursive`` Scan log directories recursively.
+* ``--report-file`` Write report (JSON) into this file.
+* ``--num-cores`` Number of CPU cores. Used to compute CPU utilization. If not
+  provided, maximal observed CPU usage in an experiment is used.
+
+Example:
+   >>> python resource_analysis.py ./logs --recursive --num-cores 40
+"""
+from __future__ import print_function
+from __future__ import division
+import os
+import argparse
+import datetime
+import logging
+import dlbs.python_version   # pylint: disable=unused-import
+from dlbs.logparser import LogParser
+from dlbs.utils import IOUtils
+from dlbs.utils import Modules
+
+if Modules.HAVE_NUMPY:
+    import numpy as np
+
+
+# Backend parameters that control data ingestion throughput.
+INPUT_PIPELINE_PARAMS = {
+    'pytorch': 'pytorch.num_loader_threads',
+    'mxnet': 'mxnet.preprocess_threads',
+    'caffe2': 'caffe2.num_decode_threads'
+}
+
+
+class ResourceAnalysis(object):
+    """Aligns resource monitor time series with batch times and classifies experiments."""
+
+    @staticmethod
+    def parse_timestamp(timestamp):
+        """Converts time stamp produced by launchers and resource monitor into seconds.
+
+        :param str timestamp: Time stamp in format '%Y-%m-%d:%H:%M:%S:%3N' i.e.
+                              '2018-11-05:13:46:43:451'.
+        :return: Number of seconds since epoch (float).
+        """
+        date_time = datetime.datetime.strptime(timestamp[0:19], '%Y-%m-%d:%H:%M:%S')
+        seconds = (date_time - datetime.datetime(1970, 1, 1)).total_seconds()
+        if len(timestamp) > 20:
+            seconds += float('0.' + timestamp[20:])
+        return seconds
+
+    @staticmethod
+    def get_timeseries(exp, name):
+        """Returns resource monitor time series.
+
+        :param dict exp: Experiment parameters.
+        :param str name: Name of a time series ('cpu', 'power', 'gpus' ...).
+        :return: Tuple of (times, values) where times is 1D array of seconds and values
+                 is 2D array of shape (num_samples, num_values). Negative values (not
+                 available) are converted to NaNs. None if time series is not available.
+        """
+        times = exp.get('results.use.time', [])
+        values = exp.get('results.use.%s' % name, [])
+        if len(times) == 0 or len(times) != len(values):
+            return None
+        values = [val if isinstance(val, list) else [val] for val in values]
+        num_values = max(len(val) for val in values)
+        matrix = np.full((len(values), num_values), np.nan)
+        for idx, val in enumerate(values):
+            matrix[idx, 0:len(val)] = val
+        matrix[matrix < 0] = np.nan
+        if np.all(np.isnan(matrix)):
+            return None
+        times = np.array([ResourceAnalysis.parse_timestamp(tm) for tm in times])
+        return (times, matrix)
+
+    @staticmethod
+    def get_batch_timeline(exp):
+        """Places batches on a wall clock timeline.
+
+        :param dict exp: Experiment parameters.
+        :return: Tuple of (starts, ends) arrays in seconds or None if not enough data.
+        """
+        batch_times = np.array(exp.get('results.time_data', []), dtype=np.float64) / 1000.0
+        if len(batch_times) == 0:
+            return None
+        if 'results.end_time' in exp:
+            ends = ResourceAnalysis.parse_timestamp(exp['results.end_time']) - \
+                   np.concatenate((np.cumsum(batch_times[::-1])[::-1][1:], [0.0]))
+            return (ends - batch_times, ends)
+        if 'results.start_time' in exp:
+            ends = ResourceAnalysis.parse_timestamp(exp['results.start_time']) + np.cumsum(batch_times)
+            return (ends - batch_times, ends)
+        return None
+
+    @staticmethod
+    def align(exp, name, reducer=np.nanmean):
+        """Interpolates resource monitor time series at batch mid points.
+
+        :param dict exp: Experiment parameters.
+        :param str name: Name of a time series ('cpu', 'power', 'gpus' ...).
+        :param callable reducer: Function that reduces multiple values in one sample
+                                 (for instance, power of multiple GPUs) to one value.
+        :return: Array with one value per batch or None if not enough data.
+        """
+        timeline = ResourceAnalysis.get_batch_timeline(exp)
+        timeseries = ResourceAnalysis.get_timeseries(exp, name)
+        if timeline is None or timeseries is None:
+            return None
+        times, values = timeseries
+        valid = ~np.all(np.isnan(values), axis=1)
+        values = reducer(values[valid], axis=1)
+        return np.interp(0.5 * (timeline[0] + timeline[1]), times[valid], values)
+
+    @staticmethod
+    def analyze(exp, num_cores=None, slow_factor=1.2, slow_fraction=0.05,
+                cpu_saturation=0.9, low_power=0.5):
+        """Analyzes one experiment.
+
+        :param dict exp: Experiment parameters.
+        :param int num_cores: Number of CPU cores. If None, maximal observed CPU usage is
+                              considered to be 100%.
+        :param float slow_factor: Batch is slow if its time > slow_factor * median.
+        :param float slow_fraction: Experiment is compute-bound if fraction of slow
+                                    batches is less than this value.
+        :param float cpu_saturation: CPU is saturated if its utilization is >= this value.
+        :param float low_power: Devices are idle if their power is <= low_power * maximal
+                                observed power.
+        :return: Dictionary with analysis results.
+        """
+        report = {
+            'exp.id': exp.get('exp.id', ''),
+            'exp.log_file': exp.get('exp.log_file', ''),
+            'label': 'unknown',
+            'flagged': False,
+            'num_batches': len(exp.get('results.time_data', [])),
+            'slow_batches': 0,
+            'slow_with_cpu_saturation': None,
+            'slow_with_low_power': None,
+            'recommendation': ''
+        }
+        cpu = ResourceAnalysis.align(exp, 'cpu')
+        power = ResourceAnalysis.align(exp, 'gpus', reducer=np.nansum)
+        if power is None:
+            power = ResourceAnalysis.align(exp, 'power')
+        if report['num_batches'] == 0 or (cpu is None and power is None):
+            return report
+
+        batch_times = np.array(exp['results.time_data'], dtype=np.float64)
+        slow = batch_times > slow_factor * np.median(batch_times)
+        report['slow_batches'] = int(np.sum(slow))
+        if report['slow_batches'] < slow_fraction * len(batch_times):
+            report['label'] = 'compute-bound'
+            return report
+
+        cpu_saturated = low_power_mask = None
+        if cpu is not None:
+            capacity = 100.0 * num_cores if num_cores else np.max(cpu)
+            cpu_saturated = cpu >= cpu_saturation * capacity
+            report['slow_with_cpu_saturation'] = float(np.mean(cpu_saturated[slow]))
+        if power is not None:
+            low_power_mask = power <= low_power * np.max(power)
+            report['slow_with_low_power'] = float(np.mean(low_power_mask[slow]))
+
+        multi_device = int(exp.get('exp.num_gpus', 1)) > 1 or int(exp.get('exp.num_nodes', 1)) > 1
+        if report['slow_with_cpu_saturation'] is not None and report['slow_with_cpu_saturation'] >= 0.5:
+            report['label'] = 'input-bound'
+        elif report['slow_with_low_power'] is not None and report['slow_with_low_power'] >= 0.5:
+            report['label'] = 'interconnect-bound' if multi_device else 'input-bound'
+        else:
+            report['label'] = 'compute-bound'
+        report['flagged'] = report['label'] != 'compute-bound'
+
+        if report['label'] == 'input-bound':
+            param = INPUT_PIPELINE_PARAMS.get(exp.get('exp.framework_family', exp.get('exp.framework')))
+            if param is not None:
+                report['recommendation'] = "Increase '%s' (current value is %s)." % (param, exp.get(param, 'unknown'))
+            else:
+                report['recommendation'] = "Increase number of data ingestion threads."
+        elif report['label'] == 'interconnect-bound':
+            report['recommendation'] = "Check gradient aggregation and interconnect configuration."
+        return report
+
+
+def load_benchmarks(inputs, recursive=False):
+    """Loads benchmarks from log files, log directories and JSON files.
+
+    :param list inputs: List of log files, directories and JSON files.
+    :param bool recursive: Scan directories recursively.
+    :return: List of benchmarks (dictionaries).
+    """
+    logfiles = []
+    benchmarks = []
+    for input_path in inputs:
+        if os.path.isdir(input_path):
+            logfiles.extend(IOUtils.find_files(input_path, "*.log", recursive))
+        elif os.path.isfile(input_path) and input_path.endswith(('.json', '.json.gz')):
+            file_benchmarks = IOUtils.read_json(input_path)
+            if 'data' in file_benchmarks and isinstance(file_benchmarks['data'], list):
+                benchmarks.extend(file_benchmarks['data'])
+            else:
+                logging.warn("Cannot parse file (%s). Invalid content.", input_path)
+        elif os.path.isfile(input_path):
+            logfiles.append(input_path)
+    if len(logfiles) > 0:
+        benchmarks.extend(LogParser.parse_log_files(logfiles, {'failed_benchmarks': 'keep'})[0])
+    return benchmarks
+
+
+def main():
+    """Entry point when invoking this scrip from a command line."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('inputs', nargs='*', help='Log directories, log files or JSON files.')
+    parser.add_argument('--recursive', required=False, default=False, action='store_true',
+                        help='If input is folder, scan it recursively for log files.')
+    parser.add_argument('--report_file', '--report-file', type=str, required=False, default=None,
+                        help='If present, write report (JSON) into this file.')
+    parser.add_argument('--num_cores', '--num-cores', type=int, required=False, default=None,
+                        help='Number of CPU cores. If not present, maximal observed CPU usage is used.')
+    parser.add_argument('--slow_factor', '--slow-factor', type=float, required=False, default=1.2,
+                        help='Batch is slow if its time is greater than this times median batch time.')
+    parser.add_argument('--cpu_saturation', '--cpu-saturation', type=float, required=False, default=0.9,
+                        help='CPU is saturated if its utilization is greater or equal than this value.')
+    parser.add_argument('--low_power', '--low-power', type=float, required=False, default=0.5,
+                        help='Devices are idle if their power is less than this times maximal power.')
+    args = parser.parse_args()
+
+    if not Modules.HAVE_NUMPY:
+        print("This script needs Numpy.")
+        exit(1)
+
+    reports = []
+    for exp in load_benchmarks(args.inputs, args.recursive):
+        reports.append(ResourceAnalysis.analyze(exp, num_cores=args.num_cores, slow_factor=args.slow_factor,
+                                                cpu_saturation=args.cpu_saturation, low_power=args.low_power))
+    print("%-20s %-10s %-10s %s" % ('Label', 'Batches', 'Slow', 'Experiment'))
+    for report in reports:
+        print("%-20s %-10d %-10d %s" % (report['label'], report['num_batches'], report['slow_batches'],
+                                        report['exp.log_file'] or report['exp.id']))
+        if report['recommendation']:
+            print("    %s" % report['recommendation'])
+    if args.report_file is not None:
+        IOUtils.write_json(args.report_file, {'data': reports})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+# (c) Copyright [2017] Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Compares measured throughput with roofline model estimates and flags underperforming runs.
+
+Model costs (forward FLOPs, parameter and activation bytes per sample) are computed
+by :py:mod:`pytorch_benchmarks.model_cost`. For every experiment, achieved FLOP/s
+and memory bandwidth are computed from ``results.throughput``. The attainable
+performance is ``min(peak_flops, arithmetic_intensity * peak_bandwidth)`` where peak
+values are per device and are multiplied by number of devices. Experiments that
+achieve less than ``threshold`` of attainable performance are flagged.
+
+A simple traffic model is used: every layer writes its output and the next layer
+reads it, and weights are read once per batch. Training costs three times as much
+as inference (forward pass, backward pass for activations and for weights).
+
+Usage:
+
+>>> python roofline.py ./logs --recursive --costs ./costs.json --peak-tflops 15.7 --peak-bandwidth 900
+
+Parameters:
+
+* ``--costs`` Model costs (JSON) produced by ``pytorch_benchmarks.model_cost``.
+* ``--peak-tflops`` Peak performance of one device in TFLOP/s.
+* ``--peak-bandwidth`` Peak memory bandwidth of one device in GB/s.
+* ``--threshold`` Flag experiments that achieve less than this fraction of attainable
+  performance (default 0.3).
+* ``--report-file`` If present, write report (JSON) into this file.
+"""
+from __future__ import print_function
+from __future__ import division
+import argparse
+import dlbs.python_version   # pylint: disable=unused-import
+from dlbs.utils import IOUtils
+from dlbs.reports.resource_analysis import load_benchmarks
+
+# Training is three times as expensive as inference in terms of FLOPs and memory traffic.
+TRAINING_FACTOR = 3.0
+# Model costs are computed for 32 bit floats.
+DTYPE_BYTES_FACTOR = {'float32': 1.0, 'float16': 0.5, 'int8': 0.25}
+
+
+class Roofline(object):
+    """Roofline analysis of experiments given model costs and device peaks."""
+
+    @staticmethod
+    def get_sample_cost(exp, cost):
+        """Returns cost of processing one sample in an experiment.
+
+        :param dict exp: Experiment parameters.
+        :param dict cost: Model cost with `flops`, `param_bytes` and `activation_bytes`.
+        :return: Tuple of (flops, bytes) per sample.
+        """
+        batch = max(1, int(exp.get('exp.replica_batch', 1)))
+        factor = TRAINING_FACTOR if exp.get('exp.phase', 'training') == 'training' else 1.0
+        bytes_factor = DTYPE_BYTES_FACTOR.get(exp.get('exp.dtype', 'float32'), 1.0)
+        flops = factor * cost['flops']
+        traffic = 2.0 * cost['activation_bytes'] + cost['param_bytes'] / batch
+        return (flops, factor * bytes_factor * traffic)
+
+    @staticmethod
+    def analyze(exp, costs, peak_flops, peak_bandwidth, threshold=0.3):
+        """Analyzes one experiment.
+
+        :param dict exp: Experiment parameters.
+        :param dict costs: Dictionary mapping model identifiers to their costs.
+        :param float peak_flops: Peak FLOP/s of one device.
+        :param float peak_bandwidth: Peak memory bandwidth of one device, bytes/s.
+        :param float threshold: Flag experiment if its efficiency is below this value.
+        :return: Dictionary with analysis results or None if model cost or throughput
+                 is not available.
+        """
+        model = exp.get('exp.model', '')
+        throughput = exp.get('results.throughput', 0)
+        if model not in costs or not isinstance(throughput, (int, long, float)) or throughput <= 0:
+            return None
+        flops, traffic = Roofline.get_sample_cost(exp, costs[model])
+        num_devices = max(1, int(exp.get('exp.num_gpus', 1)))
+        intensity = flops / traffic
+        attainable = min(peak_flops, intensity * peak_bandwidth) * num_devices
+        achieved = throughput * flops
+        efficiency = achieved / attainable
+        return {
+            'exp.id': exp.get('exp.id', ''),
+            'exp.log_file': exp.get('exp.log_file', ''),
+            'exp.model': model,
+            'flops_per_sample': flops,
+            'bytes_per_sample': traffic,
+            'arithmetic_intensity': intensity,
+            'achieved_flops': achieved,
+            'achieved_bandwidth': throughput * traffic,
+            'attainable_flops': attainable,
+            'bound': 'compute' if intensity * peak_bandwidth >= peak_flops else 'memory',
+            'efficiency': efficiency,
+            'flagged': efficiency < threshold
+        }
+
+
+def main():
+    """Entry point when invoking this script from a command line."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('inputs', nargs='*', help='Log directories, log files or JSON files.')
+    parser.add_argument('--recursive', required=False, default=False, action='store_true',
+                        help='If input is folder, scan it recursively for log files.')
+    parser.add_argument('--costs', type=str, required=True,
+                        help='Model costs (JSON) produced by pytorch_benchmarks.model_cost.')
+    parser.add_argument('--peak_tflops', '--peak-tflops', type=float, required=True,
+                        help='Peak performance of one device in TFLOP/s.')
+    parser.add_argument('--peak_bandwidth', '--peak-bandwidth', type=float, required=True,
+                        help='Peak memory bandwidth of one device in GB/s.')
+    parser.add_argument('--threshold', type=float, required=False, default=0.3,
+                        help='Flag experiments that achieve less than this fraction of attainable performance.')
+    parser.add_argument('--report_file', '--report-file', type=str, required=False, default=None,
+                        help='If present, write report (JSON) into this file.')
+    args = parser.parse_args()
+
+    costs = IOUtils.read_json(args.costs)['models']
+    reports = []
+    for exp in load_benchmarks(args.inputs, args.recursive):
+        report = Roofline.analyze(exp, costs, args.peak_tflops * 1e12, args.peak_bandwidth * 1e9,
+                                  args.threshold)
+        if report is not None:
+            reports.append(report)
+    print("%-20s %-10s %-10s %-10s %-8s %s" % ('Model', 'TFLOP/s', 'GB/s', 'Efficiency', 'Bound', 'Experiment'))
+    for report in reports:
+        print("%-20s %-10.2f %-10.1f %-10.2f %-8s %s%s" % (
+            report['exp.model'], report['achieved_flops'] / 1e12, report['achieved_bandwidth'] / 1e9,
+            report['efficiency'], report['bound'], report['exp.log_file'] or report['exp.id'],
+            ' [UNDERPERFORMING]' if report['flagged'] else ''
+        ))
+    if args.report_file is not None:
+        IOUtils.write_json(args.report_file, {'data': reports})
+
+
+if __name__ == "__main__":
+    main()
@@ -150,10 +150,13 @@ class SeriesBuilder(object):
                 yvals = [series['data'][str(x)] for x in xvals]
                 plt.plot(xvals, yvals, 'o-')
         else:
-            ind = np.arange(3)
-            plt.xticks(ind + 0.15, ('1', '2', '4'))
+            xvals = sorted(chart_data['xvals'], key=lambda x: (len(x), x))
+            ind = np.arange(len(xvals))
+            width = 0.8 / max(1, len(chart_data['series']))
+            plt.xticks(ind + 0.4 - width / 2, xvals)
             for idx, series in enumerate(chart_data['series']):
-                plt.bar(ind+0.1*idx, series['data'].values(), 0.1)
+                yvals = [series['data'].get(x, 0) for x in xvals]
+                plt.bar(ind + width * idx, yvals, width)
         plt.legend(chart_opts['legend'])
         plt.savefig(args.chart_file)
 
@@ -229,7 +232,7 @@ def main():
         else:
             logging.warn("Cannot parse file (%s). Unknown extension. ", input_path)
     if len(logfiles) > 0:
-        benchmarks.extend(LogParser.parse_log_files(logfiles))
+        benchmarks.extend(LogParser.parse_log_files(logfiles)[0])
     else:
         logging.warn("No input log files have been found")
     if len(benchmarks) == 0:
@@ -23,12 +23,16 @@ Parameters:
 * ``--summary-file`` File name (json) with experiment results. This file is produced
   by a log parser.
 * ``--report-file`` File name of the report to be generated.
-* ``--type`` Type of the report ('exploration', 'weak-scaling', 'strong-scaling')
+* ``--type`` Type of the report ('exploration', 'weak-scaling', 'strong-scaling', 'energy')
 * ``--target-variable`` Target variable for the report. In most cases it's either
   'results.training_time' or 'results.inference_time'.
 * ``--query`` Optional JSON flat dictionary. Specifies query that selects experiments
   to build summary for. A typical use case is to select specific framework. For instance:
   **--query='{\"exp.framework_id\": \"tensorflow\"}'**. Should be json parsable string.
+
+The 'energy' report requires experiments with energy metrics (``results.energy.*``)
+that a log parser computes if resource monitor was enabled. It reports images per
+joule and average power per device.
 """
 from __future__ import print_function
 import json
@@ -41,6 +45,8 @@ from dlbs.utils import DictUtils, OpenFile
 BATCH_TM_TITLE = "Batch time (milliseconds)"
 IPS_TITLE = "Inferences Per Second (IPS, throughput)"
 SPEEDUP_TITLE = "Speedup (instances per second)"
+IPJ_TITLE = "Energy efficiency (images per joule)"
+WATTS_TITLE = "Average power per device (watts)"
 
 class SummaryBuilder(object):
     """Class that builds summary reports in csv formats and generates json files."""
@@ -50,12 +56,14 @@ class SummaryBuilder(object):
         self.nets = None
         self.batches = None
         self.devices = None
+        self.energy = None
 
     def build_cache(self, summary_file, target_variable, query):
         """Loads data from json file."""
         with OpenFile(summary_file) as file_obj:
             summary = json.load(file_obj)
         self.cache = {}
+        self.energy = {}
         self.nets = Set()
         self.batches = Set()
         self.devices = Set()
@@ -72,6 +80,8 @@ class SummaryBuilder(object):
                 experiment['exp.effective_batch']
             )
             self.cache[key] = float(experiment[target_variable])
+            self.energy[key] = DictUtils.subdict(experiment, ['results.energy.images_per_joule',
+                                                              'results.energy.avg_watts_per_device'])
             self.nets.add(experiment['exp.model_title'])
             self.batches.add(int(experiment['exp.effective_batch']))
             self.devices.add(str(experiment['exp.gpus']))
@@ -117,6 +127,44 @@ class SummaryBuilder(object):
         SummaryBuilder.print_report_txt(IPS_TITLE, header, report, 'net', 'device', 'throughput')
         DictUtils.dump_json_to_file(json_report, report_file)
 
+    def build_energy_report(self, report_file):
+        """ Builds energy efficiency report (images per joule and watts per device).
+        """
+        header = "%-20s %-10s" % ('Network', 'Device')
+        for batch in self.batches:
+            header = "%s %-10s" % (header, batch)
+        report = []
+        json_report = {'data': []}
+        for net in self.nets:
+            for device in self.devices:
+                profile = {
+                    'net': net,
+                    'device': device,
+                    'time': [],
+                    'images_per_joule': [],
+                    'watts': []
+                }
+                profile_ok = False
+                for batch in self.batches:
+                    key = '{0}_{1}_{2}'.format(net, device, batch)
+                    energy = self.energy.get(key, {})
+                    ipj = float(energy.get('results.energy.images_per_joule', -1))
+                    watts = float(energy.get('results.energy.avg_watts_per_device', -1))
+                    if ipj > 0:
+                        profile_ok = True
+                        json_report['data'].append({
+                            'net': net, 'device': device, 'batch': batch,
+                            'images_per_joule': ipj, 'avg_watts_per_device': watts
+                        })
+                    profile['time'].append(self.cache.get(key, -1))
+                    profile['images_per_joule'].append(round(ipj, 3))
+                    profile['watts'].append(round(watts, 1))
+                if profile_ok:
+                    report.append(profile)
+        SummaryBuilder.print_report_txt(IPJ_TITLE, header, report, 'net', 'device', 'images_per_joule')
+        SummaryBuilder.print_report_txt(WATTS_TITLE, header, report, 'net', 'device', 'watts')
+        DictUtils.dump_json_to_file(json_report, report_file)
+
     # Assuming that the first device in a list is a single GPU (CPU) device.
     def build_strong_scaling_report(self, jsonfile):
         """ Builds strong scaling report for multi-GPU training.
@@ -173,7 +221,6 @@ class SummaryBuilder(object):
         )
         DictUtils.dump_json_to_file(json_report, jsonfile)
 
-
     # Assuming that the first device in a list is a single GPU (CPU) device.
     def build_weak_scaling_report(self, jsonfile):
         """ Builds weak scaling report for multi-GPU training.
@@ -290,7 +337,7 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument('--summary_file', '--summary-file', required=True, help="File name (json) with experiment results. This file is produced by a log parser.")
     parser.add_argument('--report_file', '--report-file', required=False, default=None, help="File name of the report to be generated.")
-    parser.add_argument('--type', help="Type of the report ('exploration', 'weak-scaling', 'strong-scaling')")
+    parser.add_argument('--type', help="Type of the report ('exploration', 'weak-scaling', 'strong-scaling', 'energy')")
     parser.add_argument('--target_variable', '--target-variable', help="Target variable for the report. In most cases it's 'results.time'.")
     parser.add_argument('--query', required=False, type=str, default="{}",
                                    help="Optional JSON flat dictionary. Specifies query that selects experiments to build summary for.\
@@ -304,7 +351,8 @@ if __name__ == '__main__':
     builder_funcs = {
         'exploration': summary_builder.build_exploration_report,
         'strong-scaling': summary_builder.build_strong_scaling_report,
-        'weak-scaling': summary_builder.build_weak_scaling_report
+        'weak-scaling': summary_builder.build_weak_scaling_report,
+        'energy': summary_builder.build_energy_report
     }
     assert args.type in builder_funcs, "Invalid report type '%s'" % (args.type)
     builder_funcs[args.type](args.report_file)
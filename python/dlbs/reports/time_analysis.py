@@ -11,7 +11,11 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-"""Loads experiment data and plots raw/smoothed batch times.
+"""Loads experiment data, analyzes and plots raw/smoothed batch times.
+
+All batch time series (``results.time_data``) of all experiments are packed into one
+2D NaN-padded matrix, and statistics are computed for all experiments at once with
+NumPy (cumulative sums for moving averages, vectorized medians for outliers etc.).
 
 Usage:
 
@@ -22,9 +26,22 @@ Parameters:
 * ``--log-dir`` Scan this folder for *.log files. Scan recursively if ``--recursive`` is set.
 * ``--log-file`` Get batch statistics from this experiment.
 * ``--recursive`` Scan ``--log-dir`` folder recursively for log files.
+* ``--summary-file`` Write summary table (CSV) with per-experiment statistics to this file.
+* ``--plot-dir`` Write one chart per experiment into this folder.
+* ``--save-file`` Plot one experiment into this file (backward compatible option).
+* ``--num-workers`` Number of processes that render charts.
+
+Example:
+   Analyze all logs in './mxnet', write summary and plot charts in 8 processes
+
+   >>> python time_analysis.py --log-dir ./mxnet --recursive --summary-file ./mxnet.csv --plot-dir ./charts --num-workers 8
 """
 from __future__ import print_function
+from __future__ import division
+import os
+import csv
 import argparse
+from multiprocessing import Pool
 import dlbs.python_version   # pylint: disable=unused-import
 from dlbs.logparser import LogParser
 from dlbs.utils import IOUtils
@@ -38,6 +55,14 @@ if Modules.HAVE_NUMPY:
     import numpy as np
 
 
+SMOOTHING_WINDOWS = [10, 30, 50, 70, 100]
+
+SUMMARY_FIELDS = ['exp.id', 'exp.framework_title', 'exp.model_title', 'exp.device_type',
+                  'exp.effective_batch', 'num_batches', 'mean', 'std', 'median', 'cv',
+                  'jitter', 'num_outliers', 'num_stalls', 'stall_period', 'ewma_last',
+                  'sma_last', 'sma_max']
+
+
 def simple_moving_average(times, window_size):
     """Smoothes time series with simple moving average
 
@@ -47,20 +72,208 @@ def simple_moving_average(times, window_size):
     """
     if window_size >= len(times):
         return (None, None)
-    xs = range(window_size, len(times))
-    ys = [0] * len(xs)
-    # Compute first  value
-    ys[0] = np.mean(times[0:window_size])
-    for i in xrange(1, len(ys)):
-        ys[i] = ys[i-1] + (times[window_size + i - 1] - times[i-1])/window_size
+    csum = np.concatenate(([0.0], np.cumsum(times, dtype=np.float64)))
+    xs = np.arange(window_size, len(times))
+    ys = (csum[window_size:len(times)] - csum[0:len(times) - window_size]) / window_size
     return (xs, ys)
 
 
-if __name__ == "__main__":
-    if not Modules.HAVE_NUMPY or not Modules.HAVE_MATPLOTLIB:
-        print ("This script needs Numpy (available=%s) and Matplotlib (available=%s)" % (Modules.HAVE_NUMPY, Modules.HAVE_MATPLOTLIB))
-        exit(1)
+class TimeAnalysis(object):
+    """Computes batch time statistics for many experiments at once.
+
+    Time series are stored in a matrix of shape (num_experiments, max_length) padded
+    with NaNs, plus a vector of series lengths.
+    """
+
+    @staticmethod
+    def pad(series):
+        """Packs list of time series into a NaN-padded matrix.
+
+        :param list series: List of lists/arrays with batch times.
+        :return: Tuple of (matrix, lengths).
+        """
+        lengths = np.array([len(times) for times in series], dtype=np.int64)
+        max_length = int(lengths.max()) if len(series) > 0 else 0
+        matrix = np.full((len(series), max_length), np.nan, dtype=np.float64)
+        for idx, times in enumerate(series):
+            matrix[idx, 0:lengths[idx]] = times
+        return (matrix, lengths)
+
+    @staticmethod
+    def moving_average(matrix, lengths, window_size):
+        """Simple moving average of all series.
+
+        Value at position `j` is the mean of window `[j - window_size + 1, j]`. Positions
+        with incomplete windows and positions beyond series length are NaNs.
+
+        :param np.array matrix: NaN-padded matrix of batch times.
+        :param np.array lengths: Lengths of series.
+        :param int window_size: Size of a moving window.
+        :return: Matrix of the same shape as `matrix`.
+        """
+        num_series, max_length = matrix.shape
+        averages = np.full(matrix.shape, np.nan)
+        if window_size <= 0 or window_size > max_length:
+            return averages
+        csum = np.zeros((num_series, max_length + 1))
+        np.cumsum(np.nan_to_num(matrix), axis=1, out=csum[:, 1:])
+        averages[:, window_size - 1:] = (csum[:, window_size:] - csum[:, :max_length - window_size + 1]) / window_size
+        averages[np.arange(max_length)[None, :] >= lengths[:, None]] = np.nan
+        return averages
+
+    @staticmethod
+    def ewma(matrix, alpha):
+        """Exponentially weighted moving average of all series.
+
+        Recurrence is evaluated column by column i.e. vectorized across experiments.
+        Closed form with cumulative sums overflows for long series.
+
+        :param np.array matrix: NaN-padded matrix of batch times.
+        :param float alpha: Smoothing factor from (0, 1].
+        :return: Matrix of the same shape as `matrix`.
+        """
+        averages = np.full(matrix.shape, np.nan)
+        if matrix.shape[1] == 0:
+            return averages
+        averages[:, 0] = matrix[:, 0]
+        for col in range(1, matrix.shape[1]):
+            averages[:, col] = alpha * matrix[:, col] + (1.0 - alpha) * averages[:, col - 1]
+        return averages
+
+    @staticmethod
+    def outliers(matrix, threshold=3.0):
+        """Identifies outliers based on median absolute deviation.
+
+        :param np.array matrix: NaN-padded matrix of batch times.
+        :param float threshold: Number of scaled MADs a batch time needs to deviate
+                                from median to be considered an outlier.
+        :return: Boolean matrix of the same shape as `matrix`.
+        """
+        median = np.nanmedian(matrix, axis=1, keepdims=True)
+        mad = 1.4826 * np.nanmedian(np.abs(matrix - median), axis=1, keepdims=True)
+        with np.errstate(invalid='ignore'):
+            return np.abs(matrix - median) > threshold * np.maximum(mad, 1e-9)
+
+    @staticmethod
+    def stalls(matrix, factor=2.0):
+        """Identifies stalls - batches that take at least `factor` times median time.
+
+        Periodic stalls are usually caused by garbage collection, checkpointing or by
+        data starvation (a data loader cannot keep up with a model).
+
+        :param np.array matrix: NaN-padded matrix of batch times.
+        :param float factor: A batch is a stall if its time is >= factor * median.
+        :return: Tuple of (boolean stall matrix, array of stall periods). A period is
+                 NaN if fewer than three stalls have been found or if they are not
+                 periodic (coefficient of variation of intervals is > 0.25).
+        """
+        median = np.nanmedian(matrix, axis=1, keepdims=True)
+        with np.errstate(invalid='ignore'):
+            mask = matrix >= factor * median
+        periods = np.full(matrix.shape[0], np.nan)
+        for idx in range(matrix.shape[0]):
+            intervals = np.diff(np.flatnonzero(mask[idx]))
+            if len(intervals) >= 2 and np.std(intervals) <= 0.25 * np.mean(intervals):
+                periods[idx] = np.median(intervals)
+        return (mask, periods)
 
+    @staticmethod
+    def summary(matrix, lengths, ewma_alpha=0.1, outlier_threshold=3.0, stall_factor=2.0, sma_window=10):
+        """Computes summary statistics for all series.
+
+        Smoothed batch times are simple moving averages with `sma_window` window:
+        `sma_last` is the last smoothed time (steady state) and `sma_max` is the time
+        of the slowest window. Both are NaN for series shorter than a window.
+
+        :return: Dictionary that maps statistic name to a numpy array of length
+                 equal to number of series.
+        """
+        mean = np.nanmean(matrix, axis=1)
+        std = np.nanstd(matrix, axis=1)
+        # Coefficient of variation is not defined for zero mean (e.g. all times are 0).
+        cv = np.full(mean.shape, np.nan)
+        nonzero = mean != 0
+        cv[nonzero] = std[nonzero] / mean[nonzero]
+        ewma = TimeAnalysis.ewma(matrix, ewma_alpha)
+        stall_mask, stall_periods = TimeAnalysis.stalls(matrix, stall_factor)
+        sma = TimeAnalysis.moving_average(matrix, lengths, sma_window)
+        return {
+            'num_batches': lengths,
+            'mean': mean,
+            'std': std,
+            'median': np.nanmedian(matrix, axis=1),
+            'cv': cv,
+            'jitter': np.nanmean(np.abs(np.diff(matrix, axis=1)), axis=1),
+            'num_outliers': np.sum(TimeAnalysis.outliers(matrix, outlier_threshold), axis=1),
+            'num_stalls': np.sum(stall_mask, axis=1),
+            'stall_period': stall_periods,
+            'ewma_last': ewma[np.arange(len(lengths)), lengths - 1],
+            'sma_last': sma[np.arange(len(lengths)), lengths - 1],
+            'sma_max': np.fmax.reduce(sma, axis=1)
+        }
+
+    @staticmethod
+    def write_summary(summary_file, exps, stats):
+        """Writes per-experiment statistics into a CSV file.
+
+        :param str summary_file: Name of a CSV file.
+        :param list exps: List of experiments (dictionaries).
+        :param dict stats: Output of :py:meth:`summary`.
+        """
+        IOUtils.mkdirf(summary_file)
+        with open(summary_file, 'w') as file_obj:
+            writer = csv.writer(file_obj)
+            writer.writerow(SUMMARY_FIELDS)
+            for idx, exp in enumerate(exps):
+                row = []
+                for field in SUMMARY_FIELDS:
+                    if field not in stats:
+                        row.append(exp.get(field, ''))
+                    elif isinstance(stats[field][idx], np.integer):
+                        row.append(int(stats[field][idx]))
+                    else:
+                        row.append(round(float(stats[field][idx]), 4))
+                writer.writerow(row)
+
+
+def get_title(exp):
+    """Returns chart title for an experiment."""
+    if exp.get('exp.device_type') == 'gpu':
+        return "%s / %s / GPU batch %s / GPUs count %s" % (exp.get('exp.framework_title'), exp.get('exp.model_title'),
+                                                           exp.get('exp.replica_batch'), exp.get('exp.num_gpus'))
+    return "%s / %s / CPU batch %s" % (exp.get('exp.framework_title'), exp.get('exp.model_title'),
+                                       exp.get('exp.effective_batch'))
+
+
+def plot(task):
+    """Plots raw and smoothed batch times of one experiment. Runs in worker processes.
+
+    :param tuple task: A tuple of (title, times, chart_file). If chart file is None,
+                       chart is shown.
+    """
+    title, times, chart_file = task
+    plt.title(title)
+    plt.xlabel('#iteration')
+    plt.ylabel('batch time')
+    plt.plot(range(len(times)), times)
+    labels = ['Original']
+    for window_size in SMOOTHING_WINDOWS:
+        xs, ys = simple_moving_average(times, window_size)
+        if xs is None or ys is None:
+            continue
+        plt.plot(xs, ys)
+        labels.append('Window=%d' % (window_size))
+    plt.legend(labels)
+    if chart_file is not None:
+        plt.savefig(chart_file)
+    else:
+        plt.show()
+    plt.clf()
+    return chart_file
+
+
+def main():
+    """Entry point when invoking this scrip from a command line."""
     parser = argparse.ArgumentParser()
     parser.add_argument('--log_dir', '--log-dir', type=str, required=False, default=None,
                         help="Scan this folder for *.log files. "\
@@ -71,8 +284,24 @@ if __name__ == "__main__":
                         help="Get batch statistics from this experiment.")
     parser.add_argument('--recursive', required=False, default=False, action='store_true',
                         help='Scan --log-dir folder recursively for log files.')
+    parser.add_argument('--summary_file', '--summary-file', type=str, required=False, default=None,
+                        help="Write summary table (CSV) with per-experiment statistics to this file.")
+    parser.add_argument('--plot_dir', '--plot-dir', type=str, required=False, default=None,
+                        help="Write one chart (png) per experiment into this folder.")
+    parser.add_argument('--num_workers', '--num-workers', type=int, required=False, default=1,
+                        help="Number of processes that render charts.")
+    parser.add_argument('--ewma_alpha', '--ewma-alpha', type=float, required=False, default=0.1,
+                        help="Smoothing factor of exponentially weighted moving average.")
+    parser.add_argument('--stall_factor', '--stall-factor', type=float, required=False, default=2.0,
+                        help="A batch is a stall if its time is at least this times median batch time.")
+    parser.add_argument('--sma_window', '--sma-window', type=int, required=False, default=SMOOTHING_WINDOWS[0],
+                        help="Window size of simple moving average for smoothed batch times in a summary.")
     args = parser.parse_args()
 
+    if not Modules.HAVE_NUMPY or not Modules.HAVE_MATPLOTLIB:
+        print ("This script needs Numpy (available=%s) and Matplotlib (available=%s)" % (Modules.HAVE_NUMPY, Modules.HAVE_MATPLOTLIB))
+        exit(1)
+
     if args.log_dir is not None:
         files = IOUtils.find_files(args.log_dir, "*.log", args.recursive)
     else:
@@ -80,38 +309,40 @@ if __name__ == "__main__":
     if args.log_file is not None:
         files.append(args.log_file)
 
-    save_file = None
-    if args.save_file is not None:
-        save_file = args.save_file
+    exps, _ = LogParser.parse_log_files(files)
+    exps = [exp for exp in exps if len(exp.get('results.time_data', [])) > 0]
+    if len(exps) == 0:
+        print("No experiments with batch times (results.time_data) have been found.")
+        return
 
-    exps = LogParser.parse_log_files(files)
-    for exp in exps:
-        key = 'results.time_data'
-        if key not in exp:
-            continue
-        times = exp[key]
-        xs = range(len(times))
-        # Plot moving averages for different windows
-        if exp['exp.device_type'] == 'gpu':
-            title = "%s / %s / GPU batch %s / GPUs count %s" % (exp['exp.framework_title'], exp['exp.model_title'], exp['exp.replica_batch'], exp['exp.num_gpus'])
-        else:
-            title = "%s / %s / CPU batch %d" % (exp['exp.framework_title'], exp['exp.model_title'], exp['exp.effective_batch'])
-        plt.title(title)
-        plt.xlabel('#iteration')
-        plt.ylabel('batch time')
-        plt.plot(xs, times)
-        labels = ['Original']
-        for window_size in [10, 30, 50, 70, 100]:
-            xs, ys = simple_moving_average(times, window_size)
-            if xs is None or ys is None:
-                continue
-            line, = plt.plot(xs, ys)
-            labels.append('Window=%d' % (window_size))
-        legend = plt.legend(labels)
-        if save_file is not None:
-            print("save file to ", save_file)
-            plt.savefig(save_file)
-        else:
-            plt.show()
-
-        plt.clf()
+    matrix, lengths = TimeAnalysis.pad([exp['results.time_data'] for exp in exps])
+    if args.summary_file is not None:
+        stats = TimeAnalysis.summary(matrix, lengths, ewma_alpha=args.ewma_alpha,
+                                     stall_factor=args.stall_factor, sma_window=args.sma_window)
+        TimeAnalysis.write_summary(args.summary_file, exps, stats)
+
+    tasks = []
+    if args.plot_dir is not None:
+        if not os.path.isdir(args.plot_dir):
+            os.makedirs(args.plot_dir)
+        for idx, exp in enumerate(exps):
+            name = os.path.splitext(os.path.basename(exp.get('exp.log_file', 'exp_%d' % idx)))[0]
+            tasks.append((get_title(exp), exp['results.time_data'],
+                          os.path.join(args.plot_dir, '%s_%d.png' % (name, idx))))
+    elif args.summary_file is None:
+        # Backward compatible behavior - plot every experiment into the same file or show it.
+        tasks = [(get_title(exp), exp['results.time_data'], args.save_file) for exp in exps]
+        args.num_workers = 1
+
+    if args.num_workers > 1 and len(tasks) > 1:
+        pool = Pool(args.num_workers)
+        pool.map(plot, tasks)
+        pool.close()
+        pool.join()
+    else:
+        for task in tasks:
+            plot(task)
+
+
+if __name__ == "__main__":
+    main()
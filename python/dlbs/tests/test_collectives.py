@@ -0,0 +1,83 @@
+# (c) Copyright [2017] Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""These unit tests test dlbs.bench.collectives module."""
+import os
+import shutil
+import tempfile
+import unittest
+# append parent directory to import path
+import env #pylint: disable=W0611
+from dlbs.logparser import LogParser
+from dlbs.bench import collectives
+
+
+def failing_worker(rank, opts, results):
+    """A worker that reports the first collective and dies."""
+    if rank == 0:
+        results.put((opts['collectives'][0], [1e-6], None))
+    raise ValueError("Worker failure")
+
+
+class TestCollectives(unittest.TestCase):
+
+    def test_message_sizes(self):
+        """dlbs  ->  TestCollectives::test_message_sizes                  [Message sizes.]"""
+        self.assertEqual(collectives.parse_size('512'), 512)
+        self.assertEqual(collectives.parse_size('1KB'), 1024)
+        self.assertEqual(collectives.parse_size('1gb'), 1024**3)
+        sizes = collectives.get_message_sizes(collectives.parse_size('1KB'), collectives.parse_size('1GB'))
+        self.assertEqual(len(sizes), 21)
+        self.assertEqual(sizes[0], 1024)
+        self.assertEqual(sizes[-1], 1024**3)
+        self.assertEqual(collectives.get_num_iterations(1024, 20), 20)
+        self.assertEqual(collectives.get_num_iterations(1024**3, 20), 2)
+
+    def test_bus_bandwidth(self):
+        """dlbs  ->  TestCollectives::test_bus_bandwidth                  [Bus bandwidth.]"""
+        self.assertAlmostEqual(collectives.bus_bandwidth('allreduce', 4, 1.0), 1.5)
+        self.assertAlmostEqual(collectives.bus_bandwidth('allgather', 4, 1.0), 0.75)
+        self.assertAlmostEqual(collectives.bus_bandwidth('reduce_scatter', 4, 1.0), 0.75)
+        self.assertAlmostEqual(collectives.bus_bandwidth('broadcast', 4, 1.0), 1.0)
+        results = collectives.get_results('allreduce', 2, [1000, 2000], [1e-6, 1e-6])
+        self.assertEqual(results['algbw'], [1.0, 2.0])
+        self.assertEqual(results['busbw_peak'], 2.0)
+        self.assertAlmostEqual(results['latency'][0], 1.0)
+
+    def test_write_log(self):
+        """dlbs  ->  TestCollectives::test_write_log                      [Results in DLBS log format.]"""
+        log_dir = tempfile.mkdtemp()
+        try:
+            log_file = os.path.join(log_dir, 'gloo_allreduce_2.log')
+            results = collectives.get_results('allreduce', 2, [1024, 2048], [1e-5, 2e-5])
+            with open(log_file, 'w') as file_obj:
+                collectives.write_log(file_obj, 'gloo', 'allreduce', 2, results)
+            params = LogParser.parse_log_file(log_file)
+            self.assertEqual(params['exp.comm_backend'], 'gloo')
+            self.assertEqual(params['exp.status'], 'ok')
+            self.assertEqual(params['results.message_sizes'], [1024, 2048])
+            self.assertEqual(len(params['results.busbw']), 2)
+        finally:
+            shutil.rmtree(log_dir)
+
+    def test_failed_workers(self):
+        """dlbs  ->  TestCollectives::test_failed_workers                 [Workers that die do not block.]"""
+        opts = {'num_workers': 2, 'collectives': ['allreduce', 'broadcast']}
+        results = collectives.run_local_workers(failing_worker, opts, poll_interval=0.1)
+        self.assertEqual(results[0], ('allreduce', [1e-6], None))
+        self.assertEqual(results[1][0:2], ('broadcast', []))
+        self.assertIn('exit codes', results[1][2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+# (c) Copyright [2017] Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Unit tests to verify PyTorch configuration."""
+from __future__ import print_function
+import unittest
+# append parent directory to import path
+import env  #pylint: disable=W0611
+from test_config_base import ConfigTester
+
+
+class TestConfigPyTorch(ConfigTester):
+    def __init__(self, *args, **kwargs):
+        ConfigTester.__init__(self, *args, **kwargs)
+
+    def setUp(self):
+        self.setUpBase(files=['base.json', 'pytorch.json'])
+
+    def test_cpu_effective_batch(self):
+        """dlbs  ->  TestConfigPyTorch::test_cpu_effective_batch          [Effective batch of CPU processes.]"""
+        self.build_plan({"exp.framework": "pytorch", "DLBS_ROOT": "", "exp.gpus": "", "exp.model": "resnet50",
+                         "exp.replica_batch": 16, "pytorch.num_cpu_processes": 4})
+        self.compute_vars(
+            [],
+            [('exp.device_type', 'cpu'), ('exp.num_cpu_processes', 4), ('exp.effective_batch', 64)]
+        )
+
+    def test_gpu_effective_batch(self):
+        """dlbs  ->  TestConfigPyTorch::test_gpu_effective_batch          [CPU processes do not affect GPU runs.]"""
+        self.build_plan({"exp.framework": "pytorch", "DLBS_ROOT": "", "exp.gpus": "0,1", "exp.model": "resnet50",
+                         "exp.replica_batch": 16, "pytorch.num_cpu_processes": 4})
+        self.compute_vars([], [('exp.device_type', 'gpu'), ('exp.effective_batch', 32)])
+
+
+if __name__ == '__main__':
+    unittest.main()
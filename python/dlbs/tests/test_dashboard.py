@@ -0,0 +1,77 @@
+# (c) Copyright [2017] Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""These unit tests test dlbs.reports.dashboard module."""
+import os
+import json
+import shutil
+import tempfile
+import unittest
+# append parent directory to import path
+import env #pylint: disable=W0611
+from dlbs.reports.dashboard import Dashboard
+
+
+def make_benchmark(model, framework, batch, gpus, throughput):
+    """Returns benchmark with parameters used by a dashboard."""
+    return {'exp.model': model, 'exp.model_title': model.upper(), 'exp.framework': framework,
+            'exp.effective_batch': batch, 'exp.num_gpus': gpus,
+            'results.throughput': throughput, 'results.time': 1000.0 * batch / throughput}
+
+
+class TestDashboard(unittest.TestCase):
+
+    def setUp(self):
+        self.dashboard = Dashboard(['results.throughput', 'results.time'])
+        for throughput in (100.0, 200.0, 300.0):
+            self.dashboard.update(make_benchmark('resnet50', 'pytorch', 64, 1, throughput))
+        self.dashboard.update(make_benchmark('resnet50', 'mxnet', 128, 2, 400.0))
+        self.dashboard.update(make_benchmark('alexnet', 'pytorch', 64, 1, -1))
+        self.dashboard.update({'exp.model': 'vgg16'})
+
+    def test_shards(self):
+        """dlbs  ->  TestDashboard::test_shards                          [Aggregates grouped by model.]"""
+        self.assertEqual(self.dashboard.num_benchmarks, 5)
+        shards = self.dashboard.get_shards()
+        self.assertEqual(sorted(shards.keys()), ['alexnet', 'resnet50'])
+        self.assertEqual(shards['alexnet'], [['pytorch', 64, 1, None, None]])
+        self.assertEqual(shards['resnet50'][0][0:4], ['mxnet', 128, 2, [1, 400.0, 400.0, 400.0]])
+        self.assertEqual(shards['resnet50'][1][0:4], ['pytorch', 64, 1, [3, 200.0, 100.0, 300.0]])
+
+    def test_index(self):
+        """dlbs  ->  TestDashboard::test_index                           [Dashboard index.]"""
+        index = self.dashboard.get_index()
+        self.assertEqual(index['frameworks'], ['mxnet', 'pytorch'])
+        self.assertEqual(index['batches'], [64, 128])
+        self.assertEqual(index['gpus'], [1, 2])
+        self.assertEqual(index['models'][1], {'id': 'resnet50', 'title': 'RESNET50', 'shard': 'resnet50.js'})
+        self.assertEqual(Dashboard.shard_name('a/b c'), 'a_b_c.js')
+
+    def test_write(self):
+        """dlbs  ->  TestDashboard::test_write                           [Writing dashboard.]"""
+        output_dir = tempfile.mkdtemp()
+        try:
+            self.dashboard.write(output_dir)
+            self.assertTrue(os.path.isfile(os.path.join(output_dir, 'index.html')))
+            with open(os.path.join(output_dir, 'data', 'resnet50.js')) as file_obj:
+                content = file_obj.read().strip()
+            self.assertTrue(content.startswith('DLBS.load(') and content.endswith(');'))
+            shard = json.loads(content[len('DLBS.load('):-2])
+            self.assertEqual(shard['name'], 'resnet50')
+            self.assertEqual(len(shard['data']), 2)
+        finally:
+            shutil.rmtree(output_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+# (c) Copyright [2017] Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""These unit tests test dlbs.reports.energy module."""
+import unittest
+# append parent directory to import path
+import env #pylint: disable=W0611
+import numpy as np
+from dlbs.reports.energy import EnergyMetrics
+
+
+def make_experiment(num_batches, host_power, gpus_power):
+    """Creates experiment with 100 ms batches and one monitor sample per 100 ms."""
+    num_samples = num_batches + 2
+    return {
+        'exp.effective_batch': 32,
+        'results.throughput': 320.0,
+        'results.end_time': '2018-11-05:13:46:%02d:%03d' % (40 + (100 * num_batches) // 1000,
+                                                           (100 * num_batches) % 1000),
+        'results.time_data': [100.0] * num_batches,
+        'results.use.time': ['2018-11-05:13:46:%02d:%03d' % (39 + (100 * i + 950) // 1000, (100 * i + 950) % 1000)
+                             for i in range(num_samples)],
+        'results.use.power': [host_power] * num_samples,
+        'results.use.gpus': [gpus_power] * num_samples
+    }
+
+
+class TestEnergyMetrics(unittest.TestCase):
+
+    def test_integrate(self):
+        """dlbs  ->  TestEnergyMetrics::test_integrate                   [Integration of power series.]"""
+        times = np.array([0.0, 1.0, 2.0, 3.0])
+        power = np.array([100.0, 200.0, np.nan, 200.0])
+        self.assertAlmostEqual(EnergyMetrics.integrate(times, power, (0.0, 1.0)), 150.0)
+        self.assertAlmostEqual(EnergyMetrics.integrate(times, power, (0.5, 3.0)), 0.5 * 175.0 + 2.0 * 200.0)
+        self.assertIsNone(EnergyMetrics.integrate(times, np.full(4, np.nan), (0.0, 1.0)))
+
+    def test_constant_power(self):
+        """dlbs  ->  TestEnergyMetrics::test_constant_power              [Energy metrics for constant power.]"""
+        metrics = EnergyMetrics.compute(make_experiment(20, 500.0, [150.0, 250.0]))
+        self.assertAlmostEqual(metrics['results.energy.window'], 2.0)
+        self.assertAlmostEqual(metrics['results.energy.host_joules'], 1000.0)
+        self.assertAlmostEqual(metrics['results.energy.avg_host_watts'], 500.0)
+        self.assertAlmostEqual(metrics['results.energy.devices_joules'], 800.0)
+        self.assertAlmostEqual(metrics['results.energy.avg_watts_per_device'], 200.0)
+        self.assertAlmostEqual(metrics['results.energy.joules_per_batch'], 50.0)
+        self.assertAlmostEqual(metrics['results.energy.images_per_joule'], 20 * 32 / 1000.0)
+
+    def test_devices_only(self):
+        """dlbs  ->  TestEnergyMetrics::test_devices_only                [Energy metrics without host power.]"""
+        metrics = EnergyMetrics.compute(make_experiment(10, -1, [100.0, -1]))
+        self.assertNotIn('results.energy.host_joules', metrics)
+        self.assertAlmostEqual(metrics['results.energy.devices_joules'], 100.0)
+        self.assertAlmostEqual(metrics['results.energy.avg_watts_per_device'], 100.0)
+        self.assertAlmostEqual(metrics['results.energy.images_per_joule'], 10 * 32 / 100.0)
+
+    def test_no_data(self):
+        """dlbs  ->  TestEnergyMetrics::test_no_data                     [No energy metrics without monitor data.]"""
+        exp = make_experiment(10, -1, [-1])
+        self.assertEqual(EnergyMetrics.compute(exp), {})
+        del exp['results.end_time']
+        self.assertEqual(EnergyMetrics.compute(exp), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
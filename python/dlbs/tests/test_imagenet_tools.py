@@ -0,0 +1,93 @@
+# (c) Copyright [2017] Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""These unit tests test dlbs.data.imagenet.imagenet_tools module."""
+import os
+import shutil
+import tempfile
+import unittest
+# append parent directory to import path
+import env #pylint: disable=W0611
+from dlbs.data.imagenet.imagenet_tools import ImageNetTools
+from dlbs.data.imagenet.imagenet_tools import MANIFEST_FILE
+
+
+class TestImageNetTools(unittest.TestCase):
+
+    def setUp(self):
+        self.imagenet_dir = tempfile.mkdtemp()
+        for idx in range(6):
+            folder = os.path.join(self.imagenet_dir, ['n01440764', 'n01443537'][idx % 2])
+            if not os.path.isdir(folder):
+                os.makedirs(folder)
+            with open(os.path.join(folder, '%d.JPEG' % idx), 'w') as fobj:
+                fobj.write('x' * (idx + 1))
+        with open(os.path.join(self.imagenet_dir, 'n01440764', 'README.txt'), 'w') as fobj:
+            fobj.write('not an image')
+
+    def tearDown(self):
+        shutil.rmtree(self.imagenet_dir)
+
+    def test_build_manifest(self):
+        """dlbs  ->  TestImageNetTools::test_build_manifest              [Scanning ImageNet directory.]"""
+        images = ImageNetTools.build_manifest(self.imagenet_dir, num_threads=2)
+        self.assertEqual(len(images), 6)
+        labels = ImageNetTools.get_labels()
+        for path, size, synset, label in images:
+            self.assertTrue(os.path.isfile(path))
+            self.assertEqual(size, os.path.getsize(path))
+            self.assertEqual(synset, os.path.basename(os.path.dirname(path)))
+            self.assertEqual(label, labels[synset]['label'])
+
+    def test_load_manifest(self):
+        """dlbs  ->  TestImageNetTools::test_load_manifest               [Loading manifest.]"""
+        manifest_file = os.path.join(self.imagenet_dir, MANIFEST_FILE)
+        images = ImageNetTools.build_manifest(self.imagenet_dir, manifest_file)
+        self.assertTrue(os.path.isfile(manifest_file))
+        # Manifest must be used instead of scanning directory. Changing content of a file
+        # does not change its class directory, so manifest is still valid.
+        with open(images[0][0], 'w') as fobj:
+            fobj.write('x' * 100)
+        self.assertEqual(ImageNetTools.get_manifest(self.imagenet_dir), images)
+        self.assertEqual(len(ImageNetTools.get_image_files(self.imagenet_dir, num_files=4)), 4)
+
+    def test_stale_manifest(self):
+        """dlbs  ->  TestImageNetTools::test_stale_manifest              [Detecting stale manifests.]"""
+        manifest_dir = tempfile.mkdtemp()
+        try:
+            # Manifest is stored outside of ImageNet directory.
+            manifest_file = os.path.join(manifest_dir, MANIFEST_FILE)
+            ImageNetTools.update_manifest(self.imagenet_dir, manifest_file)
+            self.assertTrue(ImageNetTools.is_manifest_valid(self.imagenet_dir, manifest_file))
+            self.assertFalse(os.path.exists(os.path.join(self.imagenet_dir, MANIFEST_FILE)))
+            # New class directory.
+            os.makedirs(os.path.join(self.imagenet_dir, 'n01484850'))
+            with open(os.path.join(self.imagenet_dir, 'n01484850', '6.JPEG'), 'w') as fobj:
+                fobj.write('x')
+            self.assertFalse(ImageNetTools.is_manifest_valid(self.imagenet_dir, manifest_file))
+            self.assertEqual(len(ImageNetTools.get_manifest(self.imagenet_dir, manifest_file)), 7)
+            ImageNetTools.update_manifest(self.imagenet_dir, manifest_file)
+            self.assertTrue(ImageNetTools.is_manifest_valid(self.imagenet_dir, manifest_file))
+            # Removed image.
+            os.remove(os.path.join(self.imagenet_dir, 'n01484850', '6.JPEG'))
+            self.assertEqual(len(ImageNetTools.get_images(self.imagenet_dir, manifest_file=manifest_file)), 6)
+            # Manifests without a header are never trusted.
+            with open(manifest_file, 'w') as fobj:
+                fobj.write('n01440764/0.JPEG,1,n01440764,0\n')
+            self.assertFalse(ImageNetTools.is_manifest_valid(self.imagenet_dir, manifest_file))
+        finally:
+            shutil.rmtree(manifest_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
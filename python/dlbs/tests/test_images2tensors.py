@@ -0,0 +1,86 @@
+# (c) Copyright [2017] Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""These unit tests test dlbs.data.images2tensors module."""
+import os
+import shutil
+import tempfile
+import unittest
+# append parent directory to import path
+import env #pylint: disable=W0611
+import numpy as np
+from dlbs.data import images2tensors
+from dlbs.data.tensors import open_tensors, partition_tensors
+
+
+@unittest.skipIf(not images2tensors.HAVE_PIL, "Pillow is not available")
+class TestImages2Tensors(unittest.TestCase):
+
+    def setUp(self):
+        self.input_dir = tempfile.mkdtemp()
+        self.output_dir = tempfile.mkdtemp()
+        for idx in range(5):
+            folder = os.path.join(self.input_dir, 'n0%d' % (idx % 2))
+            if not os.path.isdir(folder):
+                os.makedirs(folder)
+            img = np.random.randint(0, 255, (20 + idx, 30, 3)).astype(np.uint8)
+            images2tensors.Image.fromarray(img).save(os.path.join(folder, '%d.JPEG' % idx))
+
+    def tearDown(self):
+        shutil.rmtree(self.input_dir)
+        shutil.rmtree(self.output_dir)
+
+    def make_task(self, dtype, images_per_file):
+        """Returns conversion task for all images."""
+        return {'shard': 0, 'files': images2tensors.get_image_files(self.input_dir),
+                'input_dir': self.input_dir, 'output_dir': self.output_dir, 'size': 8,
+                'dtype': dtype, 'images_per_file': images_per_file}
+
+    def test_get_image_files(self):
+        """dlbs  ->  TestImages2Tensors::test_get_image_files            [Searching for images.]"""
+        self.assertEqual(len(images2tensors.get_image_files(self.input_dir)), 5)
+        self.assertEqual(len(images2tensors.get_image_files(self.input_dir, shuffle=True, num_images=3)), 3)
+
+    def test_convert_uchar(self):
+        """dlbs  ->  TestImages2Tensors::test_convert_uchar              [Multiple images per file.]"""
+        self.assertEqual(images2tensors.convert(self.make_task('uchar', 2)), (5, 5 * 3 * 8 * 8))
+        sizes = sorted(os.path.getsize(os.path.join(self.output_dir, name)) for name in os.listdir(self.output_dir))
+        self.assertEqual(sizes, [3 * 8 * 8, 2 * 3 * 8 * 8, 2 * 3 * 8 * 8])
+
+    def test_convert_float(self):
+        """dlbs  ->  TestImages2Tensors::test_convert_float              [One image per file.]"""
+        self.assertEqual(images2tensors.convert(self.make_task('float', 1)), (5, 5 * 4 * 3 * 8 * 8))
+        tensor = np.fromfile(os.path.join(self.output_dir, 'n00', '0.JPEG'), dtype=np.float32)
+        self.assertEqual(tensor.shape, (3 * 8 * 8,))
+
+    def test_open_tensors(self):
+        """dlbs  ->  TestImages2Tensors::test_open_tensors               [Reading tensors datasets.]"""
+        images2tensors.convert(self.make_task('uchar', 2))
+        files = open_tensors(self.output_dir, (3, 8, 8), np.uint8)
+        self.assertEqual(sorted(len(tensors) for tensors in files), [1, 2, 2])
+        self.assertEqual(files[0].shape[1:], (3, 8, 8))
+        with self.assertRaises(ValueError):
+            open_tensors(self.output_dir, (3, 7, 7), np.uint8)
+
+    def test_partition_tensors(self):
+        """dlbs  ->  TestImages2Tensors::test_partition_tensors          [Sharding of tensors datasets.]"""
+        images2tensors.convert(self.make_task('uchar', 5))
+        files = open_tensors(self.output_dir, (3, 8, 8), np.uint8)
+        self.assertEqual(len(files), 1)
+        shards = [partition_tensors(files, rank, 2) for rank in range(2)]
+        self.assertEqual([sum(len(tensors) for tensors in shard) for shard in shards], [2, 3])
+        np.testing.assert_array_equal(shards[1][0][0], files[0][2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+# (c) Copyright [2017] Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""These unit tests test dlbs.reports.resource_analysis module."""
+import unittest
+# append parent directory to import path
+import env #pylint: disable=W0611
+import numpy as np
+from dlbs.reports.resource_analysis import ResourceAnalysis
+
+
+def make_experiment(batch_times, cpu, gpus_power, num_gpus=1):
+    """Creates experiment with one monitor sample per 100 ms."""
+    num_samples = len(cpu)
+    return {
+        'exp.framework': 'pytorch',
+        'exp.num_gpus': num_gpus,
+        'pytorch.num_loader_threads': 4,
+        'results.start_time': '2018-11-05:13:46:40:000',
+        'results.end_time': '2018-11-05:13:46:%02d:%03d' % (40 + (100 * num_samples) // 1000,
+                                                           (100 * num_samples) % 1000),
+        'results.time_data': batch_times,
+        'results.use.time': ['2018-11-05:13:46:%02d:%03d' % (40 + (100 * i + 50) // 1000, (100 * i + 50) % 1000)
+                             for i in range(num_samples)],
+        'results.use.cpu': cpu,
+        'results.use.gpus': [[val] for val in gpus_power]
+    }
+
+
+class TestResourceAnalysis(unittest.TestCase):
+
+    def setUp(self):
+        # 20 batches, 100 ms each, every 4th batch is slow (200 ms). Total 25 samples.
+        self.batch_times = []
+        for idx in range(20):
+            self.batch_times.append(200.0 if idx % 4 == 3 else 100.0)
+        self.slow_samples = []
+        for idx, batch_time in enumerate(self.batch_times):
+            self.slow_samples.extend([batch_time > 100] * int(batch_time / 100))
+
+    def test_parse_timestamp(self):
+        """dlbs  ->  TestResourceAnalysis::test_parse_timestamp          [Parsing time stamps.]"""
+        start = ResourceAnalysis.parse_timestamp('2018-11-05:13:46:43:451')
+        end = ResourceAnalysis.parse_timestamp('2018-11-05:13:46:44:001')
+        self.assertAlmostEqual(end - start, 0.55)
+
+    def test_batch_timeline(self):
+        """dlbs  ->  TestResourceAnalysis::test_batch_timeline           [Batch timeline.]"""
+        exp = make_experiment(self.batch_times, [100.0] * 25, [200.0] * 25)
+        starts, ends = ResourceAnalysis.get_batch_timeline(exp)
+        np.testing.assert_allclose(ends - starts, np.array(self.batch_times) / 1000.0, atol=1e-6)
+        self.assertAlmostEqual(ends[-1], ResourceAnalysis.parse_timestamp(exp['results.end_time']))
+        self.assertAlmostEqual(starts[0], ResourceAnalysis.parse_timestamp(exp['results.start_time']))
+
+    def test_compute_bound(self):
+        """dlbs  ->  TestResourceAnalysis::test_compute_bound            [Compute bound experiment.]"""
+        exp = make_experiment([100.0] * 25, [100.0] * 25, [200.0] * 25)
+        self.assertEqual(ResourceAnalysis.analyze(exp, num_cores=4)['label'], 'compute-bound')
+
+    def test_input_bound(self):
+        """dlbs  ->  TestResourceAnalysis::test_input_bound              [Input bound experiment.]"""
+        cpu = [400.0 if slow else 150.0 for slow in self.slow_samples]
+        power = [200.0] * 25
+        report = ResourceAnalysis.analyze(make_experiment(self.batch_times, cpu, power), num_cores=4)
+        self.assertEqual(report['label'], 'input-bound')
+        self.assertTrue(report['flagged'])
+        self.assertEqual(report['slow_batches'], 5)
+        self.assertIn('pytorch.num_loader_threads', report['recommendation'])
+
+    def test_interconnect_bound(self):
+        """dlbs  ->  TestResourceAnalysis::test_interconnect_bound       [Interconnect bound experiment.]"""
+        cpu = [150.0] * 25
+        power = [50.0 if slow else 250.0 for slow in self.slow_samples]
+        exp = make_experiment(self.batch_times, cpu, power, num_gpus=4)
+        self.assertEqual(ResourceAnalysis.analyze(exp, num_cores=4)['label'], 'interconnect-bound')
+        exp['exp.num_gpus'] = 1
+        self.assertEqual(ResourceAnalysis.analyze(exp, num_cores=4)['label'], 'input-bound')
+
+    def test_unknown(self):
+        """dlbs  ->  TestResourceAnalysis::test_unknown                  [No resource monitor data.]"""
+        exp = {'results.time_data': self.batch_times}
+        self.assertEqual(ResourceAnalysis.analyze(exp)['label'], 'unknown')
+
+
+if __name__ == '__main__':
+    unittest.main()
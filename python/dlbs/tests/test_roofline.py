@@ -0,0 +1,61 @@
+# (c) Copyright [2017] Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""These unit tests test dlbs.reports.roofline module."""
+import unittest
+# append parent directory to import path
+import env #pylint: disable=W0611
+from dlbs.reports.roofline import Roofline
+
+
+class TestRoofline(unittest.TestCase):
+
+    def setUp(self):
+        # 1 GFLOP and 10 MB of traffic per sample (inference), weights are 4 MB.
+        self.costs = {'net': {'flops': 1e9, 'param_bytes': 4e6, 'activation_bytes': 3e6}}
+        self.exp = {'exp.model': 'net', 'exp.phase': 'inference', 'exp.replica_batch': 1,
+                    'exp.num_gpus': 1, 'exp.dtype': 'float32', 'results.throughput': 1000.0}
+
+    def test_sample_cost(self):
+        """dlbs  ->  TestRoofline::test_sample_cost                      [Per sample cost.]"""
+        self.assertEqual(Roofline.get_sample_cost(self.exp, self.costs['net']), (1e9, 1e7))
+        exp = dict(self.exp, **{'exp.phase': 'training', 'exp.replica_batch': 4, 'exp.dtype': 'float16'})
+        self.assertEqual(Roofline.get_sample_cost(exp, self.costs['net']), (3e9, 3 * 0.5 * 7e6))
+
+    def test_compute_bound(self):
+        """dlbs  ->  TestRoofline::test_compute_bound                    [Compute bound experiment.]"""
+        report = Roofline.analyze(self.exp, self.costs, peak_flops=10e12, peak_bandwidth=1e12)
+        self.assertEqual(report['bound'], 'compute')
+        self.assertAlmostEqual(report['arithmetic_intensity'], 100.0)
+        self.assertAlmostEqual(report['efficiency'], 0.1)
+        self.assertTrue(report['flagged'])
+        report = Roofline.analyze(dict(self.exp, **{'results.throughput': 5000.0}), self.costs, 10e12, 1e12)
+        self.assertFalse(report['flagged'])
+
+    def test_memory_bound(self):
+        """dlbs  ->  TestRoofline::test_memory_bound                     [Memory bound experiment.]"""
+        exp = dict(self.exp, **{'exp.num_gpus': 2})
+        report = Roofline.analyze(exp, self.costs, peak_flops=100e12, peak_bandwidth=0.1e12)
+        self.assertEqual(report['bound'], 'memory')
+        self.assertAlmostEqual(report['attainable_flops'], 2 * 10e12)
+        self.assertAlmostEqual(report['achieved_bandwidth'], 1e10)
+        self.assertAlmostEqual(report['efficiency'], 0.05)
+
+    def test_no_data(self):
+        """dlbs  ->  TestRoofline::test_no_data                          [Unknown models and failed runs.]"""
+        self.assertIsNone(Roofline.analyze(dict(self.exp, **{'exp.model': 'unknown'}), self.costs, 1e12, 1e12))
+        self.assertIsNone(Roofline.analyze(dict(self.exp, **{'results.throughput': -1}), self.costs, 1e12, 1e12))
+
+
+if __name__ == '__main__':
+    unittest.main()
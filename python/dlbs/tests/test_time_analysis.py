@@ -0,0 +1,95 @@
+# (c) Copyright [2017] Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""These unit tests test dlbs.reports.time_analysis module."""
+import unittest
+# append parent directory to import path
+import env #pylint: disable=W0611
+import numpy as np
+from dlbs.reports.time_analysis import TimeAnalysis, simple_moving_average
+
+
+class TestTimeAnalysis(unittest.TestCase):
+
+    def setUp(self):
+        self.series = [
+            [10.0, 11.0, 9.0, 10.0, 10.0, 12.0],
+            [5.0, 5.0, 5.0]
+        ]
+        self.matrix, self.lengths = TimeAnalysis.pad(self.series)
+
+    def test_pad(self):
+        """dlbs  ->  TestTimeAnalysis::test_pad                          [Padding of time series.]"""
+        self.assertEqual(self.matrix.shape, (2, 6))
+        self.assertEqual(self.lengths.tolist(), [6, 3])
+        self.assertTrue(np.all(np.isnan(self.matrix[1, 3:])))
+
+    def test_moving_average(self):
+        """dlbs  ->  TestTimeAnalysis::test_moving_average               [Moving average of multiple series.]"""
+        averages = TimeAnalysis.moving_average(self.matrix, self.lengths, 3)
+        for idx, times in enumerate(self.series):
+            _, expected = simple_moving_average(np.array(times + [0.0]), 3)
+            np.testing.assert_allclose(averages[idx, 2:self.lengths[idx]], expected[0:self.lengths[idx] - 2])
+        self.assertTrue(np.all(np.isnan(averages[:, 0:2])))
+        self.assertTrue(np.all(np.isnan(averages[1, 3:])))
+
+    def test_simple_moving_average(self):
+        """dlbs  ->  TestTimeAnalysis::test_simple_moving_average        [Moving average of one series.]"""
+        xs, ys = simple_moving_average(np.array(self.series[0]), 2)
+        self.assertEqual(list(xs), [2, 3, 4, 5])
+        np.testing.assert_allclose(ys, [10.5, 10.0, 9.5, 10.0])
+        self.assertEqual(simple_moving_average(np.array(self.series[1]), 3), (None, None))
+
+    def test_ewma(self):
+        """dlbs  ->  TestTimeAnalysis::test_ewma                         [Exponentially weighted moving average.]"""
+        averages = TimeAnalysis.ewma(self.matrix, 0.5)
+        np.testing.assert_allclose(averages[0, 0:3], [10.0, 10.5, 9.75])
+        np.testing.assert_allclose(averages[1, 0:3], [5.0, 5.0, 5.0])
+
+    def test_stalls(self):
+        """dlbs  ->  TestTimeAnalysis::test_stalls                       [Periodic stalls detection.]"""
+        times = np.ones((2, 40))
+        times[0, 4::10] = 5.0
+        times[1, [3, 5, 30]] = 5.0
+        mask, periods = TimeAnalysis.stalls(times, factor=2.0)
+        self.assertEqual(mask.sum(axis=1).tolist(), [4, 3])
+        self.assertEqual(periods[0], 10)
+        self.assertTrue(np.isnan(periods[1]))
+
+    def test_summary(self):
+        """dlbs  ->  TestTimeAnalysis::test_summary                      [Summary statistics.]"""
+        times = np.ones((1, 100))
+        times[0, 50] = 10.0
+        stats = TimeAnalysis.summary(times, np.array([100]))
+        self.assertEqual(stats['num_outliers'][0], 1)
+        self.assertEqual(stats['num_stalls'][0], 1)
+        self.assertAlmostEqual(stats['median'][0], 1.0)
+        self.assertAlmostEqual(stats['jitter'][0], 18.0 / 99)
+
+    def test_summary_moving_average(self):
+        """dlbs  ->  TestTimeAnalysis::test_summary_moving_average       [Smoothed batch times in a summary.]"""
+        stats = TimeAnalysis.summary(self.matrix, self.lengths, sma_window=4)
+        np.testing.assert_allclose(stats['sma_last'][0], 41.0 / 4)
+        np.testing.assert_allclose(stats['sma_max'][0], 41.0 / 4)
+        self.assertTrue(np.isnan(stats['sma_last'][1]))
+        self.assertTrue(np.isnan(stats['sma_max'][1]))
+
+    def test_summary_zero_mean(self):
+        """dlbs  ->  TestTimeAnalysis::test_summary_zero_mean            [Coefficient of variation of zero times.]"""
+        stats = TimeAnalysis.summary(np.zeros((1, 10)), np.array([10]))
+        self.assertEqual(stats['mean'][0], 0.0)
+        self.assertTrue(np.isnan(stats['cv'][0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -22,6 +22,7 @@ It uses several huristics for that. This is what is checked:
    image exists.
 4. `Host framework check`: for a number of frameworks, if they are to run in a host OS,
    validator checks it can do that with provided environmental variables.
+5. `Phase check`: 'serving' phase is only used with PyTorch experiments.
 
 Usage:
 ::
@@ -90,6 +91,13 @@ class Validator(object):
                     elif log_file in log_files:
                         self.log_files_collisions.add(log_file)
                     log_files.add(log_file)
+            # Serving phase (online inference with dynamic batching) is only implemented by PyTorch backend.
+            if experiment.get('exp.phase') == 'serving' and experiment.get('exp.framework') != 'pytorch' and \
+               experiment.get('exp.status') != 'disabled':
+                self.errors.append(
+                    "Framework '%s' does not support 'serving' phase (exp.phase=serving). Only PyTorch "
+                    "supports it." % experiment.get('exp.framework')
+                )
             # Update framework statistics
             self.update_framework_stats(experiment)
 
@@ -39,6 +39,10 @@ To run from a command line, this module accepts the following parameters:
 
 * **--model** A model to benchmark ("alexnet", "googlenet" ...)
 * **--forward_only** Benchmark inference (if true) else benchmark training
+* **--data_loader_only** Benchmark only data ingestion pipeline (requires **--data_dir**)
+* **--api** Execution API: "module" (mx.mod.Module) or "gluon" (hybridized mx.gluon.SymbolBlock)
+* **--lean_training** Training loop without metric updates and per-batch host synchronization
+* **--sync_interval** Lean training: number of batches between timing points
 * **--batch_size** Per device batch size
 * **--num_warmup_batches** Number of warmup iterations
 * **--num_batches** Number of benchmark iterations
@@ -47,6 +51,8 @@ To run from a command line, this module accepts the following parameters:
 * **--data_dir** Path to the LMDB or LEVELDB data base
 * **--kv_store** Type of gradient aggregation schema (local, device, dist_sync, dist_device_sync, dist_async). See https://mxnet.incubator.apache.org/how_to/multi_devices.html for more details.
 * **--dtype** Precision of data variables: float(same as float32), float32 or float16
+* **--synthetic_batches** Number of distinct batches in a pool of synthetic data
+* **--synthetic_decode_cost** Emulated decode cost (milliseconds per batch) for synthetic data
 """
 
 from __future__ import absolute_import
@@ -92,6 +98,70 @@ def get_devices(opts):
     return devs
 
 
+class DataBatches(object):
+    """Endless sequence of batches from a data iterator that is reset when exhausted."""
+
+    def __init__(self, data):
+        """Initializes this sequence.
+
+        :param mx.io.DataIter data: A data iterator.
+        """
+        self.data = data
+        self.data_iter = iter(data)
+        self.next_batch = self.__fetch()
+
+    def __fetch(self):
+        try:
+            return next(self.data_iter)
+        except StopIteration:
+            self.data.reset()
+            self.data_iter = iter(self.data)
+            return next(self.data_iter)
+
+    def peek(self):
+        """Returns next batch without consuming it (to prefetch it)."""
+        return self.next_batch
+
+    def next(self):
+        """Returns next batch."""
+        batch, self.next_batch = self.next_batch, self.__fetch()
+        return batch
+
+
+def run_timed_batches(step, num_warmup_batches, num_batches, sync_interval=0):
+    """Runs warmup and benchmark batches synchronizing host and devices only at timing points.
+
+    The `mx.nd.waitall()` is called after warmup batches and then every `sync_interval`
+    batches. Time of every batch within one timing interval is the average batch time in
+    this interval.
+
+    :param callable step: A function without arguments that runs one batch.
+    :param int num_warmup_batches: Number of warmup batches.
+    :param int num_batches: Number of benchmark batches.
+    :param int sync_interval: Number of batches between timing points. If not positive,
+                              there are only two timing points - before first and after
+                              last benchmark batch.
+    :return: Numpy array of length `num_batches` with batch times in seconds.
+    """
+    if sync_interval <= 0:
+        sync_interval = num_batches
+    batch_times = np.zeros(num_batches)
+    interval_start, interval_tic = 0, None
+    for nbatch in range(num_warmup_batches + num_batches):
+        if nbatch == num_warmup_batches:
+            mx.nd.waitall()
+            interval_tic = timeit.default_timer()
+        step()
+        bench_batch = nbatch - num_warmup_batches
+        if bench_batch >= 0 and (bench_batch + 1 - interval_start == sync_interval or
+                                 bench_batch == num_batches - 1):
+            mx.nd.waitall()
+            toc = timeit.default_timer()
+            batch_times[interval_start:bench_batch + 1] = (toc - interval_tic) / (bench_batch + 1 - interval_start)
+            interval_start, interval_tic = bench_batch + 1, toc
+    return batch_times
+
+
 class BenchmarkingModule(mx.mod.Module):
     """This is a copy past from mxnet project.
 
@@ -204,6 +274,37 @@ class BenchmarkingModule(mx.mod.Module):
                 break
             train_data.reset()
 
+    def fit_lean(self, train_data, num_warmup_batches, num_batches, sync_interval=0,
+                 kvstore='local', optimizer='sgd', optimizer_params=(('learning_rate', 0.01),),
+                 initializer=mx.initializer.Uniform(0.01)):
+        """A training loop that does only what throughput benchmark needs.
+
+        Compared to `fit`, this loop does not update evaluation metric (that forces host
+        synchronization on every batch), does not copy parameters and does not log anything
+        at the end of an epoch. Host and devices are synchronized only at timing points, see
+        `run_timed_batches`.
+
+        :param mx.io.DataIter train_data: Training data iterator. Reset when exhausted.
+        :param int num_warmup_batches: Number of warmup batches.
+        :param int num_batches: Number of benchmark batches.
+        :param int sync_interval: Number of batches between timing points.
+        :return: Numpy array of length `num_batches` with batch times in seconds.
+        """
+        self.bind(data_shapes=train_data.provide_data, label_shapes=train_data.provide_label,
+                  for_training=True)
+        self.init_params(initializer=initializer)
+        self.init_optimizer(kvstore=kvstore, optimizer=optimizer,
+                            optimizer_params=optimizer_params)
+        batches = DataBatches(train_data)
+
+        def _step():
+            data_batch = batches.next()
+            self.forward_backward(data_batch)
+            self.update()
+            self.prepare(batches.peek())
+
+        return run_timed_batches(_step, num_warmup_batches, num_batches, sync_interval)
+
 
 class BatchEndCallback(object):
     """A callback for an end-of-batch event. Counts number of batches processed.
@@ -278,7 +379,7 @@ def benchmark(opts):
     """
     assert 'model' in opts, "Missing 'model' in options."
     assert 'phase' in opts, "Missing 'phase' in options."
-    assert opts['phase'] in ['inference', 'training'], "Invalid value for 'phase' (%s). Must be 'inference' or 'training'." % (opts['phase'])
+    assert opts['phase'] in ['inference', 'training', 'data_ingestion'], "Invalid value for 'phase' (%s). Must be 'inference', 'training' or 'data_ingestion'." % (opts['phase'])
     try:
         opts['model_opts'] = json.loads(opts.get('model_opts', "{}"))
     except ValueError:
@@ -291,7 +392,13 @@ def benchmark(opts):
     opts['num_gpus'] = opts.get('num_gpus', 1)
     opts['dtype'] = opts.get('dtype', 'float')
     opts['enable_tensor_core'] = opts.get('enable_tensor_core', False)
+    opts['api'] = opts.get('api', 'module')
 
+    if opts['phase'] == 'data_ingestion':
+        # Models expect 'inference' or 'training'. The model will not be used - we
+        # just need to know input/labels shapes and labels range.
+        model = ModelFactory.get_model(dict(opts, phase='training'))
+        return benchmark_data_ingestion(model, opts)
     model = ModelFactory.get_model(opts)
     if opts['phase'] == 'inference':
         return benchmark_inference(model, opts)
@@ -299,6 +406,42 @@ def benchmark(opts):
         return benchmark_training(model, opts)
 
 
+def benchmark_data_ingestion(model, opts):
+    """ Iterates over a data iterator and returns array of batch times in seconds.
+
+    The data iterator is the same as for training benchmarks. A batch is considered
+    to be loaded when its data tensors are ready to be read.
+
+    :param obj model: A model from `./models` folder. Only used to get shapes.
+    :param dict opts: Options for the data ingestion benchmark.
+    :return: Tuple of model title and numpy array containing batch times.
+    :rtype: (string, numpy array)
+    """
+    if 'data_dir' not in opts or not opts['data_dir']:
+        raise ValueError("Data ingestion benchmarks: dataset not provided (--data_dir)")
+    kv = mx.kvstore.create(opts['kv_store']) if opts['kv_store'].startswith('dist') else None
+    data_iter = DataIteratorFactory.get(
+        (get_local_batch_size(opts),) + model.input_shape,
+        (get_local_batch_size(opts),) + model.labels_shape,
+        model.labels_range,
+        opts,
+        kv_store=kv
+    )
+    batch_times = np.zeros(opts['num_batches'])
+    for i in range(opts['num_warmup_batches'] + opts['num_batches']):
+        start_time = timeit.default_timer()
+        try:
+            batch = data_iter.next()
+        except StopIteration:
+            data_iter.reset()
+            batch = data_iter.next()
+        for data in batch.data:
+            data.wait_to_read()
+        if i >= opts['num_warmup_batches']:
+            batch_times[i - opts['num_warmup_batches']] = timeit.default_timer() - start_time
+    return (model.name, batch_times)
+
+
 def benchmark_inference(model, opts):
     """ Runs N inferences and returns array of batch times in seconds.
 
@@ -312,6 +455,8 @@ def benchmark_inference(model, opts):
 
     data_shape = [('data', (opts['batch_size'],) + model.input_shape)]
     device = get_devices(opts)[0]
+    if opts.get('api', 'module') == 'gluon':
+        return (model.name, benchmark_inference_gluon(model, device, opts))
 
     mod = mx.mod.Module(symbol=model.output, context=device, label_names=None)
     mod.bind(for_training=False, inputs_need_grad=False, data_shapes=data_shape)
@@ -336,7 +481,22 @@ def benchmark_training(model, opts):
     )
     devices = get_devices(opts)
 
+    if opts.get('api', 'module') == 'gluon':
+        return (model.name, benchmark_training_gluon(model, train_data, kv, devices, opts))
+
     mod = BenchmarkingModule(symbol=model.output, context=devices)
+    if opts.get('lean_training', False):
+        batch_times = mod.fit_lean(
+            train_data,
+            opts['num_warmup_batches'],
+            opts['num_batches'],
+            sync_interval=opts.get('sync_interval', 0),
+            kvstore=kv,
+            optimizer='sgd',
+            optimizer_params={'multi_precision': True},
+            initializer=mx.init.Normal()
+        )
+        return (model.name, batch_times)
     batch_end_callback = BatchEndCallback(opts['num_warmup_batches'], opts['num_batches'])
     #print ("Starting benchmarks.")
     mod.fit(
@@ -352,6 +512,75 @@ def benchmark_training(model, opts):
     return (model.name, batch_end_callback.batch_times)
 
 
+def get_gluon_block(model, input_names):
+    """Wraps model's symbol into a Gluon block hybridized with static memory allocation.
+
+    :param obj model: A model from `./models` folder.
+    :param list input_names: Names of symbol's input variables, in order they are passed
+                             to the block. All other arguments become block's parameters.
+    :return: Instance of `mx.gluon.SymbolBlock`. Parameters are not initialized.
+    """
+    inputs = [mx.sym.var(name) for name in input_names]
+    net = mx.gluon.SymbolBlock(outputs=model.output, inputs=inputs)
+    net.hybridize(static_alloc=True, static_shape=True)
+    return net
+
+
+def benchmark_inference_gluon(model, device, opts):
+    """Runs N inferences with a Gluon hybridized model.
+
+    Same symbol, initializer and input data as in :py:func:`benchmark_inference`. Host and
+    device are synchronized after every batch.
+
+    :param obj model: A model from `./models` folder.
+    :param device: A device to run inference on.
+    :param dict opts: Options for the inference benchmark.
+    :return: Numpy array containing batch times.
+    """
+    net = get_gluon_block(model, ['data'])
+    net.collect_params().initialize(mx.init.Xavier(magnitude=2.), ctx=device)
+    data = mx.random.uniform(-1.0, 1.0, shape=(opts['batch_size'],) + model.input_shape, ctx=device)
+    return run_timed_batches(lambda: net(data), opts['num_warmup_batches'], opts['num_batches'],
+                             sync_interval=1)
+
+
+def benchmark_training_gluon(model, train_data, kv, devices, opts):
+    """Runs training with a Gluon hybridized model.
+
+    A model's training symbol (including its loss head) is wrapped into a block that
+    takes data and labels. Every batch is split across devices, gradients are computed
+    with autograd and applied with `mx.gluon.Trainer`. Host and devices are synchronized
+    after every batch or, in lean training mode, every `sync_interval` batches.
+
+    :param obj model: A model from `./models` folder.
+    :param mx.io.DataIter train_data: Training data iterator.
+    :param mx.kvstore.KVStore kv: A KV store to aggregate gradients.
+    :param list devices: Devices to run training on.
+    :param dict opts: Options for the training benchmark.
+    :return: Numpy array containing batch times.
+    """
+    input_names = [name for name in ('data', 'softmax_label') if name in model.output.list_arguments()]
+    net = get_gluon_block(model, input_names)
+    net.collect_params().initialize(mx.init.Normal(), ctx=devices)
+    trainer = mx.gluon.Trainer(net.collect_params(), 'sgd', {'multi_precision': True}, kvstore=kv)
+    # Same gradient scaling as in Module.init_optimizer.
+    batch_size = get_local_batch_size(opts)
+    if 'dist' in kv.type and '_sync' in kv.type:
+        batch_size *= kv.num_workers
+    batches = DataBatches(train_data)
+
+    def _step():
+        batch = batches.next()
+        inputs = [mx.gluon.utils.split_and_load(array, devices) for array in batch.data + batch.label]
+        with mx.autograd.record():
+            outputs = [net(*device_inputs[:len(input_names)]) for device_inputs in zip(*inputs)]
+        mx.autograd.backward([out for device_outputs in outputs for out in mx.base._as_list(device_outputs)])
+        trainer.step(batch_size)
+
+    sync_interval = opts.get('sync_interval', 0) if opts.get('lean_training', False) else 1
+    return run_timed_batches(_step, opts['num_warmup_batches'], opts['num_batches'], sync_interval)
+
+
 def main():
     if 'DLBS_DEBUG' in os.environ and os.environ['DLBS_DEBUG'] == '1':
         logging.getLogger().setLevel(logging.DEBUG)
@@ -365,6 +594,10 @@ def main():
     parser.add_argument('--model', type=str, required=True, default='', help='A model to benchmark ("alexnet", "googlenet" ...)')
     parser.add_argument('--model_opts', type=str, required=False, default='{}', help='Model\'s additional parameters (flat JSON dictionary).')
     parser.add_argument('--forward_only', nargs='?', const=True, default=False, type=str2bool, help='Benchmark inference (if true) else benchmark training.')
+    parser.add_argument('--data_loader_only', nargs='?', const=True, default=False, type=str2bool, help='Benchmark only data ingestion pipeline (requires --data_dir).')
+    parser.add_argument('--api', type=str, required=False, default='module', choices=['module', 'gluon'], help='Execution API: symbolic Module or hybridized Gluon SymbolBlock (static_alloc, static_shape).')
+    parser.add_argument('--lean_training', nargs='?', const=True, default=False, type=str2bool, help='Use training loop without metric updates and per-batch host synchronization.')
+    parser.add_argument('--sync_interval', type=int, required=False, default=0, help='Lean training: number of batches between timing points (mx.nd.waitall). If 0, synchronize only before first and after last benchmark batch.')
     parser.add_argument('--batch_size', type=int, required=True, default=None, help='Per device batch size')
     parser.add_argument('--num_batches', type=int, required=False, default=100, help='Number of benchmark iterations')
     parser.add_argument('--num_warmup_batches', type=int, required=False, default=1, help='Number of warmup iterations')
@@ -376,6 +609,10 @@ def main():
     parser.add_argument('--dtype', required=False, default='float', choices=['float', 'float32', 'float16'], help='Precision of data variables: float(same as float32), float32 or float16.')
     parser.add_argument('--data_dir', type=str, required=False, default='', help='Path to the image RecordIO (.rec) file or a directory path. Created with tools/im2rec.py.')
 
+    parser.add_argument('--synthetic_batches', type=int, required=False, default=1, help='Number of distinct batches in a pool of synthetic data.')
+    parser.add_argument('--synthetic_decode_cost', type=float, required=False, default=0, help='Emulated decode cost (milliseconds per batch) for synthetic data.')
+    parser.add_argument('--data_backend', type=str, required=False, default='recordio', choices=['recordio', 'tensors'], help='Type of a dataset in --data_dir: RecordIO file or tensors dataset (images2tensors).')
+    parser.add_argument('--tensors_dtype', type=str, required=False, default='uchar', choices=['uchar', 'float'], help='Data type of images in a tensors dataset.')
     parser.add_argument('--preprocess_threads', type=int, required=False, default=4, help='Number preprocess threads for data ingestion pipeline when real data is used.')
     parser.add_argument('--prefetch_buffer', type=int, required=False, default=10, help='Number of batches to prefetch (buffer size)')
     args = parser.parse_args()
@@ -385,7 +622,10 @@ def main():
 
     try:
         opts = vars(args)
-        opts['phase'] = 'inference' if args.forward_only else 'training'
+        if args.data_loader_only:
+            opts['phase'] = 'data_ingestion'
+        else:
+            opts['phase'] = 'inference' if args.forward_only else 'training'
         model_title, times = benchmark(opts)
     except Exception, e:
         #TODO: this is not happenning, program terminates earlier.
@@ -12,9 +12,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 """Classes defined in this module implement various data iterators."""
+import timeit
 import mxnet as mx
 from mxnet.io import DataBatch, DataIter
 import numpy as np
+from dlbs.data.tensors import open_tensors, partition_tensors
 
 
 class SyntheticDataIterator(DataIter):
@@ -23,8 +25,13 @@ class SyntheticDataIterator(DataIter):
     See this page for more details:
     https://github.com/apache/incubator-mxnet/blob/master/example/image-classification/common/data.py
     Works with two standard input tensors - data tensor and label tensor.
+
+    A pool of `num_batches` distinct batches is generated once and batches are returned
+    in round robin order. Optionally, decoding is emulated - every batch is copied from
+    the pool into a data tensor, repeatedly, for at least `decode_cost` milliseconds.
     """
-    def __init__(self, data_shape, label_shape, labels_range, max_iter=100, dtype=np.float32):
+    def __init__(self, data_shape, label_shape, labels_range, max_iter=100, dtype=np.float32,
+                 num_batches=1, decode_cost=0):
         """MXNet partitions data batch evenly among the available GPUs. Here, the
            batch size is the effective batch size.
            
@@ -39,16 +46,21 @@ class SyntheticDataIterator(DataIter):
                              the dataset size. If negative, will iterate forever and will
                              never throw `StopIteration` exception.
         :param dtype: Type of data (float32, float16).
+        :param int num_batches: Number of distinct batches in a pool.
+        :param float decode_cost: Emulated decode cost, milliseconds per batch.
         """
         super(SyntheticDataIterator, self).__init__(data_shape[0])
         self.cur_iter = 0
         self.max_iter = max_iter
         self.dtype = dtype
-        self.data = mx.nd.array(
-            np.random.uniform(-1, 1, data_shape),
-            dtype=self.dtype,
-            ctx=mx.Context('cpu_pinned', 0)
-        )
+        self.pool = [
+            mx.nd.array(np.random.uniform(-1, 1, data_shape), dtype=self.dtype, ctx=mx.Context('cpu_pinned', 0))
+            for _ in range(max(1, num_batches))
+        ]
+        self.decode_cost = decode_cost / 1000.0
+        self.data = self.pool[0]
+        if self.decode_cost > 0:
+            self.data = mx.nd.zeros(data_shape, dtype=self.dtype, ctx=mx.Context('cpu_pinned', 0))
         self.label_shape = label_shape
         if not self.label_shape:
             self.label_shape = [self.batch_size,]
@@ -58,6 +70,10 @@ class SyntheticDataIterator(DataIter):
             dtype=self.dtype,
             ctx=mx.Context('cpu_pinned', 0)
         )
+        print("Synthetic data: pool of %d batches (%.2f MB), decode cost %.2f ms." % (
+            len(self.pool), len(self.pool) * self.data.size * np.dtype(self.dtype).itemsize / 1e6,
+            decode_cost
+        ))
 
     def __iter__(self):
         return self
@@ -76,6 +92,106 @@ class SyntheticDataIterator(DataIter):
         """
         self.cur_iter += 1
         if self.max_iter < 0 or self.cur_iter <= self.max_iter:
+            batch = self.pool[self.cur_iter % len(self.pool)]
+            if self.decode_cost > 0:
+                start = timeit.default_timer()
+                batch.copyto(self.data).wait_to_read()
+                while timeit.default_timer() - start < self.decode_cost:
+                    batch.copyto(self.data).wait_to_read()
+                batch = self.data
+            return DataBatch(data=(batch,),
+                             label=(self.label,),
+                             pad=0,
+                             index=None,
+                             provide_data=self.provide_data,
+                             provide_label=self.provide_label)
+        else:
+            raise StopIteration
+
+    def __next__(self):
+        return self.next()
+
+    def reset(self):
+        self.cur_iter = 0
+
+
+class TensorsDataIterator(DataIter):
+    """Feeds images from a tensors dataset (see `images2tensors`).
+
+    Tensors datasets are binary files that contain images of shape (3, Size, Size)
+    stored as uint8 or float32 arrays without any meta information. Files are memory
+    mapped, batches are slices of these mappings and are copied once into a data
+    tensor allocated with `cpu_pinned` context. Datasets do not contain labels, random
+    labels are used.
+    """
+    def __init__(self, data_dir, data_shape, label_shape, labels_range, tensors_dtype='uchar',
+                 max_iter=100, dtype='float32', rank=0, num_workers=1):
+        """Constructor.
+
+        :param str data_dir: Dataset directory. Is scanned recursively.
+        :param tuple data_shape: Shape of input data tensor (X) including batch size.
+        :param tuple label_shape: Shape of labels tensor.
+        :param tuple labels_range: Range (min, max) of labels.
+        :param str tensors_dtype: Data type of images in files ('uchar' or 'float').
+        :param int max_iter: Maximal number of iterations to perform. If negative, will
+                             iterate forever.
+        :param dtype: Type of data (float32, float16).
+        :param int rank: Rank of this worker, images are partitioned among workers.
+        :param int num_workers: Number of workers.
+        """
+        super(TensorsDataIterator, self).__init__(data_shape[0])
+        self.cur_iter = 0
+        self.max_iter = max_iter
+        self.dtype = dtype
+        files = open_tensors(data_dir, tuple(data_shape[1:]),
+                             np.uint8 if tensors_dtype == 'uchar' else np.float32)
+        if num_workers > 1:
+            files = partition_tensors(files, rank, num_workers)
+        if not files:
+            raise ValueError("No tensors found in '%s' for input shape %s." % (data_dir, str(data_shape[1:])))
+        self.files = files
+        self.file_index = 0
+        self.offset = 0
+        self.data = mx.nd.zeros(data_shape, dtype=self.dtype, ctx=mx.Context('cpu_pinned', 0))
+        self.label_shape = label_shape
+        if not self.label_shape:
+            self.label_shape = [self.batch_size,]
+        self.label = mx.nd.array(
+            np.random.randint(labels_range[0], labels_range[1] + 1, self.label_shape),
+            dtype=self.dtype,
+            ctx=mx.Context('cpu_pinned', 0)
+        )
+
+    def __iter__(self):
+        return self
+
+    @property
+    def provide_data(self):
+        return [mx.io.DataDesc('data', self.data.shape, self.dtype)]
+
+    @property
+    def provide_label(self):
+        return [mx.io.DataDesc('softmax_label', self.label_shape, self.dtype)]
+
+    def next_tensors(self):
+        """Returns next batch as a numpy array (view of a memory mapped file if possible)."""
+        chunks = []
+        num_images = 0
+        while num_images < self.batch_size:
+            tensors = self.files[self.file_index]
+            count = min(self.batch_size - num_images, len(tensors) - self.offset)
+            chunks.append(tensors[self.offset:self.offset + count])
+            num_images += count
+            self.offset += count
+            if self.offset >= len(tensors):
+                self.file_index = (self.file_index + 1) % len(self.files)
+                self.offset = 0
+        return chunks[0] if len(chunks) == 1 else np.concatenate(chunks)
+
+    def next(self):
+        self.cur_iter += 1
+        if self.max_iter < 0 or self.cur_iter <= self.max_iter:
+            self.data[:] = self.next_tensors()
             return DataBatch(data=(self.data,),
                              label=(self.label,),
                              pad=0,
@@ -93,10 +209,10 @@ class SyntheticDataIterator(DataIter):
 
 
 class DataIteratorFactory(object):
-    """A factory that now creates two types of data iterators.
+    """A factory that now creates three types of data iterators.
     
-    The one is a synthetic data iterator that feeds random tensors, the other one
-    is actually an ImageRecordIter.
+    The one is a synthetic data iterator that feeds random tensors, the second one
+    feeds memory mapped tensors datasets and the third one is actually an ImageRecordIter.
     """
     @staticmethod
     def get(data_shape, label_shape, labels_range, opts, kv_store=None):
@@ -119,13 +235,27 @@ class DataIteratorFactory(object):
                 max_iter=opts['num_warmup_batches'] + opts['num_batches'],
                 #dtype=opts['dtype']
                 #dtype=np.float32
-                dtype='float32'
+                dtype='float32',
+                num_batches=opts.get('synthetic_batches', 1),
+                decode_cost=opts.get('synthetic_decode_cost', 0)
             )
         else:
             if kv_store:
                 (rank, nworker) = (kv_store.rank, kv_store.num_workers)
             else:
                 (rank, nworker) = (0, 1)
+            if opts.get('data_backend', 'recordio') == 'tensors':
+                return TensorsDataIterator(
+                    opts['data_dir'],
+                    data_shape,
+                    label_shape,
+                    labels_range,
+                    tensors_dtype=opts.get('tensors_dtype', 'uchar'),
+                    max_iter=opts['num_warmup_batches'] + opts['num_batches'],
+                    dtype='float32',
+                    rank=rank,
+                    num_workers=nworker
+                )
             # https://mxnet.incubator.apache.org/api/python/io.html#mxnet.io.ImageRecordIter
             # https://github.com/apache/incubator-mxnet/blob/master/example/image-classification/common/data.py
             data_iter = mx.io.ImageRecordIter(
@@ -138,7 +268,7 @@ class DataIteratorFactory(object):
                 rand_mirror=True,
                 #dtype=opts['dtype'],
                 preprocess_threads = opts.get('preprocess_threads', 4),
-                prefetch_buffer = opts.get('prefetch_buffer ', 10),
+                prefetch_buffer = opts.get('prefetch_buffer', 10),
                 dtype='float32',
                 num_parts=nworker,
                 part_index=rank
@@ -76,6 +76,44 @@ class TestMXNetBenchmarks(unittest.TestCase):
                   (params[0], model.name, params[1], 1000.0*np.mean(times)))
             del model  # nope ...
 
+    def test_lean_training_cpu(self):
+        """mxnet_benchmarks  ->  TestMXNetBenchmarks::test_lean_training_cpu  [MXNet CPU lean training.]"""
+        print("Testing CPU lean training")
+        for params in itertools.product(['deep_mnist', 'alexnet', 'resnet18'], [0, 1, 2]):
+            model = ModelFactory.get_model({'model': params[0], 'phase': 'training'})
+            _, times = benchmark_training(
+                model,
+                {'model':params[0], 'phase':'training', 'batch_size':2,
+                 'num_batches':3, 'num_warmup_batches':self.num_warmup_iters,
+                 'num_gpus':0, 'device':'cpu', 'kv_store':'device',
+                 'lean_training': True, 'sync_interval': params[1]}
+            )
+            self.assertEqual(len(times), 3)
+            for tm in times:
+                self.assertGreater(tm, 0)
+            print("model=%s, name=%s, sync_interval=%d, device=cpu, time=%f" %\
+                  (params[0], model.name, params[1], 1000.0*np.mean(times)))
+            del model
+
+    def test_gluon_cpu(self):
+        """mxnet_benchmarks  ->  TestMXNetBenchmarks::test_gluon_cpu     [MXNet CPU Gluon inference/training.]"""
+        print("Testing CPU Gluon inference and training")
+        for params in itertools.product(['deep_mnist', 'alexnet', 'resnet18'], ['inference', 'training']):
+            model = ModelFactory.get_model({'model': params[0], 'phase': params[1]})
+            opts = {'model':params[0], 'phase':params[1], 'batch_size':2,
+                    'num_batches':self.num_batches, 'num_warmup_batches':self.num_warmup_iters,
+                    'num_gpus':0, 'device':'cpu', 'kv_store':'device', 'api':'gluon'}
+            if params[1] == 'inference':
+                _, times = benchmark_inference(model, opts)
+            else:
+                _, times = benchmark_training(model, opts)
+            self.assertEqual(len(times), self.num_batches)
+            for tm in times:
+                self.assertGreater(tm, 0)
+            print("model=%s, name=%s, phase=%s, device=cpu, time=%f" %\
+                  (params[0], model.name, params[1], 1000.0*np.mean(times)))
+            del model
+
     def test_training_gpu(self):
         """mxnet_benchmarks  ->  TestMXNetBenchmarks::test_training_gpu  [MXNet GPU training.]
         
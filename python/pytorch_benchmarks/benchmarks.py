@@ -18,16 +18,21 @@
     Version 18.10
         Code updates for multi-GPU benchmarks. Based on NVIDIA examples.
         New dependency - apex library (https://www.github.com/nvidia/apex)
+        Apex is only required by GPU training benchmarks, CPU distributed training
+        uses PyTorch's DistributedDataParallel with gloo backend.
 """
 from __future__ import absolute_import
 from __future__ import print_function
 
 import sys
 import os
+import io
 import traceback
 import argparse
+import time
 import timeit
 import json
+import threading
 import numpy as np
 import torch
 import torch.nn as nn
@@ -35,15 +40,23 @@ import torch.distributed as dist
 import torch.autograd as autograd
 import torch.optim as optim
 import torch.backends.cudnn as cudnn
+try:
+    import Queue
+except ImportError:
+    import queue as Queue
 
+from torch.nn.parallel import DistributedDataParallel as TorchDDP
+# Apex is only required by GPU training benchmarks (distributed and/or FP16).
 try:
     from apex.parallel import DistributedDataParallel as DDP
     from apex.fp16_utils import network_to_half, prep_param_lists, model_grads_to_master_grads, master_params_to_model_params
+    HAVE_APEX = True
 except ImportError:
-    raise ImportError("Please install apex from https://www.github.com/nvidia/apex to run this example.")
+    HAVE_APEX = False
 
 from pytorch_benchmarks.model_factory import ModelFactory
 from pytorch_benchmarks.dataset_factory import DatasetFactory, DataPrefetcher
+from pytorch_benchmarks.layer_profiler import LayerProfiler
 
 def get_effective_batch_size(opts):
     """Returns effective batch size
@@ -65,8 +78,9 @@ def benchmark(opts):
     """
     assert 'model' in opts, "Missing 'model' in options."
     assert 'phase' in opts, "Missing 'phase' in options."
-    assert opts['phase'] in ['inference', 'training', 'data_ingestion'],\
-           "Invalid value for 'phase' (%s). Must be 'inference', 'training' or 'data_ingestion'." % (opts['phase'])
+    assert opts['phase'] in ['inference', 'training', 'data_ingestion', 'serving'],\
+           "Invalid value for 'phase' (%s). Must be 'inference', 'training', 'data_ingestion' "\
+           "or 'serving'." % (opts['phase'])
 
     opts['batch_size'] = opts.get('batch_size', 16)
     opts['num_warmup_batches'] = opts.get('num_warmup_batches', 10)
@@ -82,6 +96,9 @@ def benchmark(opts):
         # not be used - we just need to know input shape and number of classes.
         model = ModelFactory.get_model(dict(opts, phase='inference'))
         return benchmark_data_ingestion(model, opts)
+    if opts['phase'] == 'serving':
+        # Serving is an online inference, models are created for inference phase.
+        return benchmark_serving(ModelFactory.get_model(dict(opts, phase='inference')), opts)
 
     model = ModelFactory.get_model(opts)
     opts['__input_shape'] = model.input_shape
@@ -130,6 +147,133 @@ def benchmark_data_ingestion(model, opts):
     return (model.name, data_load_times)
 
 
+def get_inference_model(model, data, opts):
+    """Returns a model (callable) and input data for inference benchmarks.
+
+    Depending on `inference_mode`, a model is used as is ('eager'), as is with autograd
+    disabled ('nograd'), compiled with TorchScript ('script') or traced ('trace'). If
+    `channels_last` is true, a model and data are converted to channels last memory
+    format. Models that are not 'eager' are run once and their output is compared with
+    output of an eager model.
+
+    :param obj model: A model in evaluation mode on a target device.
+    :param obj data: Input data on a target device.
+    :param dict opts: A dictionary of parameters.
+    :rtype: tuple
+    :return: A tuple of (model, data).
+    """
+    mode = opts.get('inference_mode', 'eager')
+    if mode == 'eager' and not opts.get('channels_last', False):
+        return (model, data)
+    with torch.no_grad():
+        reference = model(data)
+    if opts.get('channels_last', False):
+        if not hasattr(torch, 'channels_last'):
+            raise ValueError("Channels last memory format requires PyTorch 1.5 or above "
+                             "(found %s)." % torch.version.__version__)
+        if data.dim() != 4:
+            raise ValueError("Channels last memory format requires 4D input data (found %dD)." % data.dim())
+        model = model.to(memory_format=torch.channels_last)
+        data = data.contiguous(memory_format=torch.channels_last)
+    with torch.no_grad():
+        if mode == 'script':
+            model = torch.jit.script(model)
+        elif mode == 'trace':
+            model = torch.jit.trace(model, data)
+        output = model(data)
+    atol, rtol = (1e-2, 1e-2) if opts['dtype'] in ('float16', 'int8') else (1e-4, 1e-3)
+    if not torch.allclose(output.float(), reference.float(), rtol=rtol, atol=atol):
+        raise ValueError("Output of a model in '%s' inference mode (channels_last=%s) differs from "
+                         "output of an eager model (max abs difference is %f)." % (
+                             mode, opts.get('channels_last', False),
+                             (output.float() - reference.float()).abs().max().item()))
+    return (model, data)
+
+
+def get_model_size(model):
+    """Returns size in bytes of a serialized state dictionary of a model."""
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell()
+
+
+class QuantizationNotSupported(Exception):
+    """Raised when a model or this version of PyTorch cannot be quantized."""
+    pass
+
+
+def quantize_model(model, data, opts):
+    """Applies post-training INT8 quantization to a model.
+
+    With 'dynamic' quantization, weights of linear layers are quantized ahead of time and
+    activations are quantized on the fly. With 'static' quantization (FX graph mode, needs
+    PyTorch 1.13+), a model is traced, observers collect activation ranges on
+    `calibration_batches` synthetic batches and then all supported layers are converted.
+
+    :param obj model: A float32 model in evaluation mode on CPU.
+    :param obj data: A batch of input data used to trace a model.
+    :param dict opts: A dictionary of parameters (`quantization`, `calibration_batches`).
+    :return: A quantized model.
+    :raises QuantizationNotSupported: If a model or this version of PyTorch cannot be quantized.
+    """
+    if not hasattr(torch, 'quantization'):
+        raise QuantizationNotSupported("INT8 quantization requires PyTorch 1.3 or above (found %s)." %
+                                       torch.version.__version__)
+    engine = torch.backends.quantized.engine
+    if opts['quantization'] == 'dynamic':
+        qmodel = torch.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+    else:
+        try:
+            from torch.ao.quantization import get_default_qconfig_mapping
+            from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+        except ImportError:
+            raise QuantizationNotSupported("Static INT8 quantization requires PyTorch 1.13 or above "
+                                           "(found %s)." % torch.version.__version__)
+        try:
+            prepared = prepare_fx(model, get_default_qconfig_mapping(engine), example_inputs=(data,))
+        except Exception as err:
+            raise QuantizationNotSupported("Model cannot be traced for static quantization (%s)." % str(err))
+        with torch.no_grad():
+            for _ in range(opts['calibration_batches']):
+                prepared(torch.randn_like(data))
+        qmodel = convert_fx(prepared)
+    if get_model_size(qmodel) >= get_model_size(model):
+        raise QuantizationNotSupported("Model does not have layers supported by '%s' quantization "
+                                       "(engine=%s)." % (opts['quantization'], engine))
+    return qmodel
+
+
+def benchmark_int8_baseline(model, data, opts):
+    """Benchmarks a float32 model and quantizes it.
+
+    Statistics (float32 batch time in seconds, model sizes and top-1 agreement of
+    INT8 and float32 models on input data) are stored in `opts['__int8_stats']`.
+
+    :param obj model: A float32 model in evaluation mode on CPU.
+    :param obj data: Input data.
+    :param dict opts: A dictionary of parameters.
+    :return: A quantized model.
+    """
+    with torch.no_grad():
+        for _ in range(opts['num_warmup_batches']):
+            model(data)
+        start_time = timeit.default_timer()
+        for _ in range(opts['num_batches']):
+            reference = model(data)
+        fp32_time = (timeit.default_timer() - start_time) / max(1, opts['num_batches'])
+        qmodel = quantize_model(model, data, opts)
+        output = qmodel(data)
+        if opts['num_batches'] == 0:
+            reference = model(data)
+    opts['__int8_stats'] = {
+        'fp32_time': fp32_time,
+        'fp32_model_size': get_model_size(model),
+        'model_size': get_model_size(qmodel),
+        'top1_agreement': (output.argmax(dim=1) == reference.argmax(dim=1)).float().mean().item()
+    }
+    return qmodel
+
+
 def benchmark_inference(model, opts):
     """Benchmarks inference phase.
 
@@ -158,17 +302,213 @@ def benchmark_inference(model, opts):
     if opts['dtype'] == 'float16':
         data = data.half()
         model = model.half()
-    model.evaluate()
+    model_name = model.name
+    model.eval()
+    if opts['dtype'] == 'int8':
+        model = benchmark_int8_baseline(model, data, opts)
+    model, data = get_inference_model(model, data, opts)
+    # In all modes except 'eager', autograd is disabled.
+    torch.set_grad_enabled(opts.get('inference_mode', 'eager') == 'eager')
     # Do warmup round
     for i in range(opts['num_warmup_batches']):
         model(data)
+    profiler = None
+    if opts.get('profile_layers', False):
+        if opts.get('inference_mode', 'eager') not in ('eager', 'nograd'):
+            raise ValueError("Layer profiling requires 'eager' or 'nograd' inference mode.")
+        profiler = LayerProfiler(model, opts['device'] == 'gpu')
     # Do benchmark round
     batch_times = np.zeros(opts['num_batches'])
     for i in range(opts['num_batches']):
         start_time = timeit.default_timer()
+        if profiler:
+            profiler.start_batch()
         model(data)
+        if profiler:
+            profiler.end_batch()
+        if opts['device'] == 'gpu':
+            torch.cuda.synchronize()
         batch_times[i] = timeit.default_timer() - start_time
-    return (model.name, batch_times)
+    torch.set_grad_enabled(True)
+    if profiler:
+        profiler.remove()
+        opts['__layer_profile'] = profiler.summary()
+    return (model_name, batch_times)
+
+
+def generate_requests(requests, samples, opts):
+    """Issues single-sample requests with exponentially distributed inter-arrival times.
+
+    This is an open-loop load generator - arrival times are drawn in advance and do
+    not depend on how fast requests are served. A request is a tuple of (arrival time,
+    sample) where arrival time is a scheduled time, so, if this thread falls behind,
+    the delay is accounted in request latency. A None request is issued in the end.
+
+    :param obj requests: A queue to put requests into.
+    :param obj samples: A tensor with samples, requests use them in round robin order.
+    :param dict opts: A dictionary of parameters (`serving_rate`, `serving_requests`).
+    """
+    arrivals = np.cumsum(
+        np.random.RandomState(1).exponential(1.0 / opts['serving_rate'], opts['serving_requests'])
+    )
+    start_time = timeit.default_timer()
+    for idx, arrival in enumerate(arrivals):
+        arrival_time = start_time + arrival
+        delay = arrival_time - timeit.default_timer()
+        if delay > 0:
+            time.sleep(delay)
+        requests.put((arrival_time, samples[idx % len(samples)]))
+    requests.put(None)
+
+
+def benchmark_serving(model, opts):
+    """Benchmarks online inference with a dynamic batcher.
+
+    A load generator thread (see `generate_requests`) issues single-sample requests. A
+    dynamic batcher in this thread collects requests into a batch until it contains
+    `batch_size` requests or until its first request has waited `serving_max_delay`
+    milliseconds, and then runs a model (see `get_inference_model`). Latency of a request
+    is a time from its arrival to completion of its batch. Serving statistics (latency
+    percentiles, achieved QPS, batch size distribution) are stored in
+    `opts['__serving_stats']`.
+
+    :param obj model: A model to benchmark.
+    :param dict opts: A dictionary of parameters.
+    :rtype: tuple
+    :return: A tuple of (model_name, list of batch times)
+    """
+    if opts['serving_rate'] <= 0 or opts['serving_requests'] <= 0:
+        raise ValueError("Serving rate (%f) and number of requests (%d) must be positive." % (
+            opts['serving_rate'], opts['serving_requests']))
+    samples = torch.randn((max(opts['batch_size'], 16),) + model.input_shape)
+    if opts['device'] == 'gpu':
+        # Batch size varies, so cuDNN auto-tuner would run for every new batch shape.
+        cudnn.benchmark = False
+        model = model.cuda()
+    if opts['dtype'] == 'float16':
+        samples = samples.half()
+        model = model.half()
+    model_name = model.name
+    model.eval()
+    data = samples[0:opts['batch_size']]
+    model, data = get_inference_model(model, data.cuda() if opts['device'] == 'gpu' else data, opts)
+    torch.set_grad_enabled(opts.get('inference_mode', 'eager') == 'eager')
+    for _ in range(opts['num_warmup_batches']):
+        model(data)
+
+    requests = Queue.Queue()
+    generator = threading.Thread(target=generate_requests, args=(requests, samples, opts))
+    generator.daemon = True
+    generator.start()
+    max_delay = opts['serving_max_delay'] / 1000.0
+    latencies, batch_times, batch_sizes = [], [], []
+    first_arrival, last_completion = None, None
+    done = False
+    while not done:
+        # Block until the first request of a batch arrives.
+        request = requests.get()
+        if request is None:
+            break
+        batch = [request]
+        deadline = request[0] + max_delay
+        while len(batch) < opts['batch_size']:
+            timeout = deadline - timeit.default_timer()
+            try:
+                request = requests.get(timeout=timeout) if timeout > 0 else requests.get_nowait()
+            except Queue.Empty:
+                break
+            if request is None:
+                done = True
+                break
+            batch.append(request)
+        start_time = timeit.default_timer()
+        batch_data = torch.stack([sample for _, sample in batch])
+        if opts['device'] == 'gpu':
+            batch_data = batch_data.cuda()
+        if opts.get('channels_last', False):
+            batch_data = batch_data.contiguous(memory_format=torch.channels_last)
+        model(batch_data)
+        if opts['device'] == 'gpu':
+            torch.cuda.synchronize()
+        end_time = timeit.default_timer()
+        batch_times.append(end_time - start_time)
+        batch_sizes.append(len(batch))
+        latencies.extend(end_time - arrival_time for arrival_time, _ in batch)
+        if first_arrival is None:
+            first_arrival = batch[0][0]
+        last_completion = end_time
+    generator.join()
+    torch.set_grad_enabled(True)
+
+    latencies = 1000.0 * np.array(latencies)
+    sizes, counts = np.unique(batch_sizes, return_counts=True)
+    opts['__serving_stats'] = {
+        'latency_p50': np.percentile(latencies, 50),
+        'latency_p90': np.percentile(latencies, 90),
+        'latency_p99': np.percentile(latencies, 99),
+        'latency_p999': np.percentile(latencies, 99.9),
+        'latency_mean': np.mean(latencies),
+        'qps': len(latencies) / (last_completion - first_arrival),
+        'batch_size_distribution': dict((str(size), int(count)) for size, count in zip(sizes, counts)),
+        'batch_size_mean': np.mean(batch_sizes)
+    }
+    return (model_name, np.array(batch_times))
+
+
+def pin_cpu_process(opts):
+    """Pins a process of a CPU distributed benchmark to a subset of available CPUs.
+
+    CPUs available to this process are split into disjoint contiguous sets, one per
+    local rank, and the number of intra-op threads is set to the size of this set.
+    Number of local ranks is `LOCAL_WORLD_SIZE` environment variable or, if not set,
+    world size (single node benchmark).
+
+    :param dict opts: A dictionary of parameters (`local_rank`, `world_size`).
+    :return: List of CPUs this process is pinned to.
+    """
+    local_world_size = int(os.environ.get('LOCAL_WORLD_SIZE', opts['world_size']))
+    if hasattr(os, 'sched_getaffinity'):
+        cpus = sorted(os.sched_getaffinity(0))
+    else:
+        cpus = list(range(torch.get_num_threads()))
+    first = opts['local_rank'] * len(cpus) // local_world_size
+    last = (opts['local_rank'] + 1) * len(cpus) // local_world_size
+    cpus = cpus[first:max(last, first + 1)]
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cpus)
+    torch.set_num_threads(len(cpus))
+    return cpus
+
+
+def register_allreduce_timer(model, world_size):
+    """Registers DDP communication hook that measures time of gradient allreduce.
+
+    Every bucket is averaged with asynchronous allreduce as in default DDP hook. Time
+    from launching an allreduce to its completion is accumulated in `time` field of a
+    returned dictionary (seconds). Allreduce of different buckets may overlap with each
+    other and with backward computations. Communication hooks require PyTorch 1.8+.
+
+    :param obj model: A model wrapped with torch DistributedDataParallel.
+    :param int world_size: Number of processes.
+    :return: A dictionary with `time` field or None if hooks are not supported.
+    """
+    if not hasattr(model, 'register_comm_hook'):
+        return None
+
+    def _hook(state, bucket):
+        start_time = timeit.default_timer()
+        tensor = bucket.buffer() if hasattr(bucket, 'buffer') else bucket.get_tensor()
+        tensor.div_(world_size)
+        future = dist.all_reduce(tensor, async_op=True).get_future()
+
+        def _done(fut):
+            state['time'] += timeit.default_timer() - start_time
+            return fut.value()[0]
+        return future.then(_done)
+
+    stats = {'time': 0.0}
+    model.register_comm_hook(stats, _hook)
+    return stats
 
 
 def benchmark_training(model, opts):
@@ -195,6 +535,9 @@ def benchmark_training(model, opts):
 
     if opts['fp16'] and not opts['with_cuda']:
         raise ValueError("Configuration error: FP16 can only be used with GPUs")
+    if opts['with_cuda'] and (opts['fp16'] or opts['distributed']) and not HAVE_APEX:
+        raise ImportError("Please install apex from https://www.github.com/nvidia/apex to run "
+                          "distributed and/or FP16 GPU training benchmarks.")
 
     if opts['with_cuda']:
         torch.cuda.set_device(opts['local_rank'])
@@ -203,14 +546,23 @@ def benchmark_training(model, opts):
 
     if opts['distributed']:
         dist.init_process_group(backend=opts['dist_backend'], init_method='env://')
+        if not opts['with_cuda']:
+            cpus = pin_cpu_process(opts)
+            print("[PyTorch benchmarks] Rank %d uses %d CPUs (%s)." % (
+                opts['global_rank'], len(cpus), ','.join(str(cpu) for cpu in cpus)))
 
     if opts['with_cuda']:
         model = model.cuda()
         if opts['dtype'] == 'float16':
             model = network_to_half(model)
 
+    allreduce_stats = None
     if opts['distributed']:
-        model = DDP(model, shared_param=True)
+        if opts['with_cuda']:
+            model = DDP(model, shared_param=True)
+        else:
+            model = TorchDDP(model, bucket_cap_mb=opts['ddp_bucket_cap_mb'])
+            allreduce_stats = register_allreduce_timer(model, opts['world_size'])
 
     if opts['fp16']:
         model_params, master_params = prep_param_lists(model)
@@ -228,15 +580,25 @@ def benchmark_training(model, opts):
     done = opts['num_warmup_batches'] == 0
     num_iterations_done = 0
     model.train()
+    profiler = None
+    if opts.get('profile_layers', False):
+        # Warmup batches are not profiled.
+        profiler = LayerProfiler(model, opts['with_cuda'], enabled=not is_warmup)
     batch_times = np.zeros(opts['num_batches'])
+    # Time spent waiting for data in benchmark batches.
+    data_wait_time = 0.0
     end_time = timeit.default_timer()
     while not done:
         prefetcher = DataPrefetcher(data_loader, opts)
         batch_data, batch_labels = prefetcher.next()
+        if not is_warmup:
+            data_wait_time += prefetcher.last_wait_time
         while batch_data is not None:
             data_var = torch.autograd.Variable(batch_data)
             labels_var = torch.autograd.Variable(batch_labels)
 
+            if profiler:
+                profiler.start_batch()
             output = model(data_var)
 
             loss = criterion(output, labels_var)
@@ -247,6 +609,8 @@ def benchmark_training(model, opts):
             if opts['fp16']:
                 model.zero_grad()
                 loss.backward()
+                if profiler:
+                    profiler.end_batch()
                 model_grads_to_master_grads(model_params, master_params)
                 if opts['loss_scale'] != 1:
                     for param in master_params:
@@ -256,6 +620,8 @@ def benchmark_training(model, opts):
             else:
                 optimizer.zero_grad()
                 loss.backward()
+                if profiler:
+                    profiler.end_batch()
                 optimizer.step()
 
             if opts['with_cuda']:
@@ -267,18 +633,41 @@ def benchmark_training(model, opts):
 
             batch_data, batch_labels = prefetcher.next()
 
+            # Waiting for the next batch is accounted in the next iteration.
             if is_warmup:
                 if num_iterations_done >= opts['num_warmup_batches']:
                     is_warmup = False
                     num_iterations_done = 0
+                    data_wait_time = prefetcher.last_wait_time
+                    if profiler:
+                        profiler.enabled = True
+                    if allreduce_stats:
+                        allreduce_stats['time'] = 0.0
             else:
                 if opts['num_batches'] != 0:
                     batch_times[num_iterations_done-1] = cur_time - end_time
                 if num_iterations_done >= opts['num_batches']:
                     done = True
                     break
+                data_wait_time += prefetcher.last_wait_time
             end_time = cur_time
-
+        prefetcher.close()
+
+    opts['__data_wait_time'] = data_wait_time
+    if profiler:
+        profiler.remove()
+        opts['__layer_profile'] = profiler.summary()
+    if opts['distributed'] and opts['num_batches'] > 0:
+        # Per-rank throughput and allreduce time (seconds per iteration) are gathered on all ranks.
+        rank_stats = torch.tensor([
+            opts['batch_size'] / np.mean(batch_times),
+            allreduce_stats['time'] / opts['num_batches'] if allreduce_stats else -1.0
+        ], dtype=torch.float64)
+        if opts['with_cuda']:
+            rank_stats = rank_stats.cuda()
+        all_rank_stats = [torch.zeros_like(rank_stats) for _ in range(opts['world_size'])]
+        dist.all_gather(all_rank_stats, rank_stats)
+        opts['__rank_stats'] = [stats.tolist() for stats in all_rank_stats]
     return (opts['__name'], batch_times)
 
 
@@ -297,6 +686,42 @@ def main():
         '--forward_only', nargs='?', const=True, default=False, type=str2bool,
         help="Benchmark inference (if true) else benchmark training."
     )
+    parser.add_argument(
+        '--inference_mode', type=str, required=False, default='eager',
+        choices=['eager', 'nograd', 'script', 'trace'],
+        help="How a model is run in inference benchmarks: 'eager' (autograd enabled), "\
+             "'nograd' (autograd disabled), 'script' (TorchScript compiled) or 'trace' "\
+             "(TorchScript traced). Compiled and traced models are validated against "\
+             "eager models."
+    )
+    parser.add_argument(
+        '--channels_last', nargs='?', const=True, default=False, type=str2bool,
+        help="Use channels last memory format in inference benchmarks (PyTorch 1.5+)."
+    )
+    parser.add_argument(
+        '--profile_layers', nargs='?', const=True, default=False, type=str2bool,
+        help="Profile leaf modules (layers) with forward/backward hooks and report per-layer "\
+             "times, output sizes and parameter counts. Time spent in hooks is reported "\
+             "as an overhead."
+    )
+    parser.add_argument(
+        '--serving', nargs='?', const=True, default=False, type=str2bool,
+        help="Benchmark online inference (serving) with Poisson request arrivals and "\
+             "dynamic batching. Batch size is a maximal batch size."
+    )
+    parser.add_argument(
+        '--serving_rate', type=float, required=False, default=100,
+        help="Serving: average request arrival rate, requests per second."
+    )
+    parser.add_argument(
+        '--serving_requests', type=int, required=False, default=1000,
+        help="Serving: number of requests to issue."
+    )
+    parser.add_argument(
+        '--serving_max_delay', type=float, required=False, default=5,
+        help="Serving: maximal time (milliseconds) a request waits for other requests "\
+             "in a queue of a dynamic batcher."
+    )
     parser.add_argument(
         '--batch_size', type=int, required=True, default=None,
         help="Per device batch size. Effective batch will depend on number of GPUs/workers."
@@ -310,8 +735,19 @@ def main():
         help="Number of warmup iterations"
     )
     parser.add_argument(
-        '--dtype', required=False, default='float', choices=['float', 'float32', 'float16'],
-        help="Precision of data variables: float(same as float32), float32 or float16."
+        '--dtype', required=False, default='float', choices=['float', 'float32', 'float16', 'int8'],
+        help="Precision of data variables: float(same as float32), float32, float16 or int8. "\
+             "The int8 is only supported in CPU inference benchmarks."
+    )
+    parser.add_argument(
+        '--quantization', type=str, required=False, default='static', choices=['static', 'dynamic'],
+        help="INT8 post-training quantization: 'static' (weights and activations, "\
+             "activation ranges are calibrated on synthetic data) or 'dynamic' (weights "\
+             "of linear layers, activations are quantized on the fly)."
+    )
+    parser.add_argument(
+        '--calibration_batches', type=int, required=False, default=4,
+        help="Number of synthetic batches to calibrate a model for static INT8 quantization."
     )
     #
     parser.add_argument(
@@ -325,11 +761,36 @@ def main():
              "host memory. If --data is 'synthetic/device', synthetic data is "\
              "placed in device (GPU) memory."
     )
+    parser.add_argument(
+        '--synthetic_batches', type=int, required=False, default=1,
+        help="Number of distinct batches in a pool of synthetic data. Batches are used "\
+             "in round robin order."
+    )
+    parser.add_argument(
+        '--synthetic_decode_cost', type=float, required=False, default=0,
+        help="Emulated decode cost (milliseconds per batch) for synthetic data in host memory."
+    )
     parser.add_argument(
         '--data_backend', type=str, required=False, default='caffe_lmdb',
-        choices=['caffe_lmdb', 'image_folder'],
+        choices=['caffe_lmdb', 'caffe_lmdb_batch', 'image_folder', 'tensors'],
         help="In case if --data_dir is present, this argument defines type of dataset. "
     )
+    parser.add_argument(
+        '--tensors_dtype', type=str, required=False, default='uchar', choices=['uchar', 'float'],
+        help="Data type of images in a tensors dataset (--data_backend=tensors)."
+    )
+    parser.add_argument(
+        '--lmdb_keys_cache', type=str, required=False, default='',
+        help="LMDB keys cache file (caffe_lmdb and caffe_lmdb_batch backends). If empty, "\
+             "it's '_keys_.npy' in a database directory."
+    )
+    parser.add_argument(
+        '--data_partition', type=str, required=False, default='sampler', choices=['sampler', 'shard'],
+        help="How a dataset is partitioned in multi-process benchmarks. If 'sampler', "\
+             "DistributedSampler is used. If 'shard', every rank reads only its own "\
+             "contiguous shard of a dataset (LMDB keys, tensors, images) and shuffles "\
+             "data within this shard."
+    )
     parser.add_argument(
         '--data_shuffle', nargs='?', const=True, default=False, type=str2bool,
         help="Enable/disable shuffling for both real/synthetic datasets."
@@ -361,6 +822,16 @@ def main():
         '--num_loader_threads', type=int, required=False, default=4,
         help="Number of dataset loader threads."
     )
+    parser.add_argument(
+        '--prefetch_depth', type=int, required=False, default=1,
+        help="Number of batches prefetched by a background thread (and copied to GPU "\
+             "memory for GPU devices). If 0, batches are loaded synchronously."
+    )
+    parser.add_argument(
+        '--collate_buffers', type=int, required=False, default=8,
+        help="Number of reusable batch buffers per data loader worker. Must be larger "\
+             "than number of batches in flight (2 if workers are used, plus prefetch_depth + 2)."
+    )
     # https://github.com/pytorch/pytorch/blob/master/torch/distributed/launch.py
     parser.add_argument(
         '--dist_backend', default='nccl', type=str,
@@ -369,7 +840,12 @@ def main():
              "the recommended backend to use for GPU training."
     )
     parser.add_argument(
-        '--local_rank', default=0, type=int,
+        '--ddp_bucket_cap_mb', default=25, type=float,
+        help="Size (MB) of gradient buckets in CPU distributed training (PyTorch's "\
+             "DistributedDataParallel). Gradients in one bucket are reduced with one allreduce."
+    )
+    parser.add_argument(
+        '--local_rank', '--local-rank', default=0, type=int,
         help="Rank of this process on a local node. If current compute device is a "\
         "GPU device, this process must use this GPU."
     )
@@ -396,18 +872,28 @@ def main():
     try:
         if opts['dtype'] == 'float':
             opts['dtype'] = 'float32'
-        if opts['dtype'] not in ['float32', 'float16']:
-            msg = "PyTorch only supports float32 and float16 data types. But found '%s'"
+        if opts['dtype'] not in ['float32', 'float16', 'int8']:
+            msg = "PyTorch only supports float32, float16 and int8 data types. But found '%s'"
             raise ValueError(msg % opts['dtype'])
-        if opts['device'] == 'cpu' and opts['dtype'] != 'float32':
-            msg = "In CPU mode, dtype must be float32. Device=%d, dtype=%s"
+        if opts['device'] == 'cpu' and opts['dtype'] == 'float16':
+            msg = "In CPU mode, dtype must be float32 or int8. Device=%s, dtype=%s"
             raise ValueError(msg % (opts['device'], opts['dtype']))
+        if opts['dtype'] == 'int8' and (opts['device'] != 'cpu' or not args.forward_only):
+            msg = "The int8 dtype is only supported in CPU inference benchmarks. Device=%s, phase=%s"
+            raise ValueError(msg % (opts['device'], 'inference' if args.forward_only else 'training'))
         if opts['data_loader_only']:
             opts['phase'] = 'data_ingestion'
+        elif opts['serving']:
+            opts['phase'] = 'serving'
         else:
             opts['phase'] = 'inference' if args.forward_only else 'training'
 
         model_title, times = benchmark(opts)
+    except QuantizationNotSupported as err:
+        # Model cannot be quantized. This is not an error, benchmark is skipped.
+        print("__results.status__=%s" % (json.dumps("skipped")))
+        print("__results.status_msg__=%s" % (json.dumps(str(err))))
+        return
     except Exception as err:
         #TODO: this is not happenning, program terminates earlier.
         # For now, do not rely on __results.status__=...
@@ -421,11 +907,51 @@ def main():
             times = 1000.0 * times                                              # from seconds to milliseconds
             mean_time = np.mean(times)                                          # average time in milliseconds
             mean_throughput = get_effective_batch_size(opts) / (mean_time/1000) # images / sec
+            if '__serving_stats' in opts:
+                # In serving benchmarks, throughput is an achieved number of requests per second.
+                mean_throughput = opts['__serving_stats']['qps']
             print("__results.time__=%s" % (json.dumps(mean_time)))
             print("__results.time_std__=%s" % (json.dumps(np.std(times))))
             print("__results.throughput__=%s" % (json.dumps(int(mean_throughput))))
             print("__exp.model_title__=%s" % (json.dumps(model_title)))
             print("__results.time_data__=%s" % (json.dumps(times.tolist())))
+            if '__data_wait_time' in opts:
+                # Average time (milliseconds) per batch spent waiting for data.
+                data_wait_time = 1000.0 * opts['__data_wait_time'] / times.size
+                print("__results.data_wait_time__=%s" % (json.dumps(data_wait_time)))
+            if '__layer_profile' in opts:
+                # Per-layer average times (milliseconds), output sizes and parameter counts.
+                print("__results.layer_profile__=%s" % (json.dumps(opts['__layer_profile'])))
+                print("__results.layer_profile_overhead__=%s" % (
+                    json.dumps(opts['__layer_profile']['overhead_ms'])))
+            if '__int8_stats' in opts:
+                # Float32 baseline and model size reduction for INT8 inference benchmarks.
+                int8_stats = opts['__int8_stats']
+                fp32_time = 1000.0 * int8_stats['fp32_time']
+                print("__results.fp32_time__=%s" % (json.dumps(fp32_time)))
+                print("__results.fp32_throughput__=%s" % (
+                    json.dumps(int(get_effective_batch_size(opts) / (fp32_time/1000)))))
+                print("__results.int8_speedup__=%s" % (json.dumps(fp32_time / mean_time)))
+                print("__results.model_size__=%s" % (json.dumps(int8_stats['model_size'])))
+                print("__results.fp32_model_size__=%s" % (json.dumps(int8_stats['fp32_model_size'])))
+                print("__results.model_size_reduction__=%s" % (
+                    json.dumps(float(int8_stats['fp32_model_size']) / int8_stats['model_size'])))
+                print("__results.int8_top1_agreement__=%s" % (json.dumps(int8_stats['top1_agreement'])))
+            if '__rank_stats' in opts:
+                # Throughput of individual ranks, their sum and average allreduce time (ms per iteration).
+                rank_throughputs = [stats[0] for stats in opts['__rank_stats']]
+                print("__results.rank_throughputs__=%s" % (json.dumps(rank_throughputs)))
+                print("__results.aggregate_throughput__=%s" % (json.dumps(sum(rank_throughputs))))
+                allreduce_times = [stats[1] for stats in opts['__rank_stats'] if stats[1] >= 0]
+                if allreduce_times:
+                    print("__results.allreduce_time__=%s" % (
+                        json.dumps(1000.0 * np.mean(allreduce_times))))
+                    print("__results.rank_allreduce_times__=%s" % (
+                        json.dumps([1000.0 * allreduce_time for allreduce_time in allreduce_times])))
+            if '__serving_stats' in opts:
+                # Latencies are in milliseconds, batch size distribution maps batch size to count.
+                for key, value in opts['__serving_stats'].items():
+                    print("__results.%s__=%s" % (key, json.dumps(value)))
         else:
             print("__results.status__=%s" % (json.dumps("failure")))
 
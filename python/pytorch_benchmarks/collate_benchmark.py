@@ -0,0 +1,85 @@
+# (c) Copyright [2017] Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Micro-benchmark for collate functions used by PyTorch data loaders.
+
+Compares `fast_collate` (new batch tensor for every batch) with `FastCollate` (reusable
+batch buffers) for several batch sizes. Collate functions run in a single thread
+on random PIL images, so results are the upper bound of what one data loader worker
+can do after images have been decoded and augmented.
+
+Usage:
+
+>>> python -m pytorch_benchmarks.collate_benchmark --batch_sizes 32 64 128 256 512 1024 --image_size 224
+
+Output is images/second for every batch size and collate function.
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+import timeit
+import argparse
+import numpy as np
+import torch
+from PIL import Image
+from pytorch_benchmarks.dataset_factory import fast_collate, FastCollate
+
+
+def benchmark_collate(collate_fn, batch, num_batches, num_warmup_batches=10):
+    """Returns throughput (images/sec) of a collate function.
+
+    Args:
+        collate_fn: `callable`, Collate function.
+        batch: `list`, List of (image, label) tuples.
+        num_batches: `int`, Number of benchmark batches.
+        num_warmup_batches: `int`, Number of warmup batches. Must not be smaller than
+                                   number of FastCollate buffers, so that all buffers
+                                   are allocated before benchmarking.
+
+    Returns:
+        Number of images per second.
+    """
+    for _ in range(num_warmup_batches):
+        collate_fn(batch)
+    start = timeit.default_timer()
+    for _ in range(num_batches):
+        collate_fn(batch)
+    return len(batch) * num_batches / (timeit.default_timer() - start)
+
+
+def main():
+    """Entry point when invoking this script from a command line."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--batch_sizes', '--batch-sizes', nargs='*', type=int, required=False,
+                        default=[32, 64, 128, 256, 512, 1024], help="Batch sizes to benchmark.")
+    parser.add_argument('--image_size', '--image-size', type=int, required=False, default=224,
+                        help="Image size (images are image_size x image_size RGB images).")
+    parser.add_argument('--num_batches', '--num-batches', type=int, required=False, default=20,
+                        help="Number of benchmark batches for every batch size.")
+    parser.add_argument('--pin_memory', '--pin-memory', required=False, default=False, action='store_true',
+                        help="Allocate FastCollate buffers in page locked memory (requires CUDA).")
+    args = parser.parse_args()
+
+    pin_memory = args.pin_memory and torch.cuda.is_available()
+    shape = (args.image_size, args.image_size, 3)
+    images = [Image.fromarray(np.random.randint(0, 256, shape).astype(np.uint8)) for _ in range(32)]
+    print("%-8s %-20s %-20s %s" % ('Batch', 'fast_collate', 'FastCollate', 'Speedup'))
+    for batch_size in args.batch_sizes:
+        batch = [(images[i % len(images)], i % 1000) for i in range(batch_size)]
+        baseline = benchmark_collate(fast_collate, batch, args.num_batches)
+        buffered = benchmark_collate(FastCollate(pin_memory=pin_memory), batch, args.num_batches)
+        print("%-8d %-20.2f %-20.2f %.2f" % (batch_size, baseline, buffered, buffered / baseline))
+
+
+if __name__ == "__main__":
+    main()
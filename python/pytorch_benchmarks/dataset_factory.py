@@ -13,19 +13,27 @@
 # limitations under the License.
 """PyTorch datasets to access various data formats:
     1. CaffeLMDBDataset - Caffe LMDB database.
-    2. SyntheticDataset - synthetic data.
+    2. CaffeLMDBBatchDataset - Caffe LMDB database, returns entire batches.
+    3. TensorsDataLoader - memory mapped files with preprocessed images (tensors).
+    4. SyntheticDataset - synthetic data.
 
 Some of the functionality like fast_collate is from NVIDIA's scripts.
 """
 from __future__ import absolute_import
 from __future__ import print_function
+import io
 import os
-import pickle
 import timeit
+import threading
 import numpy as np
 import torch
 import torchvision.transforms as transforms
 import torchvision.datasets as datasets
+from dlbs.data.tensors import open_tensors, partition_range, partition_tensors
+try:
+    import Queue
+except ImportError:
+    import queue as Queue
 try:
     import lmdb
     from PIL import Image
@@ -50,9 +58,7 @@ class CaffeLMDBDataset(torch.utils.data.Dataset):
     https://stackoverflow.com/questions/33117607/caffe-reading-lmdb-from-python
     https://github.com/BVLC/caffe/blob/master/python/caffe/io.py
 
-    Do we want to load keys from cache file? With sizes of benchmark databases this
-    may not be requried. What is more important is that if we get keys from database
-    each time we sort of force DB to be cached.
+    Keys are loaded from a memory mapped cache file (see `open_lmdb`).
 
     This Dataset must not be used for real training (though it can easily be adjusted
     for it - see comments in code below - you will need to comment 4 lines).
@@ -73,7 +79,13 @@ class CaffeLMDBDataset(torch.utils.data.Dataset):
       20 cores, 40 with HT (was enabled).
       Not very accurate but provides intuition on numbers.
     """
-    def __init__(self, db_path, batch_size, num_total_batches, transform=None):
+    def __init__(self, db_path, batch_size, num_total_batches, transform=None, partition=None,
+                 keys_cache=None):
+        """
+        If `partition` is a tuple of (rank, world_size), only a contiguous shard of keys
+        of this rank is used (see `partition_range`). Keys are cached in `keys_cache`
+        file (see `open_lmdb`).
+        """
         if not HAVE_CAFFE_LMDB:
             raise CAFFE_LMDB_EXCEPTION
         # The epoch change is very expensive (see implementation of DataLoader):
@@ -88,22 +100,12 @@ class CaffeLMDBDataset(torch.utils.data.Dataset):
         self.virtual_length = batch_size * num_total_batches + 200
         #
         self.db_path = db_path
-        self.env = lmdb.open(db_path, max_readers=126, readonly=True, lock=False,
-                             readahead=False, meminit=False)
-        with self.env.begin(write=False) as txn:
-            self.length = txn.stat()['entries']
-        cache_file = os.path.join(db_path, '_cache_')
-        if os.path.isfile(cache_file):
-            print("[INFO] Loading LMDB keys from cache file (%s)" % (cache_file))
-            self.keys = pickle.load(open(cache_file, "rb"))
-        else:
-            start = timeit.default_timer()
-            with self.env.begin(write=False) as txn:
-                self.keys = [key for key, _ in txn.cursor()]
-            print("[INFO] LMDB database was scanned for keys and it took %f seconds." % \
-                  (timeit.default_timer() - start))
-            print("[INFO] Number of keys = %d" % len(self.keys))
-            pickle.dump(self.keys, open(cache_file, "wb"))
+        self.env, self.keys = open_lmdb(db_path, keys_cache)
+        self.partition = partition
+        if partition is not None:
+            first, last = partition_range(len(self.keys), *partition)
+            self.keys = self.keys[first:last]
+        self.length = len(self.keys)
         self.transform = transform
 
     def __getitem__(self, index):
@@ -152,6 +154,189 @@ class CaffeLMDBDataset(torch.utils.data.Dataset):
         return self.__class__.__name__ + ' (' + self.db_path + ')'
 
 
+def open_lmdb(db_path, cache_file=None):
+    """Opens LMDB database in read only mode and loads its keys.
+
+    Keys are cached in a binary file - numpy array of fixed width byte strings that
+    is memory mapped, so loading is fast and memory is shared by data loader workers.
+    Keys must not end with null bytes. A cache is rebuilt if number of keys in it
+    differs from number of entries in a database. If a cache cannot be written
+    (read only file system), keys are kept in memory.
+
+    Args:
+        db_path: `str`, Path to LMDB database.
+        cache_file: `str`, Path to a cache file. If None or empty, it's `_keys_.npy`
+                           in a database directory.
+
+    Returns:
+        A tuple of (environment, keys). Keys is a numpy array of byte strings.
+    """
+    env = lmdb.open(db_path, max_readers=126, readonly=True, lock=False,
+                    readahead=False, meminit=False)
+    num_entries = env.stat()['entries']
+    if not cache_file:
+        cache_file = os.path.join(db_path, '_keys_.npy')
+    if os.path.isfile(cache_file):
+        keys = np.load(cache_file, mmap_mode='r')
+        if len(keys) == num_entries:
+            print("[INFO] Loaded LMDB keys from cache file (%s)" % (cache_file))
+            return env, keys
+        print("[WARNING] LMDB keys cache file (%s) is stale: %d keys, %d database entries" %
+              (cache_file, len(keys), num_entries))
+    start = timeit.default_timer()
+    with env.begin(write=False) as txn:
+        keys = np.array(list(txn.cursor().iternext(keys=True, values=False)), dtype=np.bytes_)
+    print("[INFO] LMDB database was scanned for keys and it took %f seconds." % \
+          (timeit.default_timer() - start))
+    print("[INFO] Number of keys = %d" % len(keys))
+    temp_file = '%s.%d.tmp' % (cache_file, os.getpid())
+    try:
+        with open(temp_file, 'wb') as file_obj:
+            np.save(file_obj, keys)
+        os.rename(temp_file, cache_file)
+        keys = np.load(cache_file, mmap_mode='r')
+    except (IOError, OSError) as err:
+        print("[WARNING] Cannot write LMDB keys cache file (%s): %s" % (cache_file, str(err)))
+        # Do not leave partially written files behind (e.g. if a disk is full).
+        if os.path.exists(temp_file):
+            try:
+                os.remove(temp_file)
+            except OSError:
+                pass
+    return env, keys
+
+
+def parse_datum(buf):
+    """Parses header of a serialized Caffe Datum without copying its data.
+
+    Protobuf wire format is decoded directly, so that image bytes can then be
+    accessed with `np.frombuffer` at a returned offset.
+
+    Args:
+        buf: `np.ndarray`, A uint8 array (view) of a serialized Datum.
+
+    Returns:
+        A tuple of (channels, height, width, label, data_offset) or None if Datum
+        does not contain raw uint8 data (float data or encoded image).
+    """
+    fields = {}
+    pos, end = 0, len(buf)
+    while pos < end:
+        tag, pos = _read_varint(buf, pos)
+        field, wire_type = tag >> 3, tag & 7
+        if wire_type == 0:
+            fields[field], pos = _read_varint(buf, pos)
+        elif wire_type == 2:
+            length, pos = _read_varint(buf, pos)
+            fields[field] = pos
+            pos += length
+        elif wire_type == 5:
+            pos += 4
+        elif wire_type == 1:
+            pos += 8
+        else:
+            return None
+    if 4 not in fields or fields.get(7, 0):
+        return None
+    return (fields.get(1, 0), fields.get(2, 0), fields.get(3, 0), fields.get(5, 0), fields[4])
+
+
+def _read_varint(buf, pos):
+    """Reads protobuf varint at position `pos`, returns tuple of (value, next position)."""
+    value, shift = 0, 0
+    while True:
+        byte = int(buf[pos])
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+
+class CaffeLMDBBatchDataset(torch.utils.data.Dataset):
+    """Caffe LMDB dataset that returns entire batches.
+
+    An item of this dataset is a batch: a tuple of uint8 tensor of shape (N, C, H, W)
+    and int64 tensor of labels. Keys of one batch are contiguous in a database and
+    are read in one transaction with zero-copy buffers. Image bytes are viewed with
+    `np.frombuffer` and are copied, cropped and flipped once, directly into a
+    preallocated batch array. Random crop (no resizing) and horizontal flip replace
+    RandomResizedCrop/RandomHorizontalFlip transforms used by CaffeLMDBDataset, so
+    images in a database must be at least as large as the model input.
+
+    Use it with a data loader that has batch size 1 and `unwrap_batch` collate function.
+    """
+    def __init__(self, db_path, batch_size, num_total_batches, input_shape, partition=None,
+                 keys_cache=None):
+        """
+        If `partition` is a tuple of (rank, world_size), only a contiguous shard of keys
+        of this rank is used (see `partition_range`). Keys are cached in `keys_cache`
+        file (see `open_lmdb`).
+        """
+        if not HAVE_CAFFE_LMDB:
+            raise CAFFE_LMDB_EXCEPTION
+        # See comments in CaffeLMDBDataset about emulating larger dataset.
+        print("[WARNING] ***** CaffeLMDBBatchDataset: do not use me in real training *****")
+        self.virtual_length = num_total_batches + 2
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.input_shape = input_shape
+        self.env, self.keys = open_lmdb(db_path, keys_cache)
+        self.partition = partition
+        if partition is not None:
+            first, last = partition_range(len(self.keys), *partition)
+            self.keys = self.keys[first:last]
+        self.length = len(self.keys)
+
+    @staticmethod
+    def decode(buf):
+        """Returns (CHW uint8 array, label) for one serialized Datum (memoryview)."""
+        view = np.frombuffer(buf, dtype=np.uint8)
+        header = parse_datum(view)
+        if header is not None:
+            channels, height, width, label, offset = header
+            data = view[offset:offset + channels * height * width].reshape(channels, height, width)
+            return data, label
+        datum = datum_pb2.Datum()
+        datum.ParseFromString(bytes(buf))
+        if datum.encoded:
+            data = np.rollaxis(np.asarray(Image.open(io.BytesIO(datum.data)).convert('RGB')), 2)
+        else:
+            data = np.array(datum.float_data).astype(np.uint8).reshape(
+                datum.channels, datum.height, datum.width
+            )
+        return data, datum.label
+
+    def __getitem__(self, index):
+        channels, height, width = self.input_shape
+        batch = np.empty((self.batch_size, channels, height, width), dtype=np.uint8)
+        labels = np.empty(self.batch_size, dtype=np.int64)
+        flips = np.random.randint(0, 2, self.batch_size).astype(bool)
+        first = (index * self.batch_size) % self.length
+        with self.env.begin(write=False, buffers=True) as txn:
+            for i in range(self.batch_size):
+                data, labels[i] = CaffeLMDBBatchDataset.decode(txn.get(self.keys[(first + i) % self.length]))
+                if data.shape[1] < height or data.shape[2] < width:
+                    raise ValueError("Image in LMDB database (%s) is smaller than model input (%s)" %
+                                     (str(data.shape), str(self.input_shape)))
+                top = np.random.randint(0, data.shape[1] - height + 1)
+                left = np.random.randint(0, data.shape[2] - width + 1)
+                data = data[:, top:top + height, left:left + width]
+                batch[i] = data[:, :, ::-1] if flips[i] else data
+        return (torch.from_numpy(batch), torch.from_numpy(labels))
+
+    def __len__(self):
+        return self.virtual_length
+
+    def __repr__(self):
+        return self.__class__.__name__ + ' (' + self.db_path + ')'
+
+
+def unwrap_batch(batch):
+    """Collate function for datasets that return entire batches (data loader batch size is 1)."""
+    return batch[0]
+
+
 class SyntheticDataLoader(object):
     """ Data loader for synthetic data.
 
@@ -159,62 +344,180 @@ class SyntheticDataLoader(object):
     It seems that default DataLoader is not efficient or I did not figure out how
     to use it properly with synthetic data. This synthetic data loader will iterate
     forever.
+
+    A pool of `synthetic_batches` distinct batches is generated once and batches are
+    returned in round robin order, so with large enough pool host memory traffic is
+    similar to that of real data (pool does not fit into CPU caches). Optionally,
+    decoding can be emulated for batches in host memory - every batch is then copied
+    from the pool into an output buffer, repeatedly, for at least
+    `synthetic_decode_cost` milliseconds.
     """
     def __init__(self, opts, input_shape, num_classes):
         """Constructor.
         Args:
             opts: `dict`, Dictionary of options. Must contain `batch_size`, `device`
-                          and `data`.
+                          and `data`. May contain `synthetic_batches` (default 1) and
+                          `synthetic_decode_cost` (default 0).
             input_shape: `tuple`, A tuple of input shape of one example (without
                                   batch dimension).
             num_classes: `int`, Number of output classes.
         """
-        # Create two random tensors - one for data and one for label
+        # Create pool of random tensors - data and labels
         data_shape = (opts['batch_size'],) + input_shape
-        self.data = torch.randn(data_shape)
-        self.labels = torch.from_numpy(
-            np.random.randint(0, num_classes, opts['batch_size']).astype(np.long)
-        )
+        num_batches = max(1, opts.get('synthetic_batches', 1))
+        self.data = [torch.randn(data_shape) for _ in range(num_batches)]
+        self.labels = [
+            torch.from_numpy(np.random.randint(0, num_classes, opts['batch_size']).astype(np.int64))
+            for _ in range(num_batches)
+        ]
+        self.decode_cost = opts.get('synthetic_decode_cost', 0) / 1000.0
+        self.index = 0
         self.prefetchable = True
+        msg = ""
         if opts['device'] == 'gpu':
-            msg = ""
             if opts['data'] in ('synthetic/device', 'synthetic/gpu'):
                 self.prefetchable = False
-                self.data = self.data.cuda()
-                self.labels = self.labels.cuda()
+                self.decode_cost = 0
+                self.data = [data.cuda() for data in self.data]
+                self.labels = [labels.cuda() for labels in self.labels]
                 if opts['dtype'] == 'float16':
-                    self.data = self.data.half()
+                    self.data = [data.half() for data in self.data]
                     msg = "Synthetic dataset will be in device memory in half precision format."
                 else:
                     msg = "Synthetic dataset will be in device memory in single precision format."
             elif opts['data'] in ('synthetic', 'synthetic/pinned'):
-                self.data = self.data.pin_memory()
-                self.labels = self.labels.pin_memory()
+                self.data = [data.pin_memory() for data in self.data]
+                self.labels = [labels.pin_memory() for labels in self.labels]
                 msg = "Synthetic dataset will be in host pinned memory."
             elif opts['data'] == 'synthetic/pageable':
                 msg = "Synthetic dataset will be in host pageable memory."
             else:
                 raise ValueError("Invalid data type '%s'" % opts['data'])
+        # Output buffers for emulated decoding. Batches may be queued by a data prefetcher,
+        # so there must be more buffers than batches in flight.
+        self.outputs = BatchBufferPool(
+            opts.get('prefetch_depth', 1) + 2,
+            pin_memory=opts['device'] == 'gpu' and opts['data'] != 'synthetic/pageable'
+        )
+
+        if opts['local_rank'] == 0:
+            pool_size = num_batches * self.data[0].numel() * self.data[0].element_size()
+            print("Synthetic data: pool of %d batches (%.2f MB), decode cost %.2f ms. %s" % (
+                num_batches, pool_size / 1e6, self.decode_cost * 1000, msg))
+
+    def next(self):
+        """Return next tuple training tuple.
+        Returns:
+            A tuple of (X, Y)
+        """
+        data, labels = self.data[self.index], self.labels[self.index]
+        self.index = (self.index + 1) % len(self.data)
+        if self.decode_cost > 0:
+            output = self.outputs.get(data.shape, data.dtype)
+            start = timeit.default_timer()
+            output.copy_(data)
+            while timeit.default_timer() - start < self.decode_cost:
+                output.copy_(data)
+            data = output
+        return (data, labels)
 
-            if opts['local_rank'] == 0:
-                print(msg)
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.next()
+
+
+class TensorsDataLoader(object):
+    """Data loader for tensors datasets (see `images2tensors`).
+
+    Tensors datasets are binary files that contain images of shape (3, Size, Size)
+    stored as uint8 or float32 arrays. Files contain no meta information, so number
+    of images in a file is its size divided by size of one image. Files are memory
+    mapped and batches are slices of these mappings (no copy) unless a batch spans
+    two files. Datasets do not contain labels, random labels are used. This loader
+    iterates forever.
+    """
+    def __init__(self, opts, input_shape, num_classes):
+        """Constructor.
+        Args:
+            opts: `dict`, Dictionary of options. Must contain `batch_size`, `device`,
+                          `data_dir` and `tensors_dtype` ('uchar' or 'float'). If
+                          `data_partition` is 'shard', each rank (`global_rank`) uses
+                          a contiguous shard of images.
+            input_shape: `tuple`, A tuple of input shape of one example (without
+                                  batch dimension).
+            num_classes: `int`, Number of output classes.
+        """
+        self.batch_size = opts['batch_size']
+        self.files = open_tensors(opts['data_dir'], input_shape,
+                                  np.uint8 if opts['tensors_dtype'] == 'uchar' else np.float32, mode='c')
+        if opts.get('data_partition') == 'shard' and opts['world_size'] > 1:
+            self.files = partition_tensors(self.files, opts['global_rank'], opts['world_size'])
+        if not self.files:
+            raise ValueError("No tensors found in '%s' for input shape %s." % (opts['data_dir'], str(input_shape)))
+        self.labels = torch.from_numpy(
+            np.random.randint(0, num_classes, self.batch_size).astype(np.int64)
+        )
+        # On GPUs, data prefetcher converts batches to floating point numbers.
+        self.as_float = opts['device'] != 'gpu'
+        self.file_index = 0
+        self.offset = 0
 
     def next(self):
         """Return next tuple training tuple.
         Returns:
             A tuple of (X, Y)
         """
-        return (self.data, self.labels)
+        chunks = []
+        num_images = 0
+        while num_images < self.batch_size:
+            tensors = self.files[self.file_index]
+            count = min(self.batch_size - num_images, len(tensors) - self.offset)
+            chunks.append(tensors[self.offset:self.offset + count])
+            num_images += count
+            self.offset += count
+            if self.offset >= len(tensors):
+                self.file_index = (self.file_index + 1) % len(self.files)
+                self.offset = 0
+        data = torch.from_numpy(chunks[0] if len(chunks) == 1 else np.concatenate(chunks))
+        if self.as_float:
+            data = data.float()
+        return (data, self.labels)
 
     def __iter__(self):
         return self
 
     def __next__(self):
-        return (self.data, self.labels)
+        return self.next()
+
+
+class ShardSampler(torch.utils.data.Sampler):
+    """Samples indices from a contiguous range [first, last), possibly, shuffled.
+
+    Unlike DistributedSampler, it does not build and permute list of indices of an
+    entire dataset, only indices of one shard.
+    """
+    def __init__(self, first, last, shuffle=False):
+        self.first = first
+        self.last = last
+        self.shuffle = shuffle
+
+    def __iter__(self):
+        if self.shuffle:
+            return iter((torch.randperm(self.last - self.first) + self.first).tolist())
+        return iter(range(self.first, self.last))
+
+    def __len__(self):
+        return self.last - self.first
 
 
 def fast_collate(batch):
-    """Convert batch into tuple of X and Y tensors."""
+    """Convert batch into tuple of X and Y tensors.
+
+    This function allocates new batch tensor for every batch. See `FastCollate` that
+    reuses preallocated batch buffers.
+    """
     imgs = [img[0] for img in batch]
     targets = torch.tensor([target[1] for target in batch], dtype=torch.int64)
     width = imgs[0].size[0]
@@ -229,6 +532,114 @@ def fast_collate(batch):
     return (tensor, targets)
 
 
+class BatchBufferPool(object):
+    """A ring of preallocated batch tensors.
+
+    Buffers are allocated on first request for a particular shape and are then
+    returned in round robin order. A buffer is overwritten `num_buffers` batches
+    later, so this number must be larger than number of batches that may be in
+    flight (data loader prefetch queue plus batches being used by a model).
+    """
+    def __init__(self, num_buffers, pin_memory=False):
+        """Constructor.
+        Args:
+            num_buffers: `int`, Number of buffers per shape.
+            pin_memory: `bool`, If true, allocate buffers in page locked memory.
+        """
+        self.num_buffers = num_buffers
+        self.pin_memory = pin_memory
+        self.buffers = {}
+        self.index = {}
+
+    def get(self, shape, dtype=torch.uint8):
+        """Returns next buffer of a given shape."""
+        key = (tuple(shape), dtype)
+        if key not in self.buffers:
+            self.buffers[key] = []
+            self.index[key] = 0
+        buffers = self.buffers[key]
+        if len(buffers) < self.num_buffers:
+            buffer = torch.empty(key[0], dtype=dtype)
+            buffers.append(buffer.pin_memory() if self.pin_memory else buffer)
+        buffer = buffers[self.index[key] % len(buffers)]
+        self.index[key] += 1
+        return buffer
+
+
+def get_num_batches_in_flight(opts):
+    """Returns maximal number of batches that may be alive at the same time.
+
+    These are batches prefetched by data loader workers (two per worker), batches in
+    a queue of a data prefetcher (`prefetch_depth`) plus one batch its background
+    thread holds while the queue is full, and a batch being used by a model.
+
+    Args:
+        opts: `dict`, Dictionary of options (`num_loader_threads`, `prefetch_depth`).
+    """
+    num_batches = 1
+    if opts.get('num_loader_threads', 0) > 0:
+        num_batches += 2
+    prefetch_depth = opts.get('prefetch_depth', 1)
+    if prefetch_depth > 0:
+        num_batches += prefetch_depth + 1
+    return num_batches
+
+
+def check_collate_buffers(num_buffers, opts):
+    """Ensures batch buffers are not reused while batches are still in flight.
+
+    Args:
+        num_buffers: `int`, Number of batch buffers in a `BatchBufferPool`.
+        opts: `dict`, Dictionary of options (see `get_num_batches_in_flight`).
+
+    Raises:
+        ValueError: If `num_buffers` is not larger than number of batches in flight.
+    """
+    num_batches = get_num_batches_in_flight(opts)
+    if num_buffers <= num_batches:
+        raise ValueError(
+            "Number of collate buffers (%d) must be larger than number of batches in flight (%d = "
+            "loader workers prefetch + prefetch depth + batch in use). Increase --collate_buffers "
+            "or decrease --prefetch_depth." % (num_buffers, num_batches)
+        )
+
+
+class FastCollate(object):
+    """Collate function that writes images into reusable batch buffers.
+
+    Images are copied once into a channels-last (NHWC) staging array that is reused
+    for all batches. This array is then transposed, in one operation, into a NCHW
+    buffer from a `BatchBufferPool`. When used in data loader workers, buffers are
+    moved to shared memory the first time they are sent to a main process and are
+    then reused with no new shared memory allocations.
+    """
+    def __init__(self, num_buffers=8, pin_memory=False):
+        """Constructor.
+        Args:
+            num_buffers: `int`, Number of batch buffers.
+            pin_memory: `bool`, If true, allocate batch buffers in page locked memory.
+                                Only works in a main process (no loader workers).
+        """
+        self.pool = BatchBufferPool(num_buffers, pin_memory)
+        self.staging = None
+
+    def __call__(self, batch):
+        """Convert batch into tuple of X and Y tensors."""
+        targets = torch.tensor([target[1] for target in batch], dtype=torch.int64)
+        width, height = batch[0][0].size
+        shape = (len(batch), height, width, 3)
+        if self.staging is None or self.staging.shape != shape:
+            self.staging = np.empty(shape, dtype=np.uint8)
+        for i, (img, _) in enumerate(batch):
+            nump_array = np.asarray(img, dtype=np.uint8)
+            if nump_array.ndim < 3:
+                nump_array = np.expand_dims(nump_array, axis=-1)
+            self.staging[i] = nump_array
+        tensor = self.pool.get((len(batch), 3, height, width))
+        tensor.copy_(torch.from_numpy(self.staging).permute(0, 3, 1, 2))
+        return (tensor, targets)
+
+
 class DatasetFactory(object):
     """Creates various dataset loaders"""
 
@@ -248,6 +659,11 @@ class DatasetFactory(object):
         """
         if opts['data_dir'] == '':
             return SyntheticDataLoader(opts, input_shape, num_classes)
+        partition = None
+        if opts['world_size'] > 1 and opts.get('data_partition') == 'shard':
+            partition = (opts['global_rank'], opts['world_size'])
+        if opts['data_backend'] == 'tensors':
+            return TensorsDataLoader(opts, input_shape, num_classes)
         else:
             # Assuming (Channels, Height, Width). This is for image data now.
             # TODO: handle other types of data
@@ -262,6 +678,24 @@ class DatasetFactory(object):
                 #transforms.ToTensor(),
                 #normalize,
             ]
+            if opts['data_backend'] == 'caffe_lmdb_batch':
+                dataset = CaffeLMDBBatchDataset(
+                    opts['data_dir'],
+                    opts['batch_size'],
+                    opts['num_warmup_batches'] + opts['num_batches'],
+                    input_shape,
+                    partition=partition,
+                    keys_cache=opts.get('lmdb_keys_cache')
+                )
+                return torch.utils.data.DataLoader(
+                    dataset,
+                    batch_size=1,
+                    shuffle=False,
+                    num_workers=opts['num_loader_threads'],
+                    pin_memory=opts['device'] == 'gpu',
+                    sampler=DatasetFactory.get_sampler(dataset, opts),
+                    collate_fn=unwrap_batch
+                )
             if opts['data_backend'] == 'image_folder':
                 dataset = datasets.ImageFolder(opts['data_dir'], transforms.Compose(pipeline))
             elif opts['data_backend'] == 'caffe_lmdb':
@@ -269,15 +703,16 @@ class DatasetFactory(object):
                     opts['data_dir'],
                     opts['batch_size'],
                     opts['num_warmup_batches'] + opts['num_batches'],
-                    transforms.Compose(pipeline)
+                    transforms.Compose(pipeline),
+                    partition=partition,
+                    keys_cache=opts.get('lmdb_keys_cache')
                 )
             else:
                 raise ValueError("Invalid data backend (%s)" % opts['data_backend'])
 
-        if opts['world_size'] > 1:
-            dataset_sampler = torch.utils.data.distributed.DistributedSampler(dataset)
-        else:
-            dataset_sampler = None
+        # Batches returned by FastCollate are views of reusable buffers.
+        check_collate_buffers(opts['collate_buffers'], opts)
+        dataset_sampler = DatasetFactory.get_sampler(dataset, opts)
         return torch.utils.data.DataLoader(
             dataset,
             batch_size=opts['batch_size'],
@@ -285,15 +720,48 @@ class DatasetFactory(object):
             num_workers=opts['num_loader_threads'],
             pin_memory=opts['device'] == 'gpu',
             sampler=dataset_sampler,
-            collate_fn=fast_collate
+            collate_fn=FastCollate(
+                num_buffers=opts['collate_buffers'],
+                pin_memory=opts['device'] == 'gpu' and opts['num_loader_threads'] == 0
+            )
         )
 
 
-class DataPrefetcher(object):
-    """Class that prefetches outputs of a data loader into a GPU memory.
+    @staticmethod
+    def get_sampler(dataset, opts):
+        """Returns sampler for multi-process benchmarks, else None.
 
-    Prefetching is done for GPU devices. Data loader may provide `prefetchable`
-    boolean property that additionally controls if a data needs to be prefetched.
+        If `data_partition` is 'sampler', distributed sampler is used. If it is 'shard',
+        datasets that have been partitioned (have `partition` attribute) use default
+        samplers, other datasets use ShardSampler.
+        """
+        if opts['world_size'] <= 1:
+            return None
+        if opts.get('data_partition', 'sampler') == 'sampler':
+            return torch.utils.data.distributed.DistributedSampler(dataset)
+        if getattr(dataset, 'partition', None) is not None:
+            return None
+        first, last = partition_range(len(dataset), opts['global_rank'], opts['world_size'])
+        return ShardSampler(first, last, opts['data_shuffle'])
+
+
+class DataPrefetcher(object):
+    """Class that prefetches outputs of a data loader, possibly, into a GPU memory.
+
+    A background thread reads batches from a data loader and puts them into a queue
+    (ring) of `prefetch_depth` batches. For GPU devices, batches are copied into GPU
+    memory on a side CUDA stream and are converted to floating point numbers. Data
+    loader may provide `prefetchable` boolean property that additionally controls if
+    a data needs to be copied to GPU. On CPU devices, batches are prefetched as is,
+    so this code path can be tested without GPUs. If `prefetch_depth` is 0, batches
+    are read from a data loader in a caller thread.
+
+    Batches queued on CPU devices alias buffers of a `FastCollate` collate function,
+    so number of its buffers must be larger than number of batches in flight. This
+    is checked in constructor.
+
+    Time spent waiting for batches is accumulated in `wait_time` (seconds), time the
+    last `next` call waited is `last_wait_time`.
     """
 
     def __init__(self, loader, opts):
@@ -302,51 +770,89 @@ class DataPrefetcher(object):
             loader: `iterable`, A data loader that returns (X, Y) tuple. A loader can
                                 provide boolean `prefetchable` property to instruct data
                                 prefetcher not to prefetch data.
-            opts:   `dict`, options that must contain the keys: `device` and `dtype`.
+            opts:   `dict`, options that must contain the keys: `device` and `dtype`
+                            and optionally `prefetch_depth` (default is 1) and
+                            `local_rank` (default is 0).
         """
         self.loader = iter(loader)
-        self.next_data = None
-        self.next_labels = None
-        self.prefetchable = opts['device'] == 'gpu' and \
-                            (not getattr(loader, 'prefetchable', None) or loader.prefetchable)
-        if self.prefetchable:
-            self.prefetchable = True
-            self.fp16 = opts['dtype'] == 'float16'
-            self.stream = torch.cuda.Stream()
-            self.__preload()
+        self.wait_time = 0.0
+        self.last_wait_time = 0.0
+        self.depth = opts.get('prefetch_depth', 1)
+        self.device = opts.get('local_rank', 0)
+        self.with_cuda = opts['device'] == 'gpu' and \
+                         (not getattr(loader, 'prefetchable', None) or loader.prefetchable)
+        self.fp16 = opts['dtype'] == 'float16'
+        collate_fn = getattr(loader, 'collate_fn', None)
+        if not self.with_cuda and isinstance(collate_fn, FastCollate):
+            loader_opts = dict(opts, num_loader_threads=getattr(loader, 'num_workers', 0))
+            check_collate_buffers(collate_fn.pool.num_buffers, loader_opts)
+        self.stream = torch.cuda.Stream() if self.with_cuda else None
+        self.stopped = threading.Event()
+        self.exhausted = False
+        self.queue = None
+        if self.depth > 0:
+            self.queue = Queue.Queue(maxsize=self.depth)
+            self.thread = threading.Thread(target=self.__prefetch)
+            self.thread.daemon = True
+            self.thread.start()
 
     def next(self):
         """Return next tuple (X,Y) that can be prefetched into GPU memory.
         Returns:
-            A tuple of (X, Y).
+            A tuple of (X, Y). It is (None, None) if data loader has been exhausted.
         """
-        if not self.prefetchable:
-            self.__get_next()
-            return (self.next_data, self.next_labels)
-        if self.next_data is None:
+        if self.exhausted:
             return (None, None)
-        if not self.next_data.is_cuda:
-            torch.cuda.current_stream().wait_stream(self.stream)
-        data = self.next_data
-        labels = self.next_labels
-        self.__preload()
+        start = timeit.default_timer()
+        if self.queue is None:
+            data, labels, event = self.__load()
+        else:
+            data, labels, event = self.queue.get()
+        if event is not None:
+            torch.cuda.current_stream().wait_event(event)
+            data.record_stream(torch.cuda.current_stream())
+            labels.record_stream(torch.cuda.current_stream())
+        self.last_wait_time = timeit.default_timer() - start
+        self.wait_time += self.last_wait_time
+        self.exhausted = data is None
         return (data, labels)
 
-    def __get_next(self):
+    def close(self):
+        """Stops background thread."""
+        self.stopped.set()
+        if self.queue is not None:
+            while self.thread.is_alive():
+                try:
+                    self.queue.get(timeout=0.1)
+                except Queue.Empty:
+                    pass
+
+    def __load(self):
+        """Loads next batch and, for GPUs, starts copying it into GPU memory.
+
+        Returns:
+            A tuple of (X, Y, CUDA event or None).
+        """
         try:
-            self.next_data, self.next_labels = next(self.loader)
+            data, labels = next(self.loader)
         except StopIteration:
-            self.next_data = None
-            self.next_labels = None
-
-    def __preload(self):
-        self.__get_next()
-        if self.next_data is None or self.next_data.is_cuda:
-            return
+            return (None, None, None)
+        if not self.with_cuda or data.is_cuda:
+            return (data, labels, None)
         with torch.cuda.stream(self.stream):
-            self.next_data = self.next_data.cuda(async=True)
-            self.next_labels = self.next_labels.cuda(async=True)
-            if self.fp16:
-                self.next_data = self.next_data.half()
-            else:
-                self.next_data = self.next_data.float()
+            data = data.cuda(non_blocking=True)
+            labels = labels.cuda(non_blocking=True)
+            data = data.half() if self.fp16 else data.float()
+            event = torch.cuda.Event()
+            event.record()
+        return (data, labels, event)
+
+    def __prefetch(self):
+        """Background thread function."""
+        if self.with_cuda:
+            torch.cuda.set_device(self.device)
+        while not self.stopped.is_set():
+            batch = self.__load()
+            self.queue.put(batch)
+            if batch[0] is None:
+                break
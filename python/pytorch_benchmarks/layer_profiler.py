@@ -0,0 +1,164 @@
+# (c) Copyright [2017] Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Per-layer profiler based on PyTorch module hooks.
+
+Forward time of a leaf module is a time between its forward pre-hook and forward hook.
+Backward timing relies on hooks registered on output tensors of leaf modules - such a
+hook is called when gradient with respect to module's output has been computed, i.e.
+when module's backward starts. Backward time of a module is a time from this event to
+the next one (or to the end of backward pass). This is exact for sequential models
+and is an approximation for models with parallel branches. On GPUs, every hook
+synchronizes the device, so that kernel times are attributed to correct layers.
+
+Time spent in hooks is measured and reported as an overhead, so that a profiled run
+can be compared with a plain one.
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+import timeit
+from collections import OrderedDict
+import torch
+
+
+class LayerProfiler(object):
+    """Collects per-layer forward/backward times, output sizes and parameter counts.
+
+    Usage:
+
+    >>> profiler = LayerProfiler(model, with_cuda=False, enabled=False)
+    >>> for batch in range(num_warmup_batches + num_batches):
+    >>>     profiler.enabled = batch >= num_warmup_batches
+    >>>     profiler.start_batch()
+    >>>     loss = criterion(model(data), labels)
+    >>>     loss.backward()
+    >>>     profiler.end_batch()
+    >>> print(profiler.summary())
+    """
+
+    COLUMNS = ['layer', 'type', 'forward_ms', 'backward_ms', 'output_bytes', 'num_params']
+
+    def __init__(self, model, with_cuda=False, enabled=True):
+        """Constructor.
+        Args:
+            model: `torch.nn.Module`, A model. Hooks are registered on all its leaf modules.
+            with_cuda: `bool`, If true, synchronize CUDA device in hooks.
+            enabled: `bool`, If false, hooks do not record anything (and do not synchronize
+                             CUDA device) until `enabled` is set to true, e.g. after warmup.
+        """
+        self.with_cuda = with_cuda
+        self.enabled = enabled
+        self.handles = []
+        self.layers = OrderedDict()
+        for name, module in model.named_modules():
+            if len(list(module.children())) > 0:
+                continue
+            self.layers[module] = {
+                'name': name, 'type': module.__class__.__name__,
+                'num_params': sum(param.numel() for param in module.parameters()),
+                'forward': 0.0, 'backward': 0.0, 'output_bytes': 0
+            }
+            self.handles.append(module.register_forward_pre_hook(self.__forward_pre_hook))
+            self.handles.append(module.register_forward_hook(self.__forward_hook))
+        self.reset()
+
+    def reset(self):
+        """Resets accumulated statistics, e.g. at the end of warmup phase."""
+        for layer in self.layers.values():
+            layer.update(forward=0.0, backward=0.0, output_bytes=0)
+        self.num_batches = 0
+        self.overhead = 0.0
+        self.forward_start = {}
+        self.backward_event = None
+
+    def remove(self):
+        """Removes hooks from a model."""
+        for handle in self.handles:
+            handle.remove()
+        self.handles = []
+
+    def start_batch(self):
+        """Must be called before forward pass."""
+        self.forward_start = {}
+        self.backward_event = None
+
+    def end_batch(self):
+        """Must be called after backward pass (or after forward pass in inference)."""
+        if not self.enabled:
+            return
+        self.__close_backward_event(self.__now())
+        self.num_batches += 1
+
+    def summary(self):
+        """Returns per-layer statistics averaged over batches.
+
+        Returns:
+            A dictionary with `columns` (column names), `data` (list of rows, one row per
+            leaf module in order of model definition) and `overhead_ms` (time per batch
+            spent in hooks, milliseconds).
+        """
+        num_batches = max(1, self.num_batches)
+        data = [[
+            layer['name'], layer['type'],
+            1000.0 * layer['forward'] / num_batches, 1000.0 * layer['backward'] / num_batches,
+            layer['output_bytes'] // num_batches, layer['num_params']
+        ] for layer in self.layers.values()]
+        return {
+            'columns': LayerProfiler.COLUMNS,
+            'data': data,
+            'overhead_ms': 1000.0 * self.overhead / num_batches
+        }
+
+    def __now(self):
+        if self.with_cuda:
+            torch.cuda.synchronize()
+        return timeit.default_timer()
+
+    def __close_backward_event(self, now):
+        """Attributes time since the last backward event to a module that started it."""
+        if self.backward_event is not None:
+            module, start_time = self.backward_event
+            self.layers[module]['backward'] += now - start_time
+            self.backward_event = None
+
+    def __forward_pre_hook(self, module, _):
+        if not self.enabled:
+            return
+        hook_start = timeit.default_timer()
+        self.forward_start[module] = self.__now()
+        self.overhead += timeit.default_timer() - hook_start
+
+    def __forward_hook(self, module, _, output):
+        if not self.enabled:
+            return
+        now = self.__now()
+        layer = self.layers[module]
+        if module in self.forward_start:
+            layer['forward'] += now - self.forward_start.pop(module)
+        outputs = output if isinstance(output, (list, tuple)) else [output]
+        for tensor in outputs:
+            if not torch.is_tensor(tensor):
+                continue
+            layer['output_bytes'] += tensor.numel() * tensor.element_size()
+            if tensor.requires_grad:
+                tensor.register_hook(self.__make_backward_hook(module))
+        self.overhead += timeit.default_timer() - now
+
+    def __make_backward_hook(self, module):
+        def _hook(_):
+            now = self.__now()
+            self.__close_backward_event(now)
+            self.backward_event = (module, now)
+            self.overhead += timeit.default_timer() - now
+        return _hook
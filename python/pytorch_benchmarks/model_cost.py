@@ -0,0 +1,131 @@
+# (c) Copyright [2017] Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Computes compute cost of models defined in a model factory.
+
+For every model, one forward pass with batch size 1 is run on CPU. Forward hooks
+registered on leaf modules count floating point operations (one multiply-add is two
+FLOPs), size of activations (outputs of leaf modules) and size of parameters. Models
+in PyTorch, MXNet and Caffe2 model zoos share model identifiers, so these numbers
+apply to all frameworks.
+
+Usage:
+
+>>> python -m pytorch_benchmarks.model_cost --models resnet50 alexnet --output_file ./costs.json
+
+If ``--models`` is not set, all models are analyzed. The output file is used by
+:py:mod:`dlbs.reports.roofline` report.
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import division
+import json
+import argparse
+import numpy as np
+import torch
+import torch.nn as nn
+from pytorch_benchmarks.model_factory import ModelFactory
+
+
+class ModelCost(object):
+    """Counts FLOPs, parameter and activation bytes of PyTorch models."""
+
+    @staticmethod
+    def module_flops(module, inputs, output):
+        """Returns number of forward FLOPs for one leaf module.
+
+        :param nn.Module module: A leaf module.
+        :param tuple inputs: Input tensors.
+        :param torch.Tensor output: Output tensor.
+        :return: Number of floating point operations.
+        """
+        num_outputs = output.numel()
+        if isinstance(module, nn.Conv2d):
+            kernel_ops = module.in_channels // module.groups * np.prod(module.kernel_size)
+            return 2 * num_outputs * kernel_ops
+        if isinstance(module, nn.Linear):
+            return 2 * num_outputs * module.in_features
+        if isinstance(module, (nn.BatchNorm1d, nn.BatchNorm2d, nn.LocalResponseNorm)):
+            return 4 * num_outputs
+        if isinstance(module, (nn.MaxPool2d, nn.AvgPool2d)):
+            kernel_size = module.kernel_size
+            kernel_size = kernel_size if isinstance(kernel_size, tuple) else (kernel_size, kernel_size)
+            return num_outputs * int(np.prod(kernel_size))
+        if isinstance(module, (nn.ReLU, nn.Dropout)):
+            return num_outputs
+        if isinstance(module, (nn.LSTM, nn.GRU, nn.RNN)):
+            gates = {nn.LSTM: 4, nn.GRU: 3, nn.RNN: 1}[type(module)]
+            seq_len = inputs[0].size(0) * inputs[0].size(1)
+            ops = 0
+            for name, param in module.named_parameters():
+                if name.startswith('weight'):
+                    ops += 2 * param.numel()
+            return seq_len * ops + seq_len * gates * module.hidden_size * module.num_layers
+        return 0
+
+    @staticmethod
+    def analyze(model_id):
+        """Computes cost of one model for one input sample (batch size 1).
+
+        :param str model_id: Model identifier, one of `ModelFactory.models` keys.
+        :return: Dictionary with `name`, `input_shape`, `flops` (forward FLOPs),
+                 `param_bytes` and `activation_bytes`.
+        """
+        model = ModelFactory.get_model({'model': model_id, 'phase': 'inference'})
+        model.eval()
+        cost = {'flops': 0, 'activation_bytes': 0}
+
+        def _hook(module, inputs, output):
+            if isinstance(output, tuple):
+                output = output[0]
+            cost['flops'] += int(ModelCost.module_flops(module, inputs, output))
+            cost['activation_bytes'] += output.numel() * output.element_size()
+
+        handles = [module.register_forward_hook(_hook) for module in model.modules()
+                   if len(list(module.children())) == 0]
+        with torch.no_grad():
+            model(torch.randn((1,) + model.input_shape))
+        for handle in handles:
+            handle.remove()
+        cost.update({
+            'name': model.name,
+            'input_shape': list(model.input_shape),
+            'param_bytes': sum(p.numel() * p.element_size() for p in model.parameters())
+        })
+        return cost
+
+
+def main():
+    """Entry point when invoking this script from a command line."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--models', nargs='*', required=False, default=None,
+                        help="Models to analyze. If not set, all models are analyzed.")
+    parser.add_argument('--output_file', '--output-file', type=str, required=False, default=None,
+                        help="Write model costs into this JSON file.")
+    args = parser.parse_args()
+
+    models = args.models or sorted(ModelFactory.models.keys())
+    costs = {}
+    print("%-20s %-12s %-12s %-12s" % ('Model', 'GFLOPs', 'Params, MB', 'Activ., MB'))
+    for model_id in models:
+        costs[model_id] = ModelCost.analyze(model_id)
+        print("%-20s %-12.3f %-12.2f %-12.2f" % (model_id, costs[model_id]['flops'] / 1e9,
+                                                 costs[model_id]['param_bytes'] / 1e6,
+                                                 costs[model_id]['activation_bytes'] / 1e6))
+    if args.output_file is not None:
+        with open(args.output_file, 'w') as file_obj:
+            json.dump({'models': costs}, file_obj, indent=4, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -37,12 +37,12 @@ class AlexNet(Model):
         self.features = nn.Sequential(
             nn.Conv2d(3, 96, kernel_size=11, stride=4),
             nn.ReLU(inplace=True),
-            nn.LocalResponseNorm(size=5, alpha=0.0001, beta=0.75, k=2),
+            nn.LocalResponseNorm(size=5, alpha=0.0001, beta=0.75, k=2.0),
             nn.MaxPool2d(kernel_size=3, stride=2),
 
             nn.Conv2d(96, 256, kernel_size=5, padding=2),
             nn.ReLU(inplace=True),
-            nn.LocalResponseNorm(size=5, alpha=0.0001, beta=0.75, k=2),
+            nn.LocalResponseNorm(size=5, alpha=0.0001, beta=0.75, k=2.0),
             nn.MaxPool2d(kernel_size=3, stride=2),
 
             nn.Conv2d(256, 384, kernel_size=3, padding=1),
@@ -69,6 +69,6 @@ class AlexNet(Model):
 
     def forward(self, x):
         x = self.features(x)
-        x = x.view(x.size(0), 256 * 6 * 6)
+        x = x.reshape(x.size(0), 256 * 6 * 6)
         x = self.classifier(x)
         return x
@@ -67,6 +67,6 @@ class AlexNetOWT(Model):
 
     def forward(self, x):
         x = self.features(x)
-        x = x.view(x.size(0), 256 * 6 * 6)
+        x = x.reshape(x.size(0), 256 * 6 * 6)
         x = self.classifier(x)
         return x
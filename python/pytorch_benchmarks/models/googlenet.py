@@ -82,12 +82,12 @@ class GoogleNet(Model):
         self.features = nn.Sequential(
             ConvModule(self.input_shape[0], 64, kernel_size=7, stride=2, padding=3),
             nn.MaxPool2d(kernel_size=3, stride=2),
-            nn.LocalResponseNorm(size=5, alpha=0.0001, beta=0.75, k=2),
+            nn.LocalResponseNorm(size=5, alpha=0.0001, beta=0.75, k=2.0),
 
             ConvModule(64, 64, kernel_size=1, stride=1),
 
             ConvModule(64, 192, kernel_size=3, stride=1, padding=1),
-            nn.LocalResponseNorm(size=5, alpha=0.0001, beta=0.75, k=2),
+            nn.LocalResponseNorm(size=5, alpha=0.0001, beta=0.75, k=2.0),
             nn.MaxPool2d(kernel_size=3, stride=2),
 
             InceptionModule(192, num_1x1=64, num_3x3red=96, num_3x3=128, num_d5x5red=16, num_d5x5=32, proj=32),  # out channels = 256
@@ -112,5 +112,5 @@ class GoogleNet(Model):
 
     def forward(self, x):
         x = self.features(x)
-        x = x.view(x.size(0), 1024 * 1 * 1)
+        x = x.reshape(x.size(0), 1024 * 1 * 1)
         return self.classifier(x)
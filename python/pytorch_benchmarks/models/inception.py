@@ -97,9 +97,9 @@ class ParallelModule(nn.Module):
             self.parallel_branches.append(branch_modules)
 
     def forward(self, x):
-        outputs = [None] * len(self.parallel_branches)
-        for idx, branch in enumerate(self.parallel_branches):
-            outputs[idx] = branch(x)
+        outputs = []
+        for branch in self.parallel_branches:
+            outputs.append(branch(x))
         return torch.cat(outputs, dim=1)
 
 
@@ -203,7 +203,7 @@ class Inception3(BaseInceptionModel):
 
     def forward(self, x):
         x = self.features(x)
-        x = x.view(x.size(0), 2048 * 1 * 1)
+        x = x.reshape(x.size(0), 2048 * 1 * 1)
         return self.classifier(x)
 
 
@@ -326,5 +326,5 @@ class Inception4(BaseInceptionModel):
 
     def forward(self, x):
         x = self.features(x)
-        x = x.view(x.size(0), 1536 * 1 * 1)
+        x = x.reshape(x.size(0), 1536 * 1 * 1)
         return self.classifier(x)
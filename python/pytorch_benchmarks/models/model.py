@@ -9,6 +9,9 @@ import torch.nn as nn
 class Model(nn.Module):
     """Base class for all models"""
 
+    # These properties are python-only, TorchScript must not try to compile them.
+    __jit_unused_properties__ = ['name', 'input_shape', 'num_classes', 'phase', 'dtype']
+
     def __init__(self, params):
         super(Model, self).__init__()
         for param in ['name', 'input_shape', 'num_classes', 'phase', 'dtype']:
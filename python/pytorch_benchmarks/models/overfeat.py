@@ -68,5 +68,5 @@ class Overfeat(Model):
 
     def forward(self, x):
         x = self.features(x)
-        x = x.view(x.size(0), 1024 * 6 * 6)
+        x = x.reshape(x.size(0), 1024 * 6 * 6)
         return self.classifier(x)
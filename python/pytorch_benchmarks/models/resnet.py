@@ -132,6 +132,6 @@ class ResNet(Model):
 
     def forward(self, x):
         x = self.features(x)
-        x = x.view(x.size(0), self.num_output_channels)
+        x = x.reshape(x.size(0), self.num_output_channels)
         x = self.classifier(x)
         return x
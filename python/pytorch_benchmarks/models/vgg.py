@@ -57,6 +57,6 @@ class VGG(Model):
 
     def forward(self, x):
         x = self.features(x)
-        x = x.view(x.size(0), 512*7*7)
+        x = x.reshape(x.size(0), 512*7*7)
         x = self.classifier(x)
         return x
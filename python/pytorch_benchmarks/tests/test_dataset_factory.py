@@ -0,0 +1,122 @@
+# (c) Copyright [2017] Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Unit tests for testing pytorch_benchmarks.dataset_factory module."""
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import torch
+from PIL import Image
+from pytorch_benchmarks import dataset_factory
+from pytorch_benchmarks.dataset_factory import DataPrefetcher
+from pytorch_benchmarks.dataset_factory import DatasetFactory
+from pytorch_benchmarks.dataset_factory import FastCollate
+from pytorch_benchmarks.dataset_factory import check_collate_buffers
+from pytorch_benchmarks.dataset_factory import get_num_batches_in_flight
+from pytorch_benchmarks.dataset_factory import open_lmdb
+from pytorch_benchmarks.dataset_factory import ShardSampler
+from pytorch_benchmarks.dataset_factory import TensorsDataLoader
+
+
+class TestDatasetFactory(unittest.TestCase):
+
+    def setUp(self):
+        self.image_shape = (3, 2, 2)
+        self.data_dir = tempfile.mkdtemp()
+        # Two files with 5 and 6 images. Every pixel of an image equals its global index.
+        index = 0
+        for file_idx, count in enumerate([5, 6]):
+            images = np.zeros((count,) + self.image_shape, dtype=np.uint8)
+            for i in range(count):
+                images[i] = index
+                index += 1
+            images.tofile(os.path.join(self.data_dir, 'images_%d.tensors' % file_idx))
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def get_opts(self, rank, world_size):
+        return {
+            'data_dir': self.data_dir, 'data_backend': 'tensors', 'tensors_dtype': 'uchar',
+            'batch_size': 2, 'device': 'cpu', 'data_partition': 'shard', 'data_shuffle': False,
+            'world_size': world_size, 'global_rank': rank
+        }
+
+    def test_shard_tensors(self):
+        """pytorch_benchmarks  ->  TestDatasetFactory::test_shard_tensors  [Shard mode, tensors backend.]"""
+        expected = {0: list(range(0, 5)), 1: list(range(5, 11))}
+        for rank in (0, 1):
+            loader = DatasetFactory.get_data_loader(self.get_opts(rank, 2), self.image_shape, 10)
+            self.assertIsInstance(loader, TensorsDataLoader)
+            indices = [int(image[0, 0, 0]) for tensors in loader.files for image in tensors]
+            self.assertEqual(indices, expected[rank])
+            data, _ = loader.next()
+            self.assertEqual(data[0, 0, 0, 0].item(), expected[rank][0])
+
+    def test_shard_sampler(self):
+        """pytorch_benchmarks  ->  TestDatasetFactory::test_shard_sampler  [Shard mode, generic datasets.]"""
+        dataset = torch.utils.data.TensorDataset(torch.arange(11))
+        for rank, expected in ((0, list(range(0, 5))), (1, list(range(5, 11)))):
+            sampler = DatasetFactory.get_sampler(dataset, self.get_opts(rank, 2))
+            self.assertIsInstance(sampler, ShardSampler)
+            self.assertEqual(list(sampler), expected)
+
+    def test_collate_buffers(self):
+        """pytorch_benchmarks  ->  TestDatasetFactory::test_collate_buffers  [Batch buffers vs batches in flight.]"""
+        self.assertEqual(get_num_batches_in_flight({'num_loader_threads': 0, 'prefetch_depth': 0}), 1)
+        self.assertEqual(get_num_batches_in_flight({'num_loader_threads': 0, 'prefetch_depth': 1}), 3)
+        self.assertEqual(get_num_batches_in_flight({'num_loader_threads': 4, 'prefetch_depth': 2}), 6)
+        opts = {'num_loader_threads': 4, 'prefetch_depth': 1}
+        check_collate_buffers(8, opts)
+        with self.assertRaises(ValueError):
+            check_collate_buffers(5, opts)
+
+    def test_prefetcher_collate_buffers(self):
+        """pytorch_benchmarks  ->  TestDatasetFactory::test_prefetcher_collate_buffers  [CPU prefetch queue vs batch buffers.]"""
+        dataset = [(Image.fromarray(np.full((2, 2, 3), i, dtype=np.uint8)), i) for i in range(8)]
+        opts = {'device': 'cpu', 'dtype': 'float32', 'prefetch_depth': 3}
+        loader = torch.utils.data.DataLoader(dataset, batch_size=2, collate_fn=FastCollate(num_buffers=4))
+        with self.assertRaises(ValueError):
+            DataPrefetcher(loader, opts)
+        loader = torch.utils.data.DataLoader(dataset, batch_size=2, collate_fn=FastCollate(num_buffers=6))
+        prefetcher = DataPrefetcher(loader, opts)
+        labels = []
+        while True:
+            data, target = prefetcher.next()
+            if data is None:
+                break
+            labels.extend(int(label) for label in target)
+            self.assertEqual([int(image[0, 0, 0]) for image in data], [int(label) for label in target])
+        self.assertEqual(labels, list(range(8)))
+
+    @unittest.skipIf(not dataset_factory.HAVE_CAFFE_LMDB, "LMDB is not available")
+    def test_open_lmdb_cache_error(self):
+        """pytorch_benchmarks  ->  TestDatasetFactory::test_open_lmdb_cache_error  [Failed LMDB keys cache write.]"""
+        db_path = os.path.join(self.data_dir, 'lmdb')
+        env = dataset_factory.lmdb.open(db_path, map_size=1 << 20)
+        with env.begin(write=True) as txn:
+            for i in range(3):
+                txn.put(b'key%d' % i, b'value')
+        env.close()
+        # Renaming a file into existing non-empty directory fails.
+        cache_file = os.path.join(self.data_dir, 'cache')
+        os.makedirs(os.path.join(cache_file, 'subdir'))
+        _, keys = open_lmdb(db_path, cache_file)
+        self.assertEqual(list(keys), [b'key0', b'key1', b'key2'])
+        self.assertEqual(sorted(os.listdir(self.data_dir)), ['cache', 'images_0.tensors', 'images_1.tensors', 'lmdb'])
+
+
+if __name__ == '__main__':
+    unittest.main()
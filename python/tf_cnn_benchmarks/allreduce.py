@@ -17,7 +17,6 @@
 from __future__ import print_function
 
 import collections as pycoll
-import re
 
 from six.moves import xrange  # pylint: disable=redefined-builtin
 import tensorflow as tf
@@ -25,116 +24,12 @@ import tensorflow as tf
 from tensorflow.contrib import nccl
 from tensorflow.contrib.all_reduce.python import all_reduce
 
-AllReduceSpecTuple = pycoll.namedtuple('AllReduceSpecTuple', 'alg shards limit')
-
-
-def parse_general_int(s):
-  """Parse integer with power-of-2 suffix eg. 32k."""
-  mo = re.match(r'(\d+)([KkMGT]?)$', s)
-  if mo:
-    i, suffix = mo.group(1, 2)
-    v = int(i)
-    if suffix:
-      if suffix == 'K' or suffix == 'k':
-        v *= 1024
-      elif suffix == 'M':
-        v *= (1024 * 1024)
-      elif suffix == 'G':
-        v *= (1024 * 1024 * 1024)
-      elif suffix == 'T':
-        v *= (1024 * 1024 * 1024 * 1024)
-      else:
-        raise ValueError('invalid integer string %s' % s)
-    return v
-  else:
-    v = int(s)
-  return v
-
-
-def parse_all_reduce_spec(all_reduce_spec):
-  """Parse all_reduce_spec.
-
-  Args:
-    all_reduce_spec: a string specifying a combination of all-reduce
-      algorithms to apply for gradient reduction.
-
-  Returns:
-    a list of AllReduceSpecTuple.
-
-  Raises:
-    ValueError: all_reduce_spec is not well-formed.
-
-  An all_reduce_spec has BNF form:
-     int ::= positive whole number
-     g_int ::= int[KkMGT]?
-     alg_spec ::= alg | alg#int
-     range_spec ::= alg_spec | alg_spec/alg_spec
-     spec ::= range_spec | range_spec:g_int:range_spec
-
-  Not all syntactically correct specifications are supported.
-  Examples of supported all_reduce_spec strings, with semantics explained:
-
-    'xring' == apply ring all-reduce to all tensors
-    'xring#2' == apply ring all-reduce to all tensors, using two simultaneous
-            transfer rings, each operating on 1/2 of each tensor.
-    'nccl'  == apply NCCL all-reduce to all tensors (only works within
-            a single worker process where all devices are GPUs)
-    'nccl/xring' == apply NCCL all-reduce to all tensors within each worker
-            to produce at least one full-reduced (locally) value,
-            then apply ring all-reduce to one such value from each
-            worker, then apply NCCL broadcast to propagate those globally
-            reduced values back to every device within each worker.
-    'pscpu' == Shuffle reduce using worker CPUs as the gather devices: each
-            distributed tensor is reduced by copying all instances to
-            one of the worker CPUs, computing the reduction there, then
-            copying back to each participating device.  Tensor reductions
-            are assigned to specific CPUs round-robin.
-    'psgpu#4' == Arrange all GPUs across all workers into groups of 4.
-            Each distributed tensor is shuffle reduced against one
-            such group of 4 GPUs, selected round-robin.  That is, each
-            tensor is split across 4 shards for the reduction.
-    'pscpu:2k:pscpu#2:64k:xring' == Apply single-shard pscpu to
-            tensors of size <= 2048 elements, apply 2-shard pscpu to
-            tensors up to size 64k elements, apply xring to larger tensors.
-    'pscpu/pscpu#2' == Use shuffle gather to locally reduce each tensor on
-            the worker's CPU, then use 2-shard shuffle to reduce those
-            locally reduced tensors across workers (on the worker CPUs), then
-            scatter the globally reduced values locally from each worker CPU.
-  """
-  range_parts = all_reduce_spec.split(':') + ['-1']
-  if len(range_parts) % 2:
-    raise ValueError('all_reduce_spec not well formed: %s' % all_reduce_spec)
-  limit = 0
-  spec = []
-  alg = None
-  shards = 1
-  for i, range_part in enumerate(range_parts):
-    if i % 2 == 1:
-      try:
-        limit = parse_general_int(range_part)
-        spec.append(AllReduceSpecTuple(alg=alg, shards=shards, limit=limit))
-      except ValueError:
-        raise ValueError('all_reduce_spec (%s) contains non-integer range %s' %
-                         (all_reduce_spec, range_part))
-    else:
-      alg = range_part
-      alg_parts = range_part.split('#')
-      alg = alg_parts[0]
-      if len(alg_parts) > 1:
-        try:
-          shards = int(alg_parts[1])
-        except ValueError:
-          raise ValueError('all_reduce_spec (%s) contains non-integer '
-                           'shards %s' % all_reduce_spec, alg_parts[1])
-      else:
-        shards = 1
-      if alg not in [
-          'nccl', 'nccl/xring', 'nccl/rechd', 'nccl/pscpu', 'xring', 'pscpu',
-          'psgpu', 'pscpu/pscpu'
-      ]:
-        raise ValueError('all_reduce_spec (%s) contains invalid alg %s' %
-                         (all_reduce_spec, alg))
-  return spec
+# Spec parsing and range extraction do not depend on TensorFlow and are shared
+# with the all-reduce cost model.
+from allreduce_model import AllReduceSpecTuple  # pylint: disable=unused-import
+from allreduce_model import extract_ranges
+from allreduce_model import parse_all_reduce_spec  # pylint: disable=unused-import
+from allreduce_model import parse_general_int  # pylint: disable=unused-import
 
 
 def build_all_reduce_device_prefixes(job_name, num_tasks):
@@ -338,43 +233,6 @@ def sum_gradients_all_reduce(dev_prefixes,
   return new_tower_grads
 
 
-def extract_ranges(index_list, range_size_limit=32):
-  """Extract consecutive ranges and singles from index_list.
-
-  Args:
-    index_list: List of monotone increasing non-negative integers.
-    range_size_limit: Largest size range to return.  If a larger
-      consecutive range exists it will be returned as multiple
-      ranges.
-
-  Returns:
-   ranges, singles where ranges is a list of [first, last] pairs of
-     consecutive elements in index_list, and singles is all of the
-     other elements, in original order.
-  """
-  if not index_list:
-    return [], []
-  first = index_list[0]
-  last = first
-  ranges = []
-  singles = []
-  for i in index_list[1:]:
-    if i == last + 1 and (last - first) <= range_size_limit:
-      last = i
-    else:
-      if last > first:
-        ranges.append([first, last])
-      else:
-        singles.append(first)
-      first = i
-      last = i
-  if last > first:
-    ranges.append([first, last])
-  else:
-    singles.append(first)
-  return ranges, singles
-
-
 GradPackTuple = pycoll.namedtuple('GradPackTuple', 'indices vars shapes')
 
 
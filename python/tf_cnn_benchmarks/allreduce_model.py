@@ -0,0 +1,378 @@
+# Copyright 2017 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+"""TensorFlow-free part of allreduce: spec parsing, packing and a cost model.
+
+Functions in this module operate on gradient sizes (number of elements) instead
+of tensors. `pack_sizes` and `split_sizes_by_size` mirror `pack_small_tensors`
+and `split_grads_by_size` from allreduce.py and share `extract_ranges` with
+them, so a packing computed here is exactly the one TensorFlow graph will have.
+`AllReduceCostModel` estimates time spent in gradient reduction for a given
+all_reduce_spec and packing parameters with a simple latency/bandwidth model.
+"""
+
+from __future__ import division
+from __future__ import print_function
+
+import collections as pycoll
+import math
+import re
+
+AllReduceSpecTuple = pycoll.namedtuple('AllReduceSpecTuple', 'alg shards limit')
+
+# Size in bytes of a float32 gradient element. Only float32 gradients are
+# packed by pack_small_tensors.
+FLOAT32_BYTES = 4
+
+ALL_REDUCE_ALGS = [
+    'nccl', 'nccl/xring', 'nccl/rechd', 'nccl/pscpu', 'xring', 'pscpu',
+    'psgpu', 'pscpu/pscpu'
+]
+
+
+def parse_general_int(s):
+  """Parse integer with power-of-2 suffix eg. 32k."""
+  mo = re.match(r'(\d+)([KkMGT]?)$', s)
+  if mo:
+    i, suffix = mo.group(1, 2)
+    v = int(i)
+    if suffix:
+      if suffix == 'K' or suffix == 'k':
+        v *= 1024
+      elif suffix == 'M':
+        v *= (1024 * 1024)
+      elif suffix == 'G':
+        v *= (1024 * 1024 * 1024)
+      elif suffix == 'T':
+        v *= (1024 * 1024 * 1024 * 1024)
+      else:
+        raise ValueError('invalid integer string %s' % s)
+    return v
+  else:
+    v = int(s)
+  return v
+
+
+def parse_all_reduce_spec(all_reduce_spec):
+  """Parse all_reduce_spec.
+
+  Args:
+    all_reduce_spec: a string specifying a combination of all-reduce
+      algorithms to apply for gradient reduction.
+
+  Returns:
+    a list of AllReduceSpecTuple.
+
+  Raises:
+    ValueError: all_reduce_spec is not well-formed.
+
+  An all_reduce_spec has BNF form:
+     int ::= positive whole number
+     g_int ::= int[KkMGT]?
+     alg_spec ::= alg | alg#int
+     range_spec ::= alg_spec | alg_spec/alg_spec
+     spec ::= range_spec | range_spec:g_int:range_spec
+
+  Not all syntactically correct specifications are supported.
+  Examples of supported all_reduce_spec strings, with semantics explained:
+
+    'xring' == apply ring all-reduce to all tensors
+    'xring#2' == apply ring all-reduce to all tensors, using two simultaneous
+            transfer rings, each operating on 1/2 of each tensor.
+    'nccl'  == apply NCCL all-reduce to all tensors (only works within
+            a single worker process where all devices are GPUs)
+    'nccl/xring' == apply NCCL all-reduce to all tensors within each worker
+            to produce at least one full-reduced (locally) value,
+            then apply ring all-reduce to one such value from each
+            worker, then apply NCCL broadcast to propagate those globally
+            reduced values back to every device within each worker.
+    'pscpu' == Shuffle reduce using worker CPUs as the gather devices: each
+            distributed tensor is reduced by copying all instances to
+            one of the worker CPUs, computing the reduction there, then
+            copying back to each participating device.  Tensor reductions
+            are assigned to specific CPUs round-robin.
+    'psgpu#4' == Arrange all GPUs across all workers into groups of 4.
+            Each distributed tensor is shuffle reduced against one
+            such group of 4 GPUs, selected round-robin.  That is, each
+            tensor is split across 4 shards for the reduction.
+    'pscpu:2k:pscpu#2:64k:xring' == Apply single-shard pscpu to
+            tensors of size <= 2048 elements, apply 2-shard pscpu to
+            tensors up to size 64k elements, apply xring to larger tensors.
+    'pscpu/pscpu#2' == Use shuffle gather to locally reduce each tensor on
+            the worker's CPU, then use 2-shard shuffle to reduce those
+            locally reduced tensors across workers (on the worker CPUs), then
+            scatter the globally reduced values locally from each worker CPU.
+  """
+  range_parts = all_reduce_spec.split(':') + ['-1']
+  if len(range_parts) % 2:
+    raise ValueError('all_reduce_spec not well formed: %s' % all_reduce_spec)
+  limit = 0
+  spec = []
+  alg = None
+  shards = 1
+  for i, range_part in enumerate(range_parts):
+    if i % 2 == 1:
+      try:
+        limit = parse_general_int(range_part)
+        spec.append(AllReduceSpecTuple(alg=alg, shards=shards, limit=limit))
+      except ValueError:
+        raise ValueError('all_reduce_spec (%s) contains non-integer range %s' %
+                         (all_reduce_spec, range_part))
+    else:
+      alg = range_part
+      alg_parts = range_part.split('#')
+      alg = alg_parts[0]
+      if len(alg_parts) > 1:
+        try:
+          shards = int(alg_parts[1])
+        except ValueError:
+          raise ValueError('all_reduce_spec (%s) contains non-integer '
+                           'shards %s' % all_reduce_spec, alg_parts[1])
+      else:
+        shards = 1
+      if alg not in ALL_REDUCE_ALGS:
+        raise ValueError('all_reduce_spec (%s) contains invalid alg %s' %
+                         (all_reduce_spec, alg))
+  return spec
+
+
+def extract_ranges(index_list, range_size_limit=32):
+  """Extract consecutive ranges and singles from index_list.
+
+  Args:
+    index_list: List of monotone increasing non-negative integers.
+    range_size_limit: Largest size range to return.  If a larger
+      consecutive range exists it will be returned as multiple
+      ranges.
+
+  Returns:
+   ranges, singles where ranges is a list of [first, last] pairs of
+     consecutive elements in index_list, and singles is all of the
+     other elements, in original order.
+  """
+  if not index_list:
+    return [], []
+  first = index_list[0]
+  last = first
+  ranges = []
+  singles = []
+  for i in index_list[1:]:
+    if i == last + 1 and (last - first) <= range_size_limit:
+      last = i
+    else:
+      if last > first:
+        ranges.append([first, last])
+      else:
+        singles.append(first)
+      first = i
+      last = i
+  if last > first:
+    ranges.append([first, last])
+  else:
+    singles.append(first)
+  return ranges, singles
+
+
+def split_sizes_by_size(threshold_size, sizes):
+  """Counterpart of `allreduce.split_grads_by_size` for gradient sizes.
+
+  Args:
+    threshold_size: int size cutoff (number of elements) for small vs large
+      tensor.
+    sizes: List of gradient sizes (number of elements) of one tower.
+
+  Returns:
+    small_sizes, large_sizes with relative order of gradients preserved.
+  """
+  small_sizes = [size for size in sizes if size <= threshold_size]
+  large_sizes = [size for size in sizes if size > threshold_size]
+  return small_sizes, large_sizes
+
+
+def pack_sizes(sizes, max_bytes=0, max_group=0):
+  """Counterpart of `allreduce.pack_small_tensors` for gradient sizes.
+
+  Args:
+    sizes: List of float32 gradient sizes (number of elements) of one tower.
+    max_bytes: Int giving max number of bytes in a tensor that
+      may be considered small.
+    max_group: Int giving max number of small tensors that may be
+      concatenated into one new tensor.
+
+  Returns:
+    new_sizes, ranges where new_sizes is a list of sizes of tensors that are
+      reduced (packed tensors first, like in `pack_small_tensors`) and ranges
+      is a list of [first, last] index pairs of packed gradients (the same
+      ranges `pack_range` is called with).
+  """
+  if max_bytes <= 0 or max_group <= 0:
+    return list(sizes), []
+  small_indices = []
+  large_indices = []
+  for idx, size in enumerate(sizes):
+    if FLOAT32_BYTES * size <= max_bytes:
+      small_indices.append(idx)
+    else:
+      large_indices.append(idx)
+  small_ranges, small_singles = extract_ranges(
+      small_indices, range_size_limit=max_group)
+  if not small_ranges:
+    return list(sizes), []
+  large_indices = sorted(large_indices + small_singles)
+  new_sizes = [sum(sizes[rng[0]:rng[1] + 1]) for rng in small_ranges]
+  new_sizes.extend(sizes[i] for i in large_indices)
+  return new_sizes, small_ranges
+
+
+class AllReduceCostModel(object):
+  """Latency/bandwidth (alpha-beta) model of gradient reduction time.
+
+  Every all-reduce op costs `op_overhead` seconds plus algorithm specific
+  latency and bandwidth terms. Packing a range of gradients costs two ops
+  (concat and split) plus two memory copies of the packed bytes. Ops are
+  assumed to run one after another, so absolute numbers are an upper bound;
+  the model is meant to rank candidate configurations, not to predict step
+  time.
+  """
+
+  def __init__(self, num_devices, num_workers=1, latency=1e-5,
+               op_overhead=2e-5, intra_bandwidth=10e9, inter_bandwidth=1.25e9,
+               host_bandwidth=6e9, memcpy_bandwidth=100e9):
+    """Constructor.
+
+    Args:
+      num_devices: Number of devices (towers) in one worker.
+      num_workers: Number of worker processes.
+      latency: Latency of one point-to-point transfer, seconds.
+      op_overhead: Fixed cost of launching one reduction/packing op, seconds.
+      intra_bandwidth: Device to device bandwidth within a worker, bytes/sec.
+      inter_bandwidth: Network bandwidth between workers, bytes/sec.
+      host_bandwidth: Device to host CPU bandwidth, bytes/sec.
+      memcpy_bandwidth: Device memory copy bandwidth (packing), bytes/sec.
+    """
+    self.num_devices = num_devices
+    self.num_workers = num_workers
+    self.latency = latency
+    self.op_overhead = op_overhead
+    self.intra_bandwidth = intra_bandwidth
+    self.inter_bandwidth = inter_bandwidth
+    self.host_bandwidth = host_bandwidth
+    self.memcpy_bandwidth = memcpy_bandwidth
+
+  def _ring(self, num_participants, num_bytes, bandwidth):
+    if num_participants <= 1:
+      return 0.0
+    steps = 2 * (num_participants - 1)
+    return (steps * self.latency +
+            steps / num_participants * num_bytes / bandwidth)
+
+  def _recursive_hd(self, num_participants, num_bytes, bandwidth):
+    if num_participants <= 1:
+      return 0.0
+    steps = 2 * int(math.ceil(math.log(num_participants, 2)))
+    return (steps * self.latency + 2.0 * (num_participants - 1) /
+            num_participants * num_bytes / bandwidth)
+
+  def _shuffle(self, num_participants, num_bytes, shards, bandwidth):
+    if num_participants <= 1:
+      return 0.0
+    # Every participant sends 1/shards of a tensor to every gather device,
+    # gather devices work in parallel, then results are copied back.
+    return (2 * self.latency +
+            2.0 * num_participants * num_bytes / (shards * bandwidth))
+
+  def all_reduce_time(self, alg, shards, num_bytes):
+    """Returns time to all-reduce one tensor of `num_bytes` bytes.
+
+    Args:
+      alg: An all-reduce algorithm, one of `ALL_REDUCE_ALGS`.
+      shards: Algorithm specific sharding factor.
+      num_bytes: Size of a tensor in bytes.
+    """
+    shards = max(1, shards)
+    num_total = self.num_devices * self.num_workers
+    cross_host = self.num_workers > 1
+    if alg == 'nccl':
+      if cross_host:
+        raise ValueError('nccl all-reduce works within a single worker only')
+      comm = self._ring(self.num_devices, num_bytes, self.intra_bandwidth)
+    elif alg == 'xring':
+      bandwidth = self.inter_bandwidth if cross_host else self.intra_bandwidth
+      comm = self._ring(num_total, num_bytes, bandwidth)
+    elif alg in ('pscpu', 'psgpu'):
+      bandwidth = self.host_bandwidth if alg == 'pscpu' else self.intra_bandwidth
+      if cross_host:
+        bandwidth = min(bandwidth, self.inter_bandwidth)
+      comm = self._shuffle(num_total, num_bytes, shards, bandwidth)
+    elif '/' in alg:
+      local_alg, global_alg = alg.split('/')
+      if local_alg == 'nccl':
+        comm = self._ring(self.num_devices, num_bytes, self.intra_bandwidth)
+      else:
+        comm = self._shuffle(self.num_devices, num_bytes, 1,
+                             self.host_bandwidth)
+      if global_alg == 'xring':
+        comm += self._ring(self.num_workers, num_bytes, self.inter_bandwidth)
+      elif global_alg == 'rechd':
+        comm += self._recursive_hd(self.num_workers, num_bytes,
+                                   self.inter_bandwidth)
+      else:
+        comm += self._shuffle(self.num_workers, num_bytes, shards,
+                              self.inter_bandwidth)
+    else:
+      raise ValueError('unsupported all_reduce alg: %s' % alg)
+    return self.op_overhead + comm
+
+  def pack_time(self, num_bytes):
+    """Returns time to concatenate and later split `num_bytes` bytes."""
+    return 2 * self.op_overhead + 2.0 * num_bytes / self.memcpy_bandwidth
+
+  def reduction_time(self, sizes, all_reduce_spec, max_bytes=0, max_group=0):
+    """Estimates time to reduce gradients of one training step.
+
+    Gradients are split by spec ranges in the same way as
+    `VariableMgrDistributedAllReduce.preprocess_device_grads` does, and small
+    tensors within every range are packed with `pack_sizes`.
+
+    Args:
+      sizes: List of float32 gradient sizes (number of elements) of one tower.
+      all_reduce_spec: An all_reduce_spec string or a list of
+        AllReduceSpecTuple.
+      max_bytes: Value of agg_small_grads_max_bytes.
+      max_group: Value of agg_small_grads_max_group.
+
+    Returns:
+      A dictionary with estimated `time` (seconds), number of all-reduce ops
+      (`num_ops`) and number of packed ranges (`num_packs`).
+    """
+    if not isinstance(all_reduce_spec, list):
+      all_reduce_spec = parse_all_reduce_spec(all_reduce_spec)
+    stats = {'time': 0.0, 'num_ops': 0, 'num_packs': 0}
+    remaining_sizes = list(sizes)
+    for spec_tuple in all_reduce_spec:
+      if spec_tuple.limit < 0:
+        this_sizes, remaining_sizes = remaining_sizes, []
+      else:
+        this_sizes, remaining_sizes = split_sizes_by_size(spec_tuple.limit,
+                                                          remaining_sizes)
+      new_sizes, ranges = pack_sizes(this_sizes, max_bytes, max_group)
+      for rng in ranges:
+        stats['time'] += self.pack_time(
+            FLOAT32_BYTES * sum(this_sizes[rng[0]:rng[1] + 1]))
+      for size in new_sizes:
+        stats['time'] += self.all_reduce_time(spec_tuple.alg, spec_tuple.shards,
+                                              FLOAT32_BYTES * size)
+      stats['num_ops'] += len(new_sizes)
+      stats['num_packs'] += len(ranges)
+    return stats
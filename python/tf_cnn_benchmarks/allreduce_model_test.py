@@ -0,0 +1,84 @@
+# Copyright 2018 The TensorFlow Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ==============================================================================
+
+"""Tests for tf_cnn_benchmark.allreduce_model. Do not require TensorFlow."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import unittest
+
+import allreduce_model
+
+
+class AllReduceModelTest(unittest.TestCase):
+
+  def testParseAllReduceSpec(self):
+    spec = allreduce_model.parse_all_reduce_spec('pscpu:32k:nccl/xring#2')
+    self.assertEqual(spec, [
+        allreduce_model.AllReduceSpecTuple(alg='pscpu', shards=1, limit=32768),
+        allreduce_model.AllReduceSpecTuple(alg='nccl/xring', shards=2,
+                                           limit=-1)
+    ])
+    with self.assertRaises(ValueError):
+      allreduce_model.parse_all_reduce_spec('ring')
+
+  def testSplitSizesBySize(self):
+    small, large = allreduce_model.split_sizes_by_size(10, [5, 20, 10, 11, 1])
+    self.assertEqual(small, [5, 10, 1])
+    self.assertEqual(large, [20, 11])
+
+  def testPackSizes(self):
+    # Sizes in elements, float32: 8 bytes threshold == 2 elements.
+    sizes = [1, 100, 2, 1, 2, 100, 1]
+    new_sizes, ranges = allreduce_model.pack_sizes(sizes, max_bytes=8,
+                                                   max_group=10)
+    self.assertEqual(ranges, [[2, 4]])
+    self.assertEqual(new_sizes, [5, 1, 100, 100, 1])
+    # Packing disabled.
+    self.assertEqual(allreduce_model.pack_sizes(sizes), (sizes, []))
+    # Nothing to pack.
+    self.assertEqual(allreduce_model.pack_sizes([1, 100, 1], max_bytes=8,
+                                                max_group=10),
+                     ([1, 100, 1], []))
+    # Group size limit, see extract_ranges.
+    _, ranges = allreduce_model.pack_sizes([1] * 6, max_bytes=4, max_group=1)
+    self.assertEqual(ranges, [[0, 2], [3, 5]])
+
+  def testCostModel(self):
+    model = allreduce_model.AllReduceCostModel(4, latency=0, op_overhead=1e-3,
+                                               intra_bandwidth=1e9)
+    # Ring over 4 devices: 2*(4-1)/4 of a tensor over 1 GB/s.
+    self.assertAlmostEqual(model.all_reduce_time('nccl', 1, 1e9), 1.5 + 1e-3)
+    with self.assertRaises(ValueError):
+      allreduce_model.AllReduceCostModel(4, 2).all_reduce_time('nccl', 1, 1)
+    # Packing many small gradients reduces number of ops and time.
+    sizes = [16] * 100 + [1000000]
+    unpacked = model.reduction_time(sizes, 'nccl')
+    packed = model.reduction_time(sizes, 'nccl', max_bytes=1024, max_group=32)
+    self.assertEqual(unpacked['num_ops'], 101)
+    self.assertEqual(unpacked['num_packs'], 0)
+    self.assertEqual(packed['num_ops'], 4)
+    self.assertEqual(packed['num_packs'], 3)
+    self.assertLess(packed['time'], unpacked['time'])
+    # Hybrid spec: every range is reduced with its own algorithm.
+    model = allreduce_model.AllReduceCostModel(4, 2)
+    stats = model.reduction_time(sizes, 'pscpu:1k:nccl/xring')
+    self.assertEqual(stats['num_ops'], 101)
+
+
+if __name__ == '__main__':
+  unittest.main()
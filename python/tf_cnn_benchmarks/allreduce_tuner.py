@@ -0,0 +1,277 @@
+# (c) Copyright [2017] Hewlett Packard Enterprise Development LP
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tunes all_reduce_spec and small gradient packing for tf_cnn_benchmarks.
+
+Candidate configurations (all_reduce_spec x agg_small_grads_max_bytes x
+agg_small_grads_max_group) are ranked with `AllReduceCostModel` using sizes of
+model's gradients. Optionally, top candidates are then benchmarked with short
+tf_cnn_benchmarks runs (single worker only). The best configuration is written
+as DLBS parameters that can be passed to experimenter with `--config`.
+
+Gradient sizes are either loaded from a JSON file (a list of number of elements
+per gradient in order of model's trainable variables) or are computed by
+building a model with TensorFlow (--model). In the latter case they can be saved
+with --dump_grad_sizes and reused on hosts without TensorFlow.
+
+Usage:
+
+$ python allreduce_tuner.py --model=resnet50 --num_gpus=4 --output=./allreduce.json
+$ python allreduce_tuner.py --grad_sizes=./resnet50.json --num_gpus=8 --num_workers=2
+$ python allreduce_tuner.py --model=resnet50 --num_gpus=4 --top_k=3\
+                            --benchmark_args='--num_batches=50 --batch_size=64'
+"""
+from __future__ import print_function
+import argparse
+import json
+import os
+import shlex
+import subprocess
+import sys
+from collections import Counter
+import allreduce_model
+
+
+def get_model_grad_sizes(model_name, data_name='imagenet'):
+  """Returns sizes of gradients of a tf_cnn_benchmarks model.
+
+  Gradients are listed in order of model's trainable variables - the order in
+  which they are passed to `pack_small_tensors`.
+
+  Args:
+    model_name: Name of a model, for instance, resnet50.
+    data_name: Name of a dataset the model is built for.
+
+  Returns:
+    A list of number of elements in every gradient tensor.
+  """
+  import tensorflow as tf
+  import convnet_builder
+  import datasets
+  from models import model_config
+  dataset = datasets.create_dataset(None, data_name)
+  model = model_config.get_model_config(model_name, dataset)
+  with tf.Graph().as_default():
+    image_size = model.get_image_size()
+    images = tf.zeros([1, image_size, image_size, dataset.depth])
+    network = convnet_builder.ConvNetBuilder(images, dataset.depth, True, True,
+                                             'NHWC')
+    with tf.variable_scope('cg', custom_getter=network.get_custom_getter()):
+      model.add_inference(network)
+      if not model.skip_final_affine_layer():
+        network.affine(dataset.num_classes + 1, activation='linear')
+      if network.aux_top_layer is not None:
+        with network.switch_to_aux_top_layer():
+          network.affine(dataset.num_classes + 1, activation='linear')
+    return [var.get_shape().num_elements() for var in tf.trainable_variables()]
+
+
+def get_candidate_specs(num_gpus, num_workers):
+  """Returns default list of all_reduce_spec candidates.
+
+  Single worker runs use 'replicated' variable update that supports one
+  algorithm for all tensors, distributed runs use 'distributed_all_reduce' that
+  also supports hybrid specs.
+  """
+  shards = [s for s in (2, 4, 8) if s <= num_gpus * num_workers]
+  specs = ['xring', 'pscpu', 'psgpu'] + ['psgpu#%d' % s for s in shards]
+  if num_workers == 1:
+    return ['nccl'] + specs
+  specs.extend(['nccl/xring', 'nccl/rechd', 'nccl/pscpu', 'pscpu/pscpu'])
+  specs.extend(['pscpu:32k:xring', 'pscpu:32k:nccl/xring',
+                'pscpu:256k:nccl/xring'])
+  return specs
+
+
+def rank_candidates(cost_model, sizes, specs, max_bytes_values,
+                    max_group_values):
+  """Evaluates all candidates with a cost model.
+
+  Returns:
+    A list of candidates (dictionaries) sorted by estimated reduction time.
+  """
+  candidates = []
+  for spec in specs:
+    for max_bytes in max_bytes_values:
+      # max_group does not matter if packing is disabled.
+      for max_group in (max_group_values if max_bytes > 0 else [0]):
+        stats = cost_model.reduction_time(sizes, spec, max_bytes, max_group)
+        candidates.append({
+            'all_reduce_spec': spec, 'max_bytes': max_bytes,
+            'max_group': max_group, 'time': stats['time'],
+            'num_ops': stats['num_ops'], 'num_packs': stats['num_packs']
+        })
+  candidates.sort(key=lambda candidate: candidate['time'])
+  return candidates
+
+
+def run_benchmark(candidate, model, num_gpus, benchmark_args):
+  """Runs tf_cnn_benchmarks with a candidate configuration.
+
+  Returns:
+    Throughput (images/sec) or None if benchmark failed.
+  """
+  script = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        'tf_cnn_benchmarks.py')
+  command = [
+      sys.executable, script, '--model=%s' % model, '--num_gpus=%d' % num_gpus,
+      '--variable_update=replicated',
+      '--all_reduce_spec=%s' % candidate['all_reduce_spec'],
+      '--agg_small_grads_max_bytes=%d' % candidate['max_bytes'],
+      '--agg_small_grads_max_group=%d' % max(1, candidate['max_group'])
+  ] + shlex.split(benchmark_args)
+  process = subprocess.Popen(command, stdout=subprocess.PIPE,
+                             stderr=subprocess.STDOUT, universal_newlines=True)
+  output, _ = process.communicate()
+  throughput = None
+  for line in output.splitlines():
+    if line.startswith('__results.throughput__='):
+      throughput = float(line[len('__results.throughput__='):])
+  if process.returncode != 0 or throughput is None:
+    print("Benchmark failed (%s): %s" % (process.returncode, ' '.join(command)))
+    return None
+  return throughput
+
+
+def get_dlbs_parameters(candidate, num_workers):
+  """Converts a candidate into DLBS parameters."""
+  return {
+      'tensorflow.var_update': ('replicated' if num_workers == 1
+                                else 'distributed_all_reduce'),
+      'tensorflow.all_reduce_spec': candidate['all_reduce_spec'],
+      'tensorflow.agg_small_grads_max_bytes': candidate['max_bytes'],
+      'tensorflow.agg_small_grads_max_group': (candidate['max_group']
+                                               if candidate['max_bytes'] > 0
+                                               else 10)
+  }
+
+
+def parse_args():
+  """Parses command line arguments."""
+  parser = argparse.ArgumentParser()
+  parser.add_argument('--model', type=str, default='',
+                      help="A tf_cnn_benchmarks model to get gradient sizes "
+                           "from (requires TensorFlow).")
+  parser.add_argument('--data_name', type=str, default='imagenet',
+                      help="A dataset name for --model.")
+  parser.add_argument('--grad_sizes', type=str, default='',
+                      help="A JSON file with a list of gradient sizes "
+                           "(number of elements).")
+  parser.add_argument('--dump_grad_sizes', type=str, default='',
+                      help="If not empty, write gradient sizes to this file.")
+  parser.add_argument('--num_gpus', type=int, default=1,
+                      help="Number of GPUs per worker.")
+  parser.add_argument('--num_workers', type=int, default=1,
+                      help="Number of workers.")
+  parser.add_argument('--all_reduce_specs', type=str, default='',
+                      help="Comma separated all_reduce_spec candidates. "
+                           "Default depends on number of workers.")
+  parser.add_argument('--max_bytes', type=str,
+                      default='0,1K,4K,16K,64K,256K,1M,4M',
+                      help="Comma separated agg_small_grads_max_bytes "
+                           "candidates. Zero disables packing.")
+  parser.add_argument('--max_group', type=str, default='10,16,32,64',
+                      help="Comma separated agg_small_grads_max_group "
+                           "candidates.")
+  parser.add_argument('--latency', type=float, default=1e-5,
+                      help="Cost model: point-to-point latency, seconds.")
+  parser.add_argument('--op_overhead', type=float, default=2e-5,
+                      help="Cost model: cost of launching one op, seconds.")
+  parser.add_argument('--intra_bandwidth', type=float, default=10.0,
+                      help="Cost model: device to device bandwidth, GB/s.")
+  parser.add_argument('--inter_bandwidth', type=float, default=1.25,
+                      help="Cost model: network bandwidth, GB/s.")
+  parser.add_argument('--host_bandwidth', type=float, default=6.0,
+                      help="Cost model: device to host bandwidth, GB/s.")
+  parser.add_argument('--memcpy_bandwidth', type=float, default=100.0,
+                      help="Cost model: device memory copy bandwidth, GB/s.")
+  parser.add_argument('--top_k', type=int, default=0,
+                      help="If positive, benchmark this number of best "
+                           "candidates with tf_cnn_benchmarks (requires "
+                           "--model and --num_workers=1).")
+  parser.add_argument('--benchmark_args', type=str, default='',
+                      help="Additional tf_cnn_benchmarks arguments for "
+                           "--top_k runs.")
+  parser.add_argument('--output', type=str, default='',
+                      help="If not empty, write DLBS parameters to this file.")
+  return parser.parse_args()
+
+
+def main():
+  """Entry point."""
+  args = parse_args()
+  if args.grad_sizes:
+    with open(args.grad_sizes) as file_obj:
+      sizes = json.load(file_obj)
+  elif args.model:
+    sizes = get_model_grad_sizes(args.model, args.data_name)
+  else:
+    raise ValueError("One of --grad_sizes or --model must be specified.")
+  if args.dump_grad_sizes:
+    with open(args.dump_grad_sizes, 'w') as file_obj:
+      json.dump(sizes, file_obj)
+  if args.top_k > 0 and (not args.model or args.num_workers != 1):
+    raise ValueError("Benchmarking candidates requires --model and "
+                     "--num_workers=1.")
+
+  histogram = sorted(Counter(
+      allreduce_model.FLOAT32_BYTES * size for size in sizes).items())
+  print("Number of gradients: %d, total size: %d bytes" %
+        (len(sizes), allreduce_model.FLOAT32_BYTES * sum(sizes)))
+  print("Gradient size histogram (bytes: count): %s" % json.dumps(histogram))
+
+  cost_model = allreduce_model.AllReduceCostModel(
+      args.num_gpus, args.num_workers, latency=args.latency,
+      op_overhead=args.op_overhead,
+      intra_bandwidth=args.intra_bandwidth * 1e9,
+      inter_bandwidth=args.inter_bandwidth * 1e9,
+      host_bandwidth=args.host_bandwidth * 1e9,
+      memcpy_bandwidth=args.memcpy_bandwidth * 1e9)
+  specs = (args.all_reduce_specs.split(',') if args.all_reduce_specs
+           else get_candidate_specs(args.num_gpus, args.num_workers))
+  candidates = rank_candidates(
+      cost_model, sizes, specs,
+      [allreduce_model.parse_general_int(v) for v in args.max_bytes.split(',')],
+      [int(v) for v in args.max_group.split(',')])
+
+  print("%-24s %10s %10s %12s %8s %8s" % ('all_reduce_spec', 'max_bytes',
+                                          'max_group', 'time_ms', 'ops',
+                                          'packs'))
+  for candidate in candidates:
+    print("%-24s %10d %10d %12.3f %8d %8d" % (
+        candidate['all_reduce_spec'], candidate['max_bytes'],
+        candidate['max_group'], 1000.0 * candidate['time'],
+        candidate['num_ops'], candidate['num_packs']))
+
+  best = candidates[0]
+  if args.top_k > 0:
+    best_throughput = None
+    for candidate in candidates[:args.top_k]:
+      throughput = run_benchmark(candidate, args.model, args.num_gpus,
+                                 args.benchmark_args)
+      print("%s max_bytes=%d max_group=%d: %s images/sec" % (
+          candidate['all_reduce_spec'], candidate['max_bytes'],
+          candidate['max_group'], throughput))
+      if throughput is not None and (best_throughput is None or
+                                     throughput > best_throughput):
+        best, best_throughput = candidate, throughput
+
+  config = {'parameters': get_dlbs_parameters(best, args.num_workers)}
+  print(json.dumps(config, indent=2))
+  if args.output:
+    with open(args.output, 'w') as file_obj:
+      json.dump(config, file_obj, indent=2)
+
+
+if __name__ == '__main__':
+  main()
@@ -24,6 +24,7 @@ import unittest
 from absl import app
 from absl import flags as absl_flags
 
+import allreduce_model_test
 import allreduce_test
 import benchmark_cnn_distributed_test
 import benchmark_cnn_test
@@ -57,6 +58,7 @@ def main(_):
   loader = unittest.defaultTestLoader
   if FLAGS.full_tests:
     suite = unittest.TestSuite([
+        loader.loadTestsFromModule(allreduce_model_test),
         loader.loadTestsFromModule(allreduce_test),
         loader.loadTestsFromModule(cnn_util_test),
         loader.loadTestsFromModule(variable_mgr_util_test),
@@ -67,6 +69,7 @@ def main(_):
     ])
   else:
     suite = unittest.TestSuite([
+        loader.loadTestsFromModule(allreduce_model_test),
         loader.loadTestsFromModule(allreduce_test),
         loader.loadTestsFromModule(cnn_util_test),
         loader.loadTestsFromModule(variable_mgr_util_test),
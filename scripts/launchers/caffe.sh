@@ -3,6 +3,10 @@ unknown_params_action=set
 . $DLBS_ROOT/scripts/parse_options.sh || exit 1;    # Parse command line options
 . $DLBS_ROOT/scripts/utils.sh
 loginfo "$0 $*" >> ${exp_log_file}                  # Log command line arguments for debugging purposes
+# Serving phase (online inference with dynamic batching) is only implemented by PyTorch backend
+if [ "${exp_phase}" == "serving" ]; then
+  report_and_exit "failure" "Caffe benchmark backend does not support 'serving' phase (exp.phase=serving)." "${exp_log_file}";
+fi
 # The simulation mode: just print out what is about to be launched
 if [ "$exp_status" = "simulate" ]; then
   echo "${caffe_env} ${runtime_launcher} caffe ${caffe_action} ${caffe_args}"
@@ -3,6 +3,10 @@ unknown_params_action=set
 . $DLBS_ROOT/scripts/parse_options.sh || exit 1;    # Parse command line options
 . $DLBS_ROOT/scripts/utils.sh
 loginfo "$0 $*" >> ${exp_log_file}                  # Log command line arguments for debugging purposes
+# Serving phase (online inference with dynamic batching) is only implemented by PyTorch backend
+if [ "${exp_phase}" == "serving" ]; then
+  report_and_exit "failure" "MXNet benchmark backend does not support 'serving' phase (exp.phase=serving)." "${exp_log_file}";
+fi
 echo "__exp.framework_title__=\"MXNet\"" >> ${exp_log_file}
 if [ "$exp_status" = "simulate" ]; then
     echo "${mxnet_env} ${runtime_launcher} python ${mxnet_bench_path}/mxnet_benchmarks/benchmarks.py ${mxnet_args}"
@@ -23,11 +27,20 @@ else
   bench_launcher="${bench_launcher} --scheduler=${mxnet_scheduler}"
 fi
 
+bench_command="${runtime_python} ${bench_launcher} ${mxnet_bench_path}/mxnet_benchmarks/benchmarks.py ${mxnet_args}"
+if [ "${exp_device_type}" == "cpu" ] && [ "${exp_cpu_instances}" -gt 1 ]; then
+    [ -n "${runtime_launcher}" ] && logwarn "runtime.launcher (${runtime_launcher}) is ignored with multiple CPU instances"
+    runtime_launcher=""
+    bench_command=$(cpu_instances_command "${exp_cpu_instances}" "${bench_command}" "${exp_docker}") || {
+        report_and_exit "failure" "Cannot split CPUs into ${exp_cpu_instances} instances." "${exp_log_file}";
+    }
+fi
+
 [ -z "${runtime_launcher}" ] && runtime_launcher=":;"
 script="\
     export ${mxnet_env};\
     echo -e \"__results.start_time__= \x22\$(date +%Y-%m-%d:%H:%M:%S:%3N)\x22\";\
-    ${runtime_launcher} ${runtime_python} ${bench_launcher} ${mxnet_bench_path}/mxnet_benchmarks/benchmarks.py ${mxnet_args} &\
+    ${runtime_launcher} ${bench_command} &\
     proc_pid=\$!;\
     [ \"${monitor_frequency}\" != \"0\" ] && echo -e \"\${proc_pid}\" > ${monitor_backend_pid_folder}/proc.pid;\
     wait \${proc_pid};\
@@ -40,6 +53,10 @@ if [ "${exp_docker}" = "true" ]; then
 else
     eval $script >> ${exp_log_file} 2>&1
 fi
+# Aggregate results of multiple CPU instances.
+if [ "${exp_device_type}" == "cpu" ] && [ "${exp_cpu_instances}" -gt 1 ]; then
+    cpu_instances_postprocess "${exp_log_file}" "${exp_cpu_instances}"
+fi
 
 if mxnet_error ${exp_log_file} ${exp_phase}; then
     logwarn "error in \"${exp_log_file}\" with effective batch ${exp_effective_batch} (replica batch ${exp_replica_batch})";
@@ -4,7 +4,7 @@ unknown_params_action=set
 . $DLBS_ROOT/scripts/utils.sh
 loginfo "$0 $*" >> ${exp_log_file}                  # Log command line arguments for debugging purposes
 # Now, we have support only for training
-if [ "${exp_phase}" == "inference" ]; then
+if [ "${exp_phase}" != "training" ]; then
   report_and_exit "failure" "NVCNN TensorFlow can only benchmark 'training' phase." "${exp_log_file}";
 fi
 echo "__exp.framework_title__=\"TensorFlow-nvcnn\"" >> ${exp_log_file}
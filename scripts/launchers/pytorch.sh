@@ -22,7 +22,7 @@ if [ "${exp_num_nodes}" == "1" ]; then
       if [ "${exp_device_type}" == "gpu" ]; then
           bench_launcher="-m torch.distributed.launch --nproc_per_node=${exp_num_local_gpus}"
       else
-          bench_launcher="-m torch.distributed.launch --nproc_per_node=1"
+          bench_launcher="-m torch.distributed.launch --nproc_per_node=${pytorch_num_cpu_processes}"
       fi
   fi
 else
@@ -32,12 +32,21 @@ else
   #echo "Bench launcher: ${bench_launcher}"
 fi
 
+bench_command="${runtime_python} ${bench_launcher} ${pytorch_bench_path}/pytorch_benchmarks/benchmarks.py ${pytorch_args}"
+if [ "${exp_device_type}" == "cpu" ] && [ "${exp_cpu_instances}" -gt 1 ]; then
+    [ -n "${runtime_launcher}" ] && logwarn "runtime.launcher (${runtime_launcher}) is ignored with multiple CPU instances"
+    runtime_launcher=""
+    bench_command=$(cpu_instances_command "${exp_cpu_instances}" "${bench_command}" "${exp_docker}") || {
+        report_and_exit "failure" "Cannot split CPUs into ${exp_cpu_instances} instances." "${exp_log_file}";
+    }
+fi
+
 [ -z "${runtime_launcher}" ] && runtime_launcher=":;"
 
 script="\
     export ${pytorch_env};\
     echo -e \"__results.start_time__= \x22\$(date +%Y-%m-%d:%H:%M:%S:%3N)\x22\";\
-    ${runtime_launcher} ${runtime_python} ${bench_launcher} ${pytorch_bench_path}/pytorch_benchmarks/benchmarks.py ${pytorch_args} &\
+    ${runtime_launcher} ${bench_command} &\
     proc_pid=\$!;\
     [ \"${monitor_frequency}\" != \"0\" ] && echo -e \"\${proc_pid}\" > ${monitor_backend_pid_folder}/proc.pid;\
     wait \${proc_pid};\
@@ -50,3 +59,7 @@ if [ "${exp_docker}" = "true" ]; then
 else
     eval $script >> ${exp_log_file} 2>&1
 fi
+# Aggregate results of multiple CPU instances.
+if [ "${exp_device_type}" == "cpu" ] && [ "${exp_cpu_instances}" -gt 1 ]; then
+    cpu_instances_postprocess "${exp_log_file}" "${exp_cpu_instances}"
+fi
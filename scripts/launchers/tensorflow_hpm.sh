@@ -3,6 +3,10 @@ unknown_params_action=set
 . $DLBS_ROOT/scripts/parse_options.sh || exit 1;    # Parse command line options
 . $DLBS_ROOT/scripts/utils.sh
 loginfo "$0 $*" >> ${exp_log_file}                  # Log command line arguments for debugging purposes
+# Serving phase (online inference with dynamic batching) is only implemented by PyTorch backend
+if [ "${exp_phase}" == "serving" ]; then
+  report_and_exit "failure" "TensorFlow benchmark backend does not support 'serving' phase (exp.phase=serving)." "${exp_log_file}";
+fi
 echo "__exp.framework_title__=\"TensorFlow\"" >> ${exp_log_file}
 if [ "$exp_status" = "simulate" ]; then
     echo "${tensorflow_env} ${runtime_launcher} python ${tensorflow_python_path}/tf_cnn_benchmarks.py ${tensorflow_args}"
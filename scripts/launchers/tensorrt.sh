@@ -8,8 +8,8 @@ if [ "$exp_status" = "simulate" ]; then
     echo "${tensorrt_env} ${runtime_launcher} tensorrt ${tensorrt_args}"
     exit 0
 fi
-[ "${exp_phase}" == "training" ] && \
-    report_and_exit "failure" "TensorRT benchmark backend does not support 'training' phase (exp.phase=training)." "${exp_log_file}"
+[ "${exp_phase}" != "inference" ] && \
+    report_and_exit "failure" "TensorRT benchmark backend does not support '${exp_phase}' phase (exp.phase=${exp_phase})." "${exp_log_file}"
 # Do model checking and preparation only if not fake inference.
 if [ "${tensorrt_fake_inference}" == "false" ]; then
     # Check batch is small enough for this experiment
@@ -13,6 +13,9 @@ print_help() {
   echo "                                   should be standard. It should contain synsent directories. Those directories"
   echo "                                   should contain JPEG files. This folder should be writable."
   echo "--output DIR                       Output directory. This directory must not exist."
+  echo "--manifest FILE                    A manifest file with list of images. It's created or updated if ImageNet folder"
+  echo "                                   has changed. Use it if input folder is read only or shared. [default:"
+  echo "                                   \${input}/dlbs_manifest.csv if input folder is writable, else no manifest]"
   echo "--docker_image IMAGE               A docker image to use. The script can only work in docker containers."
   echo "--docker (docker | nvidia-docker)  How to run docker containers - with 'docker' or 'nvidia-docker'. LMDB dataset"
   echo "                                   can be generated with both while others require nvidia-docker. [default: docker]"
@@ -34,8 +37,8 @@ print_help() {
     echo "                                   [default: 1]"
   fi
   if [ "$format" == "fast_tfrecord" ]; then
-    echo "--num_workers K                    Number of workers (parallel jobs) to use to create dataset. Must be less than or equal"
-    echo "                                   to number of GPUs. Also, num_shards % num_workers must be 0.  [default: 1]"
+    echo "--num_workers K                    Number of workers (parallel jobs) to use to create dataset. Should be less than or equal"
+    echo "                                   to number of CPU cores. [default: 1]"
   fi
   if [ "$format" == "tfrecord" ]; then
     echo "--num_workers K                    Number of workers (parallel jobs) to use to create dataset. [default: 1]"
@@ -98,6 +101,7 @@ output=           # Output folder
 docker_image=     # Docker image to use, dataset specific
 img_size=300      # Resize images to this size if applicable
 docker=docker     # How to run docker: docker or nvidia-docker
+manifest=         # ImageNet manifest file
 
 # TensorFlow(TF_CNN_BENCHMARKS): tfrecord parameters
 bboxes_dir=
@@ -126,6 +130,16 @@ assert_docker_img_exists $docker_image
 [ -d "$output" ] && logfatal "Output directory ($output) must not exist."
 
 imagenet_tools=$DLBS_ROOT/python/dlbs/data/imagenet/imagenet_tools.py
+# Scan ImageNet directory once. Label builders and converters use this manifest instead of scanning it again.
+# The manifest is rebuilt if class directories have changed since it was created.
+if [ -z "$manifest" ]; then
+  if [ -w "$input" ]; then
+    manifest="${input}/dlbs_manifest.csv"
+  else
+    logwarn "Input directory ($input) is not writable and --manifest is not set, ImageNet directory will be scanned."
+  fi
+fi
+[ -n "$manifest" ] && python $imagenet_tools "update_manifest" "$input" "$manifest"
 if [ "$dataset" == "lmdb" ]; then
   # Check that database directory does not exist but it's parent does exist
   db_dir=$(dirname "$output")
@@ -133,7 +147,7 @@ if [ "$dataset" == "lmdb" ]; then
   assert_dirs_exist $db_dir
   # Generate if not present a textual file that maps a relative image file name to its label
   docker_args="--rm -ti --volume=${input}:/imagenet/input --volume=${db_dir}:/imagenet/output ${docker_image}"
-  [ ! -f "${input}/caffe_labels.txt" ] && python $imagenet_tools "build_caffe_labels" "$input" "${input}/caffe_labels.txt"
+  [ ! -f "${input}/caffe_labels.txt" ] && python $imagenet_tools "build_caffe_labels" "$input" "${input}/caffe_labels.txt" ${manifest:+"$manifest"}
   assert_files_exist "${input}/caffe_labels.txt"
   # Build docker and converter arguments
   converter="${caffe_dir}/convert_imageset"
@@ -141,7 +155,7 @@ if [ "$dataset" == "lmdb" ]; then
 elif [ "$dataset" == "recordio" ]; then
   mkdir -p $output
   # Generate if not present a textual file that maps a relative image file name to its label
-  [ ! -f "${input}/mxnet_labels.txt" ] && python $imagenet_tools "build_mxnet_labels" "$input" "${input}/mxnet_labels.txt"
+  [ ! -f "${input}/mxnet_labels.txt" ] && python $imagenet_tools "build_mxnet_labels" "$input" "${input}/mxnet_labels.txt" ${manifest:+"$manifest"}
   assert_files_exist "${input}/mxnet_labels.txt"
   # Build docker and converter arguments
   docker_args="--rm -ti --volume=${input}:/imagenet/input --volume=${output}:/imagenet/output ${docker_image}"
@@ -173,9 +187,14 @@ elif [ "$dataset" == "tfrecord" ]; then
 elif [ "$dataset" == "fast_tfrecord" ]; then
   mkdir -p $output
   # Build docker and converter arguments
-  docker_args="--rm -ti --volume=${DLBS_ROOT}:/workspace --volume=${input}:/imagenet/input --volume=${output}:/imagenet/output ${docker_image}"
+  docker_args="--rm -ti --volume=${DLBS_ROOT}:/workspace --volume=${input}:/imagenet/input --volume=${output}:/imagenet/output"
   converter="/workspace/python/dlbs/data/imagenet/tensorflow_data.py"
   script="PYTHONPATH=/workspace/python python $converter --input_dir /imagenet/input --num_shards $num_shards --output_dir /imagenet/output --num_workers $num_workers --img_size $img_size"
+  if [ -n "$manifest" ]; then
+    docker_args="${docker_args} --volume=$(dirname "$manifest"):/imagenet/manifest"
+    script="${script} --manifest_file /imagenet/manifest/$(basename "$manifest")"
+  fi
+  docker_args="${docker_args} ${docker_image}"
 elif [[ "$dataset" =~ ^tensors(1|4)$ ]]; then
   [ "$dataset" == "tensors1" ] && dtype="uchar" || dtype="float"
   [ "$shuffle" == "true" ] && shuffle_param="--shuffle" || shuffle_param=""
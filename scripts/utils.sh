@@ -236,3 +236,82 @@ report_and_exit() {
   logfatal "$2 (status code = $1)"
 }
 export -f report_and_exit
+
+# Split host CPUs into $1 disjoint sets. Prints one line per set: "cpu_list node" where
+# cpu_list is a comma separated list of CPUs and node is a NUMA node of all these CPUs or
+# -1 if CPUs belong to different nodes. CPUs are ordered by NUMA node, physical core and
+# CPU ID, so that hyper-threads of one core belong to one set.
+cpu_instance_cores() {
+  [ "$#" -ne 1 ] && logfatal "cpu_instance_cores: one argument expected (number of instances)";
+  lscpu -p=CPU,CORE,NODE | grep -v '^#' | awk -F, '{print $1 "," $2 "," ($3 == "" ? 0 : $3)}' |\
+    sort -t, -k3,3n -k2,2n -k1,1n |\
+    awk -F, -v n=$1 '
+      { cpus[NR - 1] = $1; nodes[NR - 1] = $3 }
+      END {
+        if (n > NR) { exit 1 }
+        for (i = 0; i < n; i++) {
+          first = int(i * NR / n); last = int((i + 1) * NR / n);
+          cpu_list = cpus[first]; node = nodes[first];
+          for (j = first + 1; j < last; j++) {
+            cpu_list = cpu_list "," cpus[j];
+            if (nodes[j] != node) { node = -1 }
+          }
+          print cpu_list, node;
+        }
+      }'
+}
+export -f cpu_instance_cores
+
+# Build a command that runs $1 instances of a benchmark command $2 in background and
+# waits for them. Every instance is pinned to its own CPU set (see cpu_instance_cores)
+# and uses as many OpenMP/MKL threads as it has CPUs. Memory is bound to a NUMA node
+# with numactl if an instance fits into one node and numactl is available on a host
+# in bare metal runs ($3 is 'false'), else only CPU affinity is set with taskset.
+# Output lines of an instance N are merged into standard output with '__results.'
+# prefix replaced by '__results.instance_N.'.
+cpu_instances_command() {
+  [ "$#" -ne 3 ] && logfatal "cpu_instances_command: 3 arguments expected (number of instances, command and docker flag)";
+  local cores
+  cores=$(cpu_instance_cores $1) || return 1
+  local instance=0 command="" cpu_list node pin num_threads
+  while read cpu_list node; do
+    num_threads=$(echo ${cpu_list} | awk -F, '{print NF}')
+    if [ "${node}" != "-1" ] && [ "$3" == "false" ] && command -v numactl > /dev/null 2>&1; then
+      pin="numactl --physcpubind=${cpu_list} --membind=${node}"
+    else
+      pin="taskset -c ${cpu_list}"
+    fi
+    command="${command} { OMP_NUM_THREADS=${num_threads} MKL_NUM_THREADS=${num_threads} ${pin} $2 2>&1 |"
+    command="${command} sed -u 's/^__results./__results.instance_${instance}./'; } &"
+    instance=$((instance + 1))
+  done <<< "${cores}"
+  echo "(${command} wait)"
+}
+export -f cpu_instances_command
+
+# Aggregate results of $2 benchmark instances (see cpu_instances_command) in a log
+# file $1. If all instances have reported their results, results.throughput (sum of
+# instance throughputs), results.time (average instance batch time) and
+# results.instance_throughputs (list of instance throughputs) are appended to a log
+# file. CPU sets of instances are reported as exp.cpu_instance_cores.
+cpu_instances_postprocess() {
+  [ "$#" -ne 2 ] && logfatal "cpu_instances_postprocess: 2 arguments expected (log file and number of instances)";
+  [ ! -f "$1" ] && return 0;
+  echo "__exp.cpu_instance_cores__= [$(cpu_instance_cores $2 | awk '{printf "%s\"%s\"", (NR > 1 ? ", " : ""), $1}')]" >> $1
+  awk -F'__=' -v n=$2 '
+    $1 ~ /^__results\.instance_[0-9]+\.throughput$/ { split($1, parts, "."); throughput[parts[2]] = $2 + 0 }
+    $1 ~ /^__results\.instance_[0-9]+\.time$/ { split($1, parts, "."); time[parts[2]] = $2 + 0 }
+    END {
+      total_throughput = 0; total_time = 0; throughputs = "";
+      for (i = 0; i < n; i++) {
+        if (!(("instance_" i) in throughput) || !(("instance_" i) in time)) { exit 0 }
+        total_throughput += throughput["instance_" i];
+        total_time += time["instance_" i];
+        throughputs = throughputs (i > 0 ? ", " : "") throughput["instance_" i];
+      }
+      printf "__results.throughput__= %f\n", total_throughput;
+      printf "__results.time__= %f\n", total_time / n;
+      printf "__results.instance_throughputs__= [%s]\n", throughputs;
+    }' $1 >> $1
+}
+export -f cpu_instances_postprocess